@@ -0,0 +1,207 @@
+"""
+JWT authentication that needs no user query per request.
+
+Tokens are issued with the user's permission flags as claims (USER_CLAIMS)
+and a token version. CachedJWTAuthentication verifies the signature, checks
+revocation, and builds the request user from the claims: a real User
+instance, so it can be assigned to foreign keys and checked for
+permissions, with every other field deferred (reading one loads it from the
+database). Profile fields are not claims, so they are never stale; views
+that return the user's profile load it (see accounts.views).
+
+Revocation is stored in the database and read through the cache:
+
+- revoke_token() blocks a single token by its `jti` until it expires;
+- revoke_user_tokens() bumps the user's token version, rejecting every
+  token issued before. Changes to a user's password, active or staff flags
+  do this automatically (see accounts.signals).
+
+Each process caches what it read for AUTH_REVOCATION_CACHE_TIMEOUT seconds,
+and a cache miss (an evicted entry, a new process) reads the database
+again, so a revocation is never forgotten. Without a shared cache, other
+worker processes see it once their entry expires.
+
+Tokens without the claims (issued by other code) fall back to loading the
+user, cached for AUTH_USER_CACHE_TIMEOUT seconds under the user's ID and
+token version when that is set.
+"""
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import models, router, transaction
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from dj_rest_auth.jwt_auth import CookieTokenRefreshSerializer
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import (
+    TokenObtainPairSerializer as BaseTokenObtainPairSerializer
+)
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import RevokedToken, TokenVersion
+
+User = get_user_model()
+
+USER_CLAIMS = ('is_active', 'is_staff', 'is_superuser')
+VERSION_CLAIM = 'ver'
+
+TOKEN_VERSION_KEY = 'token-version:{user_id}'
+REVOKED_TOKEN_KEY = 'revoked-token:{jti}'
+USER_CACHE_KEY = 'auth-user:{user_id}:{version}'
+
+
+def revocation_cache_timeout():
+    return getattr(settings, 'AUTH_REVOCATION_CACHE_TIMEOUT', 30)
+
+
+def get_token_version(user_id):
+    key = TOKEN_VERSION_KEY.format(user_id=user_id)
+    version = cache.get(key)
+    if version is None:
+        version = load_token_version(user_id)
+        cache.set(key, version, revocation_cache_timeout())
+    return version
+
+
+def load_token_version(user_id):
+    return (
+        TokenVersion.objects.filter(user_id=user_id)
+        .values_list('version', flat=True)
+        .first()
+    ) or 0
+
+
+def revoke_user_tokens(user_id):
+    """Reject every token issued to the user so far."""
+    with transaction.atomic():
+        TokenVersion.objects.get_or_create(user_id=user_id)
+        TokenVersion.objects.filter(user_id=user_id).update(
+            version=models.F('version') + 1
+        )
+    # Deleted again once committed, in case the old version was read back
+    # in meanwhile.
+    key = TOKEN_VERSION_KEY.format(user_id=user_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def revoke_token(token):
+    """Reject a single access or refresh token until it expires."""
+    expires_at = datetime.fromtimestamp(token['exp'], tz=dt_timezone.utc)
+    now = timezone.now()
+    if expires_at <= now:
+        return
+    jti = token[api_settings.JTI_CLAIM]
+    # Expired tokens are rejected anyway; their rows are dropped as we go.
+    RevokedToken.objects.filter(expires_at__lte=now).delete()
+    RevokedToken.objects.update_or_create(jti=jti, defaults={'expires_at': expires_at})
+    cache.set(REVOKED_TOKEN_KEY.format(jti=jti), True, revocation_cache_timeout())
+
+
+def check_not_revoked(token):
+    """
+    Raise InvalidToken if the token, or every token of its user, was revoked.
+    Returns the user's current token version.
+    """
+    user_id = token.get(api_settings.USER_ID_CLAIM)
+    jti = token.get(api_settings.JTI_CLAIM)
+    version_key = TOKEN_VERSION_KEY.format(user_id=user_id)
+    revoked_key = REVOKED_TOKEN_KEY.format(jti=jti)
+    found = cache.get_many([version_key, revoked_key])
+    missing = {}
+    if version_key not in found:
+        found[version_key] = missing[version_key] = load_token_version(user_id)
+    if revoked_key not in found:
+        found[revoked_key] = missing[revoked_key] = (
+            RevokedToken.objects.filter(jti=jti).exists()
+        )
+    if missing:
+        cache.set_many(missing, revocation_cache_timeout())
+    if found[revoked_key] or token.get(VERSION_CLAIM, 0) < found[version_key]:
+        raise InvalidToken(_('Token has been revoked'))
+    return found[version_key]
+
+
+def user_from_claims(token):
+    """A User built from the token's claims, with every other field deferred."""
+    values = {
+        User._meta.pk.attname: User._meta.pk.to_python(token[api_settings.USER_ID_CLAIM]),
+        **{claim: token[claim] for claim in USER_CLAIMS},
+    }
+    fields = [field.attname for field in User._meta.concrete_fields if field.attname in values]
+    return User.from_db(
+        router.db_for_read(User), fields, [values[field] for field in fields]
+    )
+
+
+class ClaimsRefreshToken(RefreshToken):
+    """Refresh token carrying USER_CLAIMS and the token version, as do its access tokens."""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for claim in USER_CLAIMS:
+            token[claim] = getattr(user, claim)
+        token[VERSION_CLAIM] = get_token_version(user.pk)
+        return token
+
+
+class TokenObtainPairSerializer(BaseTokenObtainPairSerializer):
+    token_class = ClaimsRefreshToken
+
+
+class TokenRefreshSerializer(CookieTokenRefreshSerializer):
+    """
+    Refresh that honours revocation and, with BLACKLIST_AFTER_ROTATION,
+    revokes the rotated refresh token in the cache (the token_blacklist app
+    is not installed).
+    """
+
+    def validate(self, attrs):
+        refresh = RefreshToken(self.extract_refresh_token())
+        check_not_revoked(refresh)
+        data = super().validate(attrs)
+        if api_settings.ROTATE_REFRESH_TOKENS and api_settings.BLACKLIST_AFTER_ROTATION:
+            revoke_token(refresh)
+        return data
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that checks revocation in the cache and takes the user
+    from the token's claims instead of the database.
+    """
+
+    def get_validated_token(self, raw_token):
+        token = super().get_validated_token(raw_token)
+        token.version = check_not_revoked(token)
+        return token
+
+    def get_user(self, validated_token):
+        if all(claim in validated_token for claim in USER_CLAIMS):
+            user = user_from_claims(validated_token)
+        else:
+            user = self.load_user(validated_token)
+        if not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        return user
+
+    def load_user(self, validated_token):
+        timeout = getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', 0)
+        if not timeout:
+            return super().get_user(validated_token)
+
+        key = USER_CACHE_KEY.format(
+            user_id=validated_token.get(api_settings.USER_ID_CLAIM),
+            version=getattr(validated_token, 'version', 0)
+        )
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(validated_token)
+            cache.set(key, user, timeout)
+        return user
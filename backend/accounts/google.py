@@ -0,0 +1,139 @@
+"""
+Verification of Google ID tokens for sign-in.
+
+Google signs ID tokens with keys it rotates every few days and publishes
+with a Cache-Control max-age. GoogleIDTokenVerifier keeps those certs in the
+Django cache for as long as Google allows, fetched over a pooled HTTP
+session, so a sign-in does not wait on an outbound request:
+
+- certs are refetched once max-age has passed, or when a token names a key
+  the cached set lacks (a rotation); if Google cannot be reached the expired
+  certs are used for up to GOOGLE_CERTS_STALE_SECONDS more;
+- a verified token's claims are cached under its SHA-256 for
+  GOOGLE_VERIFIED_TOKEN_SECONDS (never past its expiry), so retries and
+  double submits skip the signature check.
+
+GOOGLE_ID_TOKEN_CERTS, a mapping of key ID to PEM certificate or public key,
+replaces Google's certs entirely; tests use it with a locally generated key.
+"""
+import hashlib
+import re
+import threading
+import time
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from google.auth import jwt
+from requests.adapters import HTTPAdapter
+
+GOOGLE_CERTS_URL = 'https://www.googleapis.com/oauth2/v1/certs'
+GOOGLE_ISSUERS = ('accounts.google.com', 'https://accounts.google.com')
+
+CERTS_KEY = 'google-certs:{url}'
+VERIFIED_TOKEN_KEY = 'google-id-token:{digest}'
+
+# Used when Google sends no max-age.
+DEFAULT_CERTS_MAX_AGE = 3600
+FETCH_TIMEOUT = 5
+CLOCK_SKEW_SECONDS = 10
+# Least time between fetches prompted by an unknown key ID.
+MIN_REFETCH_SECONDS = 60
+
+MAX_AGE = re.compile(r'max-age=(\d+)')
+
+# One pooled, keep-alive session per process.
+session = requests.Session()
+session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=10))
+
+_fetch_lock = threading.Lock()
+
+
+def certs_max_age(response):
+    match = MAX_AGE.search(response.headers.get('Cache-Control', ''))
+    return int(match.group(1)) if match else DEFAULT_CERTS_MAX_AGE
+
+
+class GoogleIDTokenVerifier:
+    """
+    Verify Google ID tokens for `client_id`. `certs`, if given, is used
+    instead of fetching `certs_url`.
+    """
+    def __init__(self, client_id, certs_url=GOOGLE_CERTS_URL, certs=None):
+        self.client_id = client_id
+        self.certs_url = certs_url
+        self.local_certs = certs
+
+    def verify(self, token):
+        """Return the token's claims. Raises ValueError if it is not valid."""
+        key = VERIFIED_TOKEN_KEY.format(
+            digest=hashlib.sha256(f'{self.client_id}:{token}'.encode()).hexdigest()
+        )
+        claims = cache.get(key)
+        if claims is not None:
+            return claims
+
+        key_id = jwt.decode_header(token).get('kid')
+        certs = self.get_certs()
+        if key_id not in certs and self.local_certs is None:
+            certs = self.get_certs(refresh=True)
+        claims = jwt.decode(
+            token, certs=certs, audience=self.client_id,
+            clock_skew_in_seconds=CLOCK_SKEW_SECONDS
+        )
+        if claims.get('iss') not in GOOGLE_ISSUERS:
+            raise ValueError('Invalid token issuer')
+
+        timeout = min(
+            getattr(settings, 'GOOGLE_VERIFIED_TOKEN_SECONDS', 0),
+            int(claims['exp'] - time.time())
+        )
+        if timeout > 0:
+            cache.set(key, claims, timeout)
+        return claims
+
+    def get_certs(self, refresh=False):
+        """Google's signing certs by key ID, from the cache while fresh."""
+        if self.local_certs is not None:
+            return self.local_certs
+
+        key = CERTS_KEY.format(url=self.certs_url)
+        cached = cache.get(key)
+        if cached is not None:
+            now = time.time()
+            if not refresh and cached['expires'] > now:
+                return cached['certs']
+            if refresh and now - cached['fetched'] < MIN_REFETCH_SECONDS:
+                # Unknown key IDs must not trigger a fetch per request.
+                return cached['certs']
+
+        with _fetch_lock:
+            # Another thread may have fetched them while this one waited.
+            latest = cache.get(key)
+            if latest is not None and latest != cached and latest['expires'] > time.time():
+                return latest['certs']
+            try:
+                response = session.get(self.certs_url, timeout=FETCH_TIMEOUT)
+                response.raise_for_status()
+                certs = response.json()
+            except (requests.RequestException, ValueError):
+                if cached is not None:
+                    return cached['certs']
+                raise ValueError('Could not fetch Google certificates')
+
+            max_age = certs_max_age(response)
+            now = time.time()
+            cache.set(
+                key,
+                {'certs': certs, 'fetched': now, 'expires': now + max_age},
+                max_age + getattr(settings, 'GOOGLE_CERTS_STALE_SECONDS', 0)
+            )
+            return certs
+
+
+def get_verifier():
+    """The verifier for the configured Google OAuth client."""
+    return GoogleIDTokenVerifier(
+        settings.SOCIALACCOUNT_PROVIDERS['google']['APP']['client_id'],
+        certs=getattr(settings, 'GOOGLE_ID_TOKEN_CERTS', None),
+    )
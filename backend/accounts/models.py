@@ -1,3 +1,31 @@
+from django.conf import settings
 from django.db import models
 
-# Create your models here.
+
+class TokenVersion(models.Model):
+    """
+    A user's token version: tokens issued with an older one are rejected
+    (see accounts.authentication).
+    """
+    # No foreign key constraint: the row outlives the user, so tokens of a
+    # deleted user stay revoked.
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        primary_key=True,
+        related_name='+',
+        on_delete=models.DO_NOTHING,
+        db_constraint=False
+    )
+    version = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.user_id} v{self.version}"
+
+
+class RevokedToken(models.Model):
+    """A single revoked access or refresh token, kept until it expires."""
+    jti = models.CharField(max_length=255, primary_key=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return self.jti
@@ -1,10 +1,10 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from dj_rest_auth.registration.serializers import RegisterSerializer as BaseRegisterSerializer
-from google.oauth2 import id_token
-from google.auth.transport import requests
 from django.conf import settings
 
+from .google import get_verifier
+
 User = get_user_model()
 
 
@@ -40,18 +40,8 @@ class GoogleAuthSerializer(serializers.Serializer):
             if not client_id:
                 raise serializers.ValidationError("Google OAuth is not configured")
 
-            # Verify the token
-            idinfo = id_token.verify_oauth2_token(
-                value,
-                requests.Request(),
-                client_id
-            )
-
-            # Verify the issuer
-            if idinfo['iss'] not in ['accounts.google.com', 'https://accounts.google.com']:
-                raise serializers.ValidationError('Invalid token issuer')
-
-            return idinfo
+            # Verify the signature, audience, expiry and issuer
+            return get_verifier().verify(value)
 
         except ValueError as e:
             raise serializers.ValidationError(f'Invalid token: {str(e)}')
@@ -0,0 +1,42 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .authentication import revoke_user_tokens
+
+User = get_user_model()
+
+# Changes to these fields revoke the user's tokens.
+SECURITY_FIELDS = ('password', 'is_active', 'is_staff', 'is_superuser')
+
+
+@receiver(pre_save, sender=User)
+def user_security_changing(sender, instance, update_fields=None, **kwargs):
+    """Note whether the save changes the user's password or permissions."""
+    instance._revoke_tokens = False
+    if instance._state.adding:
+        return
+    if update_fields is not None and not set(update_fields) & set(SECURITY_FIELDS):
+        return
+    fields = [
+        field for field in SECURITY_FIELDS
+        if field not in instance.get_deferred_fields()
+    ]
+    if not fields:
+        return
+    stored = User.objects.filter(pk=instance.pk).values_list(*fields).first()
+    instance._revoke_tokens = stored is not None and stored != tuple(
+        getattr(instance, field) for field in fields
+    )
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, **kwargs):
+    """Revoke the user's tokens, in the same transaction as a security change."""
+    if getattr(instance, '_revoke_tokens', False):
+        revoke_user_tokens(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    revoke_user_tokens(instance.pk)
@@ -1,3 +1,221 @@
-from django.test import TestCase
+import time
+from unittest import mock
 
-# Create your tests here.
+import requests
+import rsa
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from google.auth import crypt, jwt
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .authentication import ClaimsRefreshToken
+from .google import MIN_REFETCH_SECONDS, GoogleIDTokenVerifier
+
+User = get_user_model()
+
+
+class CachedJWTAuthenticationTests(APITestCase):
+    """Requests authenticate from token claims and honour revocation."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='owner', email='owner@example.com', password='pass',
+            first_name='Ada'
+        )
+        self.refresh = ClaimsRefreshToken.for_user(self.user)
+
+    def get(self, token, path='/api/auth/user/'):
+        return self.client.get(path, HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_no_user_query_to_authenticate(self):
+        access = self.refresh.access_token
+        # Profiles come from the database, not the token.
+        with CaptureQueriesContext(connection) as context:
+            response = self.get(access)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['first_name'], 'Ada')
+
+        # Revocation state is now cached. The claims user is a real User: it
+        # can own rows.
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(
+                '/api/projects/', {'name': 'Mine'},
+                HTTP_AUTHORIZATION=f'Bearer {access}'
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn('auth_user', context.captured_queries[0]['sql'])
+        self.assertFalse(any(
+            'accounts_' in query['sql'] for query in context.captured_queries
+        ))
+
+    def test_profile_changes_show_up_at_once(self):
+        access = self.refresh.access_token
+        response = self.client.patch(
+            '/api/auth/user/', {'first_name': 'New'},
+            HTTP_AUTHORIZATION=f'Bearer {access}'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['first_name'], 'New')
+        self.assertEqual(self.get(access).data['first_name'], 'New')
+
+    def test_tokens_without_claims_load_the_user(self):
+        response = self.get(AccessToken.for_user(self.user))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['email'], 'owner@example.com')
+
+    def test_logout_revokes_access_and_refresh_tokens(self):
+        access = self.refresh.access_token
+        response = self.client.post(
+            '/api/auth/logout/', {'refresh': str(self.refresh)},
+            HTTP_AUTHORIZATION=f'Bearer {access}'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get(access).status_code, 401)
+        response = self.client.post('/api/auth/token/refresh/', {'refresh': str(self.refresh)})
+        self.assertEqual(response.status_code, 401)
+
+        # Other sessions are unaffected.
+        fresh = ClaimsRefreshToken.for_user(self.user).access_token
+        self.assertEqual(self.get(fresh).status_code, 200)
+
+    def test_security_changes_revoke_every_token(self):
+        access = self.refresh.access_token
+        self.user.first_name = 'Grace'
+        self.user.save()
+        self.assertEqual(self.get(access).status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.set_password('changed')
+            self.user.save()
+        self.assertEqual(self.get(access).status_code, 401)
+        response = self.client.post('/api/auth/token/refresh/', {'refresh': str(self.refresh)})
+        self.assertEqual(response.status_code, 401)
+        fresh = ClaimsRefreshToken.for_user(self.user).access_token
+        self.assertEqual(self.get(fresh).status_code, 200)
+
+    def test_revocation_survives_cache_loss(self):
+        access = self.refresh.access_token
+        other = ClaimsRefreshToken.for_user(self.user)
+        self.client.post(
+            '/api/auth/logout/', {'refresh': str(self.refresh)},
+            HTTP_AUTHORIZATION=f'Bearer {access}'
+        )
+        # As if the entries were evicted, or read by another process.
+        cache.clear()
+        self.assertEqual(self.get(access).status_code, 401)
+        self.assertEqual(self.get(other.access_token).status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_staff = True
+            self.user.save()
+        cache.clear()
+        self.assertEqual(self.get(other.access_token).status_code, 401)
+        response = self.client.post('/api/auth/token/refresh/', {'refresh': str(other)})
+        self.assertEqual(response.status_code, 401)
+
+    def test_refresh_rotation_revokes_the_old_refresh_token(self):
+        response = self.client.post('/api/auth/token/refresh/', {'refresh': str(self.refresh)})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get(response.data['access']).status_code, 200)
+        response = self.client.post('/api/auth/token/refresh/', {'refresh': str(self.refresh)})
+        self.assertEqual(response.status_code, 401)
+
+    def test_login_issues_tokens_with_claims(self):
+        response = self.client.post(
+            '/api/auth/login/', {'email': 'owner@example.com', 'password': 'pass'}
+        )
+        self.assertEqual(response.status_code, 200)
+        token = AccessToken(response.data['access'])
+        self.assertEqual((token['is_active'], token['is_staff']), (True, False))
+        self.assertNotIn('email', token)
+
+
+GOOGLE_PROVIDERS = {'google': {'APP': {'client_id': 'client-id', 'secret': ''}}}
+
+
+class GoogleIDTokenTests(APITestCase):
+    """Google ID tokens are verified against cached certs."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        public_key, private_key = rsa.newkeys(1024)
+        cls.signer = crypt.RSASigner.from_string(private_key.save_pkcs1(), key_id='key-1')
+        cls.certs = {'key-1': public_key.save_pkcs1().decode()}
+
+    def setUp(self):
+        cache.clear()
+
+    def id_token(self, **claims):
+        now = int(time.time())
+        payload = {
+            'iss': 'https://accounts.google.com', 'aud': 'client-id', 'sub': '42',
+            'email': 'ada@example.com', 'given_name': 'Ada',
+            'iat': now, 'exp': now + 3600, **claims,
+        }
+        return jwt.encode(self.signer, payload).decode()
+
+    def certs_response(self, max_age=100):
+        response = mock.Mock(headers={'Cache-Control': f'public, max-age={max_age}'})
+        response.json.return_value = self.certs
+        return response
+
+    def test_sign_in_with_local_certs(self):
+        with override_settings(SOCIALACCOUNT_PROVIDERS=GOOGLE_PROVIDERS,
+                               GOOGLE_ID_TOKEN_CERTS=self.certs):
+            response = self.client.post('/api/auth/google/', {'id_token': self.id_token()})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data['user']['first_name'], 'Ada')
+
+            for claims in ({'aud': 'someone-else'}, {'iss': 'evil.example.com'},
+                           {'exp': int(time.time()) - 60}):
+                response = self.client.post(
+                    '/api/auth/google/', {'id_token': self.id_token(**claims)}
+                )
+                self.assertEqual(response.status_code, 400)
+
+    def test_verified_tokens_are_cached(self):
+        verifier = GoogleIDTokenVerifier('client-id', certs=self.certs)
+        token = self.id_token()
+        with override_settings(GOOGLE_VERIFIED_TOKEN_SECONDS=60), \
+                mock.patch('accounts.google.jwt.decode', wraps=jwt.decode) as decode:
+            for _ in range(3):
+                self.assertEqual(verifier.verify(token)['sub'], '42')
+            self.assertEqual(decode.call_count, 1)
+
+    @override_settings(GOOGLE_VERIFIED_TOKEN_SECONDS=0, GOOGLE_CERTS_STALE_SECONDS=3600)
+    def test_certs_follow_max_age(self):
+        verifier = GoogleIDTokenVerifier('client-id')
+        now = time.time()
+        with mock.patch('accounts.google.session.get') as get, \
+                mock.patch('accounts.google.time.time') as clock:
+            clock.return_value = now
+            get.return_value = self.certs_response(max_age=100)
+            verifier.verify(self.id_token())
+            verifier.verify(self.id_token(sub='43'))
+            self.assertEqual(get.call_count, 1)
+
+            # An unknown key ID refetches, but at most once a minute.
+            rotated = jwt.encode(
+                crypt.RSASigner(self.signer._key, key_id='key-2'), {'aud': 'client-id'}
+            ).decode()
+            with self.assertRaises(ValueError):
+                verifier.verify(rotated)
+            self.assertEqual(get.call_count, 1)
+            clock.return_value = now + MIN_REFETCH_SECONDS + 1
+            with self.assertRaises(ValueError):
+                verifier.verify(rotated)
+            self.assertEqual(get.call_count, 2)
+
+            # Past max-age they are refetched; if Google is unreachable the
+            # stale certs still verify.
+            clock.return_value = now + 500
+            get.side_effect = requests.ConnectionError
+            token = self.id_token(iat=int(now), exp=int(now) + 3600)
+            self.assertEqual(verifier.verify(token)['sub'], '42')
+            self.assertEqual(get.call_count, 3)
@@ -2,8 +2,14 @@ from rest_framework import status, generics
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.views import APIView
+from rest_framework_simplejwt.exceptions import TokenError
 from rest_framework_simplejwt.tokens import RefreshToken
+from dj_rest_auth.app_settings import api_settings as rest_auth_settings
+from dj_rest_auth.jwt_auth import get_refresh_view
+from dj_rest_auth.views import LogoutView as BaseLogoutView
+from dj_rest_auth.views import UserDetailsView as BaseUserDetailsView
 from django.contrib.auth import get_user_model
+from .authentication import ClaimsRefreshToken, TokenRefreshSerializer, revoke_token
 from .serializers import GoogleAuthSerializer, UserSerializer
 
 User = get_user_model()
@@ -23,7 +29,7 @@ class GoogleAuthView(APIView):
             user = serializer.save()
 
             # Generate JWT tokens
-            refresh = RefreshToken.for_user(user)
+            refresh = ClaimsRefreshToken.for_user(user)
             access_token = str(refresh.access_token)
             refresh_token = str(refresh)
 
@@ -43,4 +49,37 @@ class CurrentUserView(generics.RetrieveAPIView):
     serializer_class = UserSerializer
 
     def get_object(self):
-        return self.request.user
+        # request.user only carries the token's permission claims.
+        return User.objects.get(pk=self.request.user.pk)
+
+
+class UserDetailsView(BaseUserDetailsView):
+    """dj-rest-auth's user details, read from and saved to the stored user."""
+
+    def get_object(self):
+        return User.objects.get(pk=self.request.user.pk)
+
+
+class TokenRefreshView(get_refresh_view()):
+    """Token refresh that rejects revoked refresh tokens."""
+    serializer_class = TokenRefreshSerializer
+
+
+class LogoutView(BaseLogoutView):
+    """
+    Logout that also revokes the access token used and the refresh token
+    sent (in the body or the refresh cookie), so neither is accepted again.
+    """
+
+    def logout(self, request):
+        if request.auth is not None:
+            revoke_token(request.auth)
+        refresh = request.data.get('refresh') or request.COOKIES.get(
+            rest_auth_settings.JWT_AUTH_REFRESH_COOKIE or ''
+        )
+        if refresh:
+            try:
+                revoke_token(RefreshToken(refresh))
+            except TokenError:
+                pass
+        return super().logout(request)
@@ -14,6 +14,8 @@ from pathlib import Path
 from datetime import timedelta
 from decouple import config
 
+from .database import database_settings
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -75,6 +77,7 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "allauth.account.middleware.AccountMiddleware",
+    "projects.metrics.MetricsMiddleware",
 ]
 
 ROOT_URLCONF = "config.urls"
@@ -100,14 +103,52 @@ WSGI_APPLICATION = "config.wsgi.application"
 
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
+# DATABASE_URL selects PostgreSQL or SQLite (default: db.sqlite3); see
+# config/database.py for the connection tuning applied to each.
+
+DATABASE_OPTIONS = {
+    # Seconds to keep a connection open between requests. WSGI only: under
+    # ASGI (config/asgi.py) each request thread would keep its own, so leave
+    # it at 0 there and rely on DB_POOL.
+    'conn_max_age': config('DB_CONN_MAX_AGE', default=0, cast=int),
+    'health_checks': config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool),
+    # PostgreSQL: psycopg 3 connection pool (replaces DB_CONN_MAX_AGE).
+    'pool': config('DB_POOL', default=True, cast=bool),
+    'pool_min_size': config('DB_POOL_MIN_SIZE', default=2, cast=int),
+    'pool_max_size': config('DB_POOL_MAX_SIZE', default=10, cast=int),
+    # PostgreSQL: milliseconds before a statement is cancelled (0 disables).
+    'statement_timeout': config('DB_STATEMENT_TIMEOUT', default=30000, cast=int),
+    # SQLite: seconds a writer waits for the lock.
+    'busy_timeout': config('DB_BUSY_TIMEOUT', default=20, cast=int),
+}
 
 DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
-    }
+    "default": database_settings(
+        config('DATABASE_URL', default=''), base_dir=BASE_DIR, **DATABASE_OPTIONS
+    )
 }
 
+# Read replicas of the default database, as comma-separated URLs. API list
+# and retrieve requests read from one of them (see projects/replicas.py).
+DATABASE_REPLICA_URLS = config(
+    'DATABASE_REPLICA_URLS',
+    default='',
+    cast=lambda v: [s.strip() for s in v.split(',') if s.strip()]
+)
+for number, url in enumerate(DATABASE_REPLICA_URLS, 1):
+    DATABASES[f"replica_{number}"] = {
+        **database_settings(url, base_dir=BASE_DIR, **DATABASE_OPTIONS),
+        # Tests read the test primary through replica aliases.
+        "TEST": {"MIRROR": "default"},
+    }
+REPLICA_DATABASES = [alias for alias in DATABASES if alias != "default"]
+DATABASE_ROUTERS = ['projects.replicas.ReplicaRouter']
+
+# Seconds a user's reads stay on the primary after they write, and the
+# longest a response read from a replica is cached. Set it above the
+# replicas' usual replication lag.
+REPLICA_LAG_SECONDS = config('REPLICA_LAG_SECONDS', default=5, cast=int)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -161,14 +202,82 @@ CORS_ALLOW_CREDENTIALS = True
 # REST Framework Configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.CachedJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_PAGINATION_CLASS': 'projects.pagination.KeysetCursorPagination',
+    'PAGE_SIZE': 50,
 }
 
+# Cache
+# Uses Redis when REDIS_URL is set (requires the redis package), otherwise
+# the per-process local memory cache.
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# Seconds to keep cached project and sprint list/detail responses
+# (0 disables). Entries are invalidated by project version bumps, so use a
+# shared cache (Redis) when running several worker processes.
+RESPONSE_CACHE_TIMEOUT = config('RESPONSE_CACHE_TIMEOUT', default=0, cast=int)
+
+# Seconds to cache each user's accessible project IDs between requests
+# (0 disables; they are still memoized per request).
+PROJECT_ACCESS_CACHE_TIMEOUT = config('PROJECT_ACCESS_CACHE_TIMEOUT', default=0, cast=int)
+
+# Seconds to cache each user's dashboard summary (0 disables). Entries are
+# keyed by project versions, so writes to the user's projects invalidate
+# them; the short timeout bounds staleness across worker processes without
+# a shared cache.
+DASHBOARD_CACHE_TIMEOUT = config('DASHBOARD_CACHE_TIMEOUT', default=30, cast=int)
+
+# Send ETag/Last-Modified on API reads and honour If-None-Match, If-Match
+# and If-Modified-Since. Project and sprint validators include project
+# version tokens, so use a shared cache (Redis) with several worker processes.
+CONDITIONAL_REQUESTS = config('CONDITIONAL_REQUESTS', default=True, cast=bool)
+
+# Days deletions are kept for the changes feed. Older cursors are refused
+# (410) and clients resync; run `manage.py prune_tombstones` daily.
+CHANGES_RETENTION_DAYS = config('CHANGES_RETENTION_DAYS', default=30, cast=int)
+
+# Real-time board updates over WebSockets (config/asgi.py). The in-memory
+# broker only reaches clients connected to the publishing process; use
+# projects.realtime.RedisBroker with several worker processes.
+REALTIME_ENABLED = config('REALTIME_ENABLED', default=True, cast=bool)
+REALTIME_BROKER = config(
+    'REALTIME_BROKER',
+    default='projects.realtime.RedisBroker' if REDIS_URL else 'projects.realtime.InMemoryBroker'
+)
+
+# Per-view request metrics (projects/metrics.py): query counts and times,
+# serializer time and response sizes, served in the Prometheus format at
+# /internal/metrics/ to scrapers sending METRICS_TOKEN as a bearer token
+# (the endpoint is disabled while it is empty).
+METRICS_ENABLED = config('METRICS_ENABLED', default=True, cast=bool)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+# Add a Server-Timing header (query count and time, serializer and total
+# time) to every response.
+METRICS_SERVER_TIMING = config('METRICS_SERVER_TIMING', default=True, cast=bool)
+# Log a warning when one statement runs this many times in a request, as
+# an N+1 query does (0 disables).
+METRICS_DUPLICATE_QUERY_THRESHOLD = config(
+    'METRICS_DUPLICATE_QUERY_THRESHOLD', default=5, cast=int
+)
+
 # Simple JWT Configuration
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
@@ -184,8 +293,17 @@ SIMPLE_JWT = {
     'USER_ID_CLAIM': 'user_id',
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
     'TOKEN_TYPE_CLAIM': 'token_type',
+    'TOKEN_OBTAIN_SERIALIZER': 'accounts.authentication.TokenObtainPairSerializer',
 }
 
+# Seconds to cache users loaded for tokens that carry no user claims (0
+# disables). Tokens issued by this app carry them and need no lookup.
+AUTH_USER_CACHE_TIMEOUT = config('AUTH_USER_CACHE_TIMEOUT', default=0, cast=int)
+# Seconds each process caches token revocation state read from the
+# database. Without a shared cache (Redis), this is how long other worker
+# processes may still accept a revoked token.
+AUTH_REVOCATION_CACHE_TIMEOUT = config('AUTH_REVOCATION_CACHE_TIMEOUT', default=30, cast=int)
+
 # Django AllAuth Configuration (Headless Mode for API)
 ACCOUNT_AUTHENTICATION_METHOD = 'email'
 ACCOUNT_EMAIL_REQUIRED = True
@@ -218,6 +336,12 @@ SOCIALACCOUNT_PROVIDERS = {
     }
 }
 
+# Google ID token verification (see accounts.google): seconds to keep
+# verified tokens, and to keep using Google's certs past their max-age when
+# they cannot be refetched.
+GOOGLE_VERIFIED_TOKEN_SECONDS = config('GOOGLE_VERIFIED_TOKEN_SECONDS', default=60, cast=int)
+GOOGLE_CERTS_STALE_SECONDS = config('GOOGLE_CERTS_STALE_SECONDS', default=6 * 3600, cast=int)
+
 # dj-rest-auth Configuration
 REST_AUTH = {
     'USE_JWT': True,
@@ -225,6 +349,7 @@ REST_AUTH = {
     'JWT_AUTH_REFRESH_COOKIE': 'refresh-token',
     'JWT_AUTH_HTTPONLY': False,  # Set to True in production with proper HTTPS
     'USER_DETAILS_SERIALIZER': 'accounts.serializers.UserSerializer',
+    'JWT_TOKEN_CLAIMS_SERIALIZER': 'accounts.authentication.TokenObtainPairSerializer',
     'REGISTER_SERIALIZER': 'accounts.serializers.RegisterSerializer',
 }
 
@@ -18,10 +18,21 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from accounts.views import LogoutView, TokenRefreshView, UserDetailsView
+from projects.metrics import metrics_view
+
 urlpatterns = [
     path("admin/", admin.site.urls),
 
+    # Prometheus scrape endpoint, for requests bearing METRICS_TOKEN.
+    path("internal/metrics/", metrics_view, name='metrics'),
+
     # Authentication endpoints
+    # Revocation-aware replacements for dj-rest-auth's logout and refresh,
+    # and user details loaded from the database rather than token claims.
+    path("api/auth/logout/", LogoutView.as_view(), name='rest_logout'),
+    path("api/auth/token/refresh/", TokenRefreshView.as_view(), name='token_refresh'),
+    path("api/auth/user/", UserDetailsView.as_view(), name='rest_user_details'),
     path("api/auth/", include('dj_rest_auth.urls')),
     path("api/auth/registration/", include('dj_rest_auth.registration.urls')),
     path("api/auth/", include('accounts.urls')),
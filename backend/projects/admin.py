@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Project, Sprint, Task, Comment
+from .models import Project, Sprint, Task, Comment, Tombstone
 
 
 @admin.register(Project)
@@ -39,3 +39,12 @@ class CommentAdmin(admin.ModelAdmin):
     def text_preview(self, obj):
         return obj.text[:50] + '...' if len(obj.text) > 50 else obj.text
     text_preview.short_description = 'Text Preview'
+
+
+@admin.register(Tombstone)
+class TombstoneAdmin(admin.ModelAdmin):
+    list_display = ['kind', 'object_id', 'project', 'deleted_at']
+    list_filter = ['kind', 'deleted_at']
+    search_fields = ['object_id', 'project__name']
+    readonly_fields = ['id', 'deleted_at']
+    list_select_related = ['project']
@@ -0,0 +1,193 @@
+"""
+Sprint analytics: daily burndown, velocity and cycle time.
+
+Everything is computed from the TaskStatusEvent log, which holds every
+task's status and sprint after each change. A sprint's analytics read the
+events of every task that was ever in it with one indexed query, ordered by
+task and time, and walk them once:
+
+- Burndown: each event opens an interval, lasting until the task's next
+  event, during which the task is in some sprint and status. Intervals in
+  this sprint with an unfinished status are added to per-day difference
+  arrays (+points on the first day, -points on the day the interval ends),
+  and a running sum turns those into the remaining work at the end of each
+  day. The cost follows the number of events, not events times days.
+- Cycle time: the same intervals summed per task and status give the time
+  spent in each status; a task's cycle time runs from first leaving the
+  backlog to first being deployed.
+- Velocity comes from the deployed counters the completed sprints already
+  store (see projects.counters), one query for the last few sprints.
+
+Live analytics cost those two queries. When a sprint is completed the
+result is stored in SprintAnalytics, so reading it again is a single lookup
+by primary key.
+"""
+import statistics
+from datetime import timedelta
+from itertools import accumulate, groupby
+from operator import itemgetter
+
+from django.utils import timezone
+
+from .models import Sprint, SprintAnalytics, Task, TaskStatusEvent
+
+# Completed sprints averaged for velocity.
+VELOCITY_SPRINTS = 5
+
+DONE_STATUS = 'deployed'
+
+
+def sprint_events(sprint):
+    """Events of every task that was ever in the sprint, by task and time."""
+    task_ids = TaskStatusEvent.objects.filter(sprint=sprint).values('task_id')
+    return list(
+        TaskStatusEvent.objects.filter(task_id__in=task_ids)
+        .order_by('task_id', 'changed_at')
+        .values_list('task_id', 'sprint_id', 'status', 'story_points', 'changed_at')
+    )
+
+
+def task_intervals(events):
+    """
+    Yield (task_id, sprint_id, status, story_points, started, ended) for
+    every event, where `ended` is the time of the task's next event (None
+    for its latest one).
+    """
+    for task_id, rows in groupby(events, key=itemgetter(0)):
+        rows = list(rows)
+        ends = [row[4] for row in rows[1:]] + [None]
+        for (_, sprint_id, status, story_points, started), ended in zip(rows, ends):
+            yield task_id, sprint_id, status, story_points, started, ended
+
+
+def burndown(sprint, events, today):
+    """
+    Remaining story points and tasks at the end of each sprint day, with
+    the ideal line from the points remaining on the first day. Days after
+    `today` have no remaining values yet.
+    """
+    days = (sprint.end_date - sprint.start_date).days + 1
+
+    def day(moment):
+        index = (timezone.localdate(moment) - sprint.start_date).days
+        return min(max(index, 0), days)
+
+    points = [0] * (days + 1)
+    tasks = [0] * (days + 1)
+    for _, sprint_id, status, story_points, started, ended in task_intervals(events):
+        if sprint_id != sprint.pk or status == DONE_STATUS:
+            continue
+        first = day(started)
+        last = days if ended is None else day(ended)
+        if first < last:
+            points[first] += story_points or 0
+            points[last] -= story_points or 0
+            tasks[first] += 1
+            tasks[last] -= 1
+
+    remaining_points = list(accumulate(points[:days]))
+    remaining_tasks = list(accumulate(tasks[:days]))
+    committed = remaining_points[0] if days else 0
+    elapsed = (today - sprint.start_date).days + 1
+    return [
+        {
+            'date': sprint.start_date + timedelta(days=index),
+            'remaining_points': remaining_points[index] if index < elapsed else None,
+            'remaining_tasks': remaining_tasks[index] if index < elapsed else None,
+            'ideal_points': round(committed * (1 - index / max(days - 1, 1)), 1),
+        }
+        for index in range(days)
+    ]
+
+
+def duration_stats(durations):
+    hours = [duration.total_seconds() / 3600 for duration in durations]
+    if not hours:
+        return {'tasks': 0, 'mean_hours': None, 'median_hours': None}
+    return {
+        'tasks': len(hours),
+        'mean_hours': round(statistics.fmean(hours), 1),
+        'median_hours': round(statistics.median(hours), 1),
+    }
+
+
+def cycle_time(events):
+    """
+    Time spent in each status, and from first leaving the backlog to first
+    being deployed, summarized over the tasks. Only finished intervals
+    count: time in a task's current status is still running.
+    """
+    in_status = {}
+    started_work = {}
+    cycles = []
+    for task_id, _, status, _, started, ended in task_intervals(events):
+        if status not in ('backlog', DONE_STATUS):
+            started_work.setdefault(task_id, started)
+        if status == DONE_STATUS and started_work.get(task_id) is not None:
+            cycles.append(started - started_work[task_id])
+            started_work[task_id] = None
+        if ended is not None:
+            spent = in_status.setdefault(status, {})
+            spent[task_id] = spent.get(task_id, timedelta()) + (ended - started)
+
+    return {
+        'statuses': {
+            status: duration_stats(in_status.get(status, {}).values())
+            for status, _ in Task.STATUS_CHOICES if status != DONE_STATUS
+        },
+        'cycle': duration_stats(cycles),
+    }
+
+
+def velocity(sprint, count=VELOCITY_SPRINTS):
+    """
+    Points and tasks deployed in the last `count` completed sprints of the
+    project ending no later than this one, latest first.
+    """
+    sprints = list(
+        Sprint.objects.filter(
+            project_id=sprint.project_id,
+            status='completed',
+            end_date__lte=sprint.end_date,
+        )
+        .order_by('-end_date')
+        .values('id', 'name', 'end_date', 'points_deployed', 'tasks_deployed')[:count]
+    )
+    return {
+        'sprints': [
+            {
+                'id': row['id'],
+                'name': row['name'],
+                'end_date': row['end_date'],
+                'points': row['points_deployed'],
+                'tasks': row['tasks_deployed'],
+            }
+            for row in sprints
+        ],
+        'average_points': (
+            round(statistics.fmean(row['points_deployed'] for row in sprints), 1)
+            if sprints else None
+        ),
+    }
+
+
+def sprint_analytics(sprint, today=None):
+    """Return the sprint's analytics as a JSON-serializable dict."""
+    today = today or timezone.localdate()
+    events = sprint_events(sprint)
+    return {
+        'sprint': sprint.pk,
+        'start_date': sprint.start_date,
+        'end_date': sprint.end_date,
+        'burndown': burndown(sprint, events, today),
+        'velocity': velocity(sprint),
+        'cycle_time': cycle_time(events),
+    }
+
+
+def materialize(sprint):
+    """Compute and store the analytics of a completed sprint."""
+    analytics, _ = SprintAnalytics.objects.update_or_create(
+        sprint=sprint, defaults={'data': sprint_analytics(sprint)}
+    )
+    return analytics
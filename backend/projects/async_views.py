@@ -0,0 +1,96 @@
+"""
+Async (ASGI-native) variants of the hot read endpoints.
+
+Served under ASGI, these handle the project list, task list and board
+without holding a worker thread while the database works: rows come from
+the async ORM, and independent lookups (the ETag aggregate and the
+membership load) are awaited together. They reuse the viewsets' querysets,
+filters, permissions, serializers, conditional requests and response
+caching, so they return the same payloads as the sync routes, which stay in
+place.
+
+Django's async ORM still runs each query through sync_to_async, one at a
+time per request, so awaiting queries together frees the event loop for
+other requests rather than overlapping them on one connection. See the
+benchmark_reads command for a throughput comparison.
+"""
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.http import Http404
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET
+from rest_framework.response import Response
+
+from .membership import aget_project_access
+
+
+class AsyncReadMixin:
+    """
+    Async counterparts of the viewset read paths, for use with
+    async_action().
+    """
+    async def afilter_queryset(self):
+        # Filter validation can look up related rows (ModelChoiceFilter).
+        return await sync_to_async(self.filter_queryset)(self.get_queryset())
+
+    async def aget_object(self):
+        """get_object() with the async ORM."""
+        queryset = await self.afilter_queryset()
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            obj = await queryset.aget(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            )
+        except (queryset.model.DoesNotExist, TypeError, ValueError,
+                DjangoValidationError):
+            raise Http404
+        # Load membership here so the permission checks do not query.
+        await aget_project_access(self.request)
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+    async def alist(self, request, *args, **kwargs):
+        queryset = await self.afilter_queryset()
+        if self.paginator is not None:
+            page = await self.paginator.apaginate_queryset(queryset, request, view=self)
+            if page is not None:
+                serializer = self.get_serializer(page, many=True)
+                return self.get_paginated_response(serializer.data)
+
+        serializer = self.get_serializer([obj async for obj in queryset], many=True)
+        return Response(serializer.data)
+
+
+def async_action(viewset_class, action, handler, detail=False):
+    """
+    Return an async view that runs `handler` (a coroutine method of
+    `viewset_class`) for GET requests, with the viewset's authentication,
+    permissions and exception handling.
+    """
+    @csrf_exempt
+    @require_GET
+    async def view(request, *args, **kwargs):
+        viewset = viewset_class(
+            name=None, description=None, suffix=None,
+            detail=detail, basename=None,
+            action_map={'get': action},
+        )
+        viewset.args = args
+        viewset.kwargs = kwargs
+        viewset.format_kwarg = None
+        viewset.headers = viewset.default_response_headers
+        request = viewset.initialize_request(request, *args, **kwargs)
+        viewset.request = request
+
+        try:
+            # Authentication and throttling are sync and may query.
+            await sync_to_async(viewset.initial)(request, *args, **kwargs)
+            response = await getattr(viewset, handler)(request, *args, **kwargs)
+        except Exception as exc:
+            response = viewset.handle_exception(exc)
+        return viewset.finalize_response(request, response, *args, **kwargs)
+
+    # As on DRF views; request metrics label the route by its handler.
+    view.cls = viewset_class
+    view.actions = {'get': handler}
+    return view
@@ -0,0 +1,100 @@
+"""
+Compact board payload for a project.
+
+Tasks are projected with .values() (no model instances or nested
+serializers), comment counts are annotated, and the users referenced by the
+tasks are returned once in a map keyed by ID. The whole board costs one
+query for the tasks and one for the users.
+"""
+from django.contrib.auth import get_user_model
+from django.db.models import Count
+from django.db.models.functions import Substr
+
+from .models import Task
+
+User = get_user_model()
+
+# TaskCard shows the first 100 characters and an ellipsis past that.
+DESCRIPTION_PREVIEW_LENGTH = 101
+
+TASK_FIELDS = [
+    'id', 'title', 'status', 'priority', 'story_points', 'order',
+    'sprint_id', 'assigned_to_id', 'created_by_id', 'created_at', 'updated_at',
+]
+
+USER_FIELDS = ['id', 'email', 'first_name', 'last_name']
+
+
+def board_tasks(project_id, sprint=None):
+    """
+    Return the board's task rows as dicts.
+
+    `sprint` may be a sprint ID, 'backlog' for tasks without a sprint, or
+    None for every task in the project.
+    """
+    tasks = Task.objects.filter(project_id=project_id)
+    if sprint == 'backlog':
+        tasks = tasks.filter(sprint__isnull=True)
+    elif sprint:
+        tasks = tasks.filter(sprint_id=sprint)
+
+    return tasks.annotate(
+        comments_count=Count('comments'),
+        description_preview=Substr('description', 1, DESCRIPTION_PREVIEW_LENGTH),
+    ).order_by('order', '-created_at', 'id').values(
+        *TASK_FIELDS, 'comments_count', 'description_preview'
+    )
+
+
+def build_board(rows, users):
+    """Group projected task rows by status, keyed like TaskSerializer fields."""
+    columns = {status: [] for status, _ in Task.STATUS_CHOICES}
+    for row in rows:
+        columns[row['status']].append({
+            'id': row['id'],
+            'title': row['title'],
+            'description_preview': row['description_preview'],
+            'status': row['status'],
+            'priority': row['priority'],
+            'story_points': row['story_points'],
+            'order': row['order'],
+            'sprint': row['sprint_id'],
+            'assigned_to': row['assigned_to_id'],
+            'created_by': row['created_by_id'],
+            'comments_count': row['comments_count'],
+            'created_at': row['created_at'],
+            'updated_at': row['updated_at'],
+        })
+    return {
+        'columns': columns,
+        'users': {str(user['id']): user for user in users},
+    }
+
+
+def referenced_user_ids(rows):
+    user_ids = set()
+    for row in rows:
+        user_ids.add(row['created_by_id'])
+        if row['assigned_to_id'] is not None:
+            user_ids.add(row['assigned_to_id'])
+    return user_ids
+
+
+def get_board(project_id, sprint=None):
+    """Build the board payload for a project with two queries."""
+    rows = list(board_tasks(project_id, sprint))
+    users = User.objects.filter(
+        id__in=referenced_user_ids(rows)
+    ).values(*USER_FIELDS)
+    return build_board(rows, users)
+
+
+async def aget_board(project_id, sprint=None):
+    """get_board() with the async ORM."""
+    rows = [row async for row in board_tasks(project_id, sprint).aiterator()]
+    users = [
+        user async for user in User.objects.filter(
+            id__in=referenced_user_ids(rows)
+        ).values(*USER_FIELDS).aiterator()
+    ]
+    return build_board(rows, users)
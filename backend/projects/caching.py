@@ -0,0 +1,188 @@
+"""
+Versioned response caching for project and sprint reads.
+
+Every project has a version token in the cache that is replaced whenever
+the project, its sprints, tasks, comments or members change (see
+projects.signals). Cached responses are keyed by the request path and the
+versions of the projects the response depends on, so a write never has to
+find and delete stale entries: it just makes them unreachable.
+
+A cache hit needs the user's accessible projects (memoized, and cached when
+PROJECT_ACCESS_CACHE_TIMEOUT is set) and a get_many of version tokens, so
+with the access cache enabled it is served without touching the ORM. The
+response's ETag is cached with it, so revalidation against a hit can be
+answered with 304 Not Modified without the ORM either.
+"""
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponseNotModified
+from django.utils.cache import get_conditional_response
+from rest_framework.response import Response
+
+from .membership import aget_project_access, get_project_access
+from .replicas import replica_cache_timeout
+
+VERSION_KEY = 'project-version:{project_id}'
+RESPONSE_KEY = 'response:{digest}'
+
+# Validators stored with cached data so hits can still answer revalidation.
+CACHED_HEADERS = ('ETag', 'Last-Modified', 'Cache-Control')
+
+
+def bump_project_versions(project_ids):
+    """Invalidate every cached response that depends on these projects."""
+    cache.set_many(
+        {
+            VERSION_KEY.format(project_id=project_id): uuid.uuid4().hex
+            for project_id in project_ids if project_id is not None
+        },
+        timeout=None
+    )
+
+
+def get_project_versions(project_ids):
+    """Return {project_id: version token}, creating missing tokens."""
+    keys = {VERSION_KEY.format(project_id=project_id): project_id
+            for project_id in project_ids}
+    found = cache.get_many(keys)
+    missing = {key: uuid.uuid4().hex for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        found.update(missing)
+    return {keys[key]: version for key, version in found.items()}
+
+
+async def aget_project_versions(project_ids):
+    """get_project_versions() for async views."""
+    keys = {VERSION_KEY.format(project_id=project_id): project_id
+            for project_id in project_ids}
+    found = await cache.aget_many(keys)
+    missing = {key: uuid.uuid4().hex for key in keys if key not in found}
+    if missing:
+        await cache.aset_many(missing, timeout=None)
+        found.update(missing)
+    return {keys[key]: version for key, version in found.items()}
+
+
+def response_cache_key(request, project_ids, versions=None):
+    if versions is None:
+        versions = get_project_versions(project_ids)
+    parts = [request.get_full_path()]
+    parts.extend(
+        f'{project_id}:{versions[project_id]}'
+        for project_id in sorted(versions, key=str)
+    )
+    digest = hashlib.sha256('|'.join(parts).encode()).hexdigest()
+    return RESPONSE_KEY.format(digest=digest)
+
+
+class ProjectVersionedMixin:
+    """
+    Viewset mixin naming the projects whose versions a response depends on.
+    """
+    def get_cache_project_ids(self, access):
+        """
+        Return the IDs of the projects the response depends on, or None to
+        skip version-based caching for this request.
+
+        Defaults to the `project_id` query parameter when given, otherwise
+        every project the user can access.
+        """
+        project_id = self.request.query_params.get('project_id')
+        if not project_id:
+            return access.member_ids
+        try:
+            project_id = uuid.UUID(project_id)
+        except ValueError:
+            return None
+        if not access.is_member(project_id):
+            return None
+        return [project_id]
+
+
+class CachedResponseMixin(ProjectVersionedMixin):
+    """
+    Viewset mixin caching the data of safe `cached_actions` responses.
+    """
+    cached_actions = ['list', 'retrieve']
+
+    def get_cached_response(self, request, respond):
+        timeout = getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 0)
+        if not timeout or self.action not in self.cached_actions:
+            return respond()
+
+        project_ids = self.get_cache_project_ids(get_project_access(request))
+        if project_ids is None:
+            return respond()
+
+        key = response_cache_key(request, project_ids)
+        cached = cache.get(key)
+        if cached is not None:
+            return self.cached_response(request, cached)
+
+        response = respond()
+        if response.status_code == 200:
+            cache.set(key, self.cache_entry(response), replica_cache_timeout(timeout))
+        return response
+
+    async def aget_cached_response(self, request, respond):
+        """get_cached_response() for async views; `respond` is a coroutine function."""
+        timeout = getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 0)
+        if not timeout or self.action not in self.cached_actions:
+            return await respond()
+
+        project_ids = self.get_cache_project_ids(await aget_project_access(request))
+        if project_ids is None:
+            return await respond()
+
+        key = response_cache_key(
+            request, project_ids, await aget_project_versions(project_ids)
+        )
+        cached = await cache.aget(key)
+        if cached is not None:
+            return self.cached_response(request, cached)
+
+        response = await respond()
+        if response.status_code == 200:
+            await cache.aset(
+                key, self.cache_entry(response), replica_cache_timeout(timeout)
+            )
+        return response
+
+    @staticmethod
+    def cache_entry(response):
+        headers = {
+            header: response[header] for header in CACHED_HEADERS
+            if header in response
+        }
+        return response.data, headers
+
+    @staticmethod
+    def cached_response(request, cached):
+        data, headers = cached
+        etag = headers.get('ETag')
+        if etag and get_conditional_response(request, etag=etag) is not None:
+            response = HttpResponseNotModified()
+        else:
+            response = Response(data)
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            request, lambda: super(CachedResponseMixin, self).list(request, *args, **kwargs)
+        )
+
+    async def alist(self, request, *args, **kwargs):
+        return await self.aget_cached_response(
+            request, lambda: super(CachedResponseMixin, self).alist(request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            request, lambda: super(CachedResponseMixin, self).retrieve(request, *args, **kwargs)
+        )
@@ -0,0 +1,111 @@
+"""
+Incremental sync of a project's tasks, sprints and comments.
+
+A cursor is an opaque timestamp. Rows changed after it are found through the
+(project, updated_at) indexes, and deletions through tombstones written by
+projects.signals, so polling an unchanged project costs four small index
+range scans. Every write path touches updated_at, including bulk updates and
+counter changes on sprints.
+
+There is no full dump: a client without a cursor asks for one first, then
+loads the current rows from the paginated list endpoints, then polls with
+the cursor. Tombstones are kept for CHANGES_RETENTION_DAYS (see
+prune_tombstones()); an older cursor is expired and the client must start
+over.
+
+The returned cursor trails the current time by CURSOR_OVERLAP so that rows
+written by transactions still in flight are not skipped. Rows near the
+cursor can therefore be returned twice; clients should upsert by ID.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Comment, Sprint, Task, Tombstone
+from .serializers import CommentSerializer, SprintSerializer, TaskSerializer
+
+CURSOR_OVERLAP = timedelta(seconds=5)
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def encode_cursor(moment):
+    return str((moment - EPOCH) // timedelta(microseconds=1))
+
+
+def decode_cursor(cursor):
+    """Return the cursor's timestamp; raises ValueError if malformed."""
+    microseconds = int(cursor)
+    if microseconds < 0:
+        raise ValueError(cursor)
+    return EPOCH + timedelta(microseconds=microseconds)
+
+
+def retention():
+    """How long deletions are remembered, and so how old a cursor may be."""
+    return timedelta(days=getattr(settings, 'CHANGES_RETENTION_DAYS', 30))
+
+
+def start_cursor():
+    """The cursor to poll from after loading the current rows."""
+    return encode_cursor(timezone.now() - CURSOR_OVERLAP)
+
+
+def cursor_expired(since):
+    """Whether deletions after `since` may already have been pruned."""
+    return since < timezone.now() - retention()
+
+
+def prune_tombstones():
+    """Delete tombstones past the retention period; returns how many."""
+    deleted, _ = Tombstone.objects.filter(
+        deleted_at__lt=timezone.now() - retention()
+    ).delete()
+    return deleted
+
+
+def get_changes(project_id, since, context=None):
+    """
+    Return the project's tasks, sprints and comments created, updated or
+    deleted after `since` and the cursor to pass next time.
+    """
+    now = timezone.now()
+    tasks = Task.objects.filter(
+        project_id=project_id, updated_at__gt=since
+    ).with_details()
+    sprints = Sprint.objects.filter(project_id=project_id, updated_at__gt=since)
+    comments = Comment.objects.filter(
+        project_id=project_id, updated_at__gt=since
+    ).select_related('user')
+    tombstones = Tombstone.objects.filter(project_id=project_id, deleted_at__gt=since)
+
+    changes = {}
+    present = set()
+    for kind, queryset, serializer_class in (
+        ('tasks', tasks, TaskSerializer),
+        ('sprints', sprints, SprintSerializer),
+        ('comments', comments, CommentSerializer),
+    ):
+        objects = list(queryset.order_by('updated_at'))
+        present.update(obj.id for obj in objects)
+        rows = serializer_class(objects, many=True, context=context).data
+        created, updated = [], []
+        for obj, row in zip(objects, rows):
+            if obj.created_at > since:
+                created.append(row)
+            else:
+                updated.append(row)
+        changes[kind] = {'created': created, 'updated': updated, 'deleted': []}
+
+    deleted = defaultdict(list)
+    for kind, object_id in tombstones.values_list('kind', 'object_id'):
+        # A row that is back (e.g. a task moved out and in again) wins.
+        if object_id not in present:
+            deleted[f'{kind}s'].append(object_id)
+    for kind, object_ids in deleted.items():
+        changes[kind]['deleted'] = object_ids
+
+    cursor = max(now - CURSOR_OVERLAP, since)
+    return {'cursor': encode_cursor(cursor), **changes}
@@ -0,0 +1,225 @@
+"""
+Conditional requests: ETag and Last-Modified validators for list and detail
+reads, If-None-Match / If-Modified-Since revalidation, and If-Match
+preconditions on writes.
+
+Validators are computed before anything is serialized. A list's ETag comes
+from one aggregate over the filtered queryset (latest updated_at and row
+count); a detail's from the object's updated_at. Projects and sprints also
+mix in their project's version token (see projects.caching), since their
+payloads carry counters and nested rows that change without touching their
+own updated_at. Tasks cover their comments because comment writes touch the
+task (see projects.signals).
+
+Version tokens live in the cache, so run a shared cache (Redis) when
+several worker processes serve the API.
+
+Reads served from a replica (see projects.replicas) carry no validators and
+are never answered with 304: computed from a lagging replica, an ETag could
+stay the same over stale rows long after the lag is gone.
+"""
+import asyncio
+import hashlib
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from .caching import ProjectVersionedMixin, aget_project_versions, get_project_versions
+from .membership import aget_project_access, get_project_access
+from .permissions import get_project_id
+from .replicas import reading_from_replica
+
+CONDITIONAL_HEADERS = ('HTTP_IF_NONE_MATCH', 'HTTP_IF_MODIFIED_SINCE')
+
+LIST_STATS = {'last_modified': Max('updated_at'), 'count': Count('pk')}
+
+
+class PreconditionFailed(APIException):
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = 'The resource has been modified.'
+    default_code = 'precondition_failed'
+
+
+def conditional_requests_enabled():
+    return getattr(settings, 'CONDITIONAL_REQUESTS', True)
+
+
+def validators_enabled():
+    """Whether this request's reads can be trusted for validators."""
+    return conditional_requests_enabled() and not reading_from_replica()
+
+
+def make_etag(*parts):
+    digest = hashlib.sha256('|'.join(str(part) for part in parts).encode())
+    return quote_etag(digest.hexdigest()[:32])
+
+
+def set_validators(response, etag, last_modified=None):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    # Let clients keep the body but always revalidate it.
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+class ConditionalRequestMixin(ProjectVersionedMixin):
+    """
+    Viewset mixin adding validators to list/retrieve responses, answering
+    revalidation with 304 Not Modified, and checking If-Match on
+    `precondition_actions`.
+    """
+    etag_includes_project_version = False
+    precondition_actions = ['update', 'partial_update', 'move']
+
+    def get_list_validators(self, request):
+        """Return (etag, last_modified) for the list, or (None, None)."""
+        queryset = self.filter_queryset(self.get_queryset())
+        stats = queryset.aggregate(**LIST_STATS)
+        versions = {}
+        if self.etag_includes_project_version:
+            project_ids = self.get_cache_project_ids(get_project_access(request))
+            if project_ids is None:
+                return None, None
+            versions = get_project_versions(project_ids)
+        return self.list_validators(request, stats, versions)
+
+    async def aget_list_validators(self, request):
+        """
+        get_list_validators() for async views. The aggregate and the
+        membership load are independent, so they are awaited together.
+        """
+        queryset = await sync_to_async(self.filter_queryset)(self.get_queryset())
+        if not self.etag_includes_project_version:
+            return self.list_validators(request, await queryset.aaggregate(**LIST_STATS), {})
+
+        stats, access = await asyncio.gather(
+            queryset.aaggregate(**LIST_STATS), aget_project_access(request)
+        )
+        project_ids = self.get_cache_project_ids(access)
+        if project_ids is None:
+            return None, None
+        versions = await aget_project_versions(project_ids)
+        return self.list_validators(request, stats, versions)
+
+    def list_validators(self, request, stats, versions):
+        parts = [request.get_full_path(), request.user.pk,
+                 stats['last_modified'], stats['count']]
+        parts.extend(
+            f'{project_id}:{versions[project_id]}'
+            for project_id in sorted(versions, key=str)
+        )
+        return make_etag(*parts), stats['last_modified']
+
+    def get_object_etag(self, pk, updated_at, project_id):
+        parts = [self.get_queryset().model._meta.label, pk, updated_at]
+        if self.etag_includes_project_version:
+            parts.append(get_project_versions([project_id])[project_id])
+        return make_etag(*parts)
+
+    def get_object_validators(self, obj):
+        etag = self.get_object_etag(obj.pk, obj.updated_at, get_project_id(obj))
+        return etag, obj.updated_at
+
+    def lookup_object_validators(self):
+        """
+        Return (etag, last_modified) for the requested object from a
+        projection of its updated_at, or (None, None) if it is not found.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        project_path = queryset.project_path
+        project_field = f'{project_path}_id' if project_path else 'pk'
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            row = queryset.filter(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            ).values_list('pk', 'updated_at', project_field).first()
+        except (TypeError, ValueError, DjangoValidationError):
+            row = None
+        if row is None:
+            return None, None
+        pk, updated_at, project_id = row
+        return self.get_object_etag(pk, updated_at, project_id), updated_at
+
+    def get_not_modified(self, request, etag, last_modified):
+        # Last-Modified alone misses counter and nested changes on versioned
+        # payloads, so If-Modified-Since is only honoured where it is exact.
+        if self.etag_includes_project_version:
+            last_modified = None
+        return get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=last_modified.timestamp() if last_modified else None
+        )
+
+    def get_object(self):
+        obj = super().get_object()
+        self._conditional_object = obj
+        if (self.action in self.precondition_actions
+                and 'HTTP_IF_MATCH' in self.request.META):
+            etag, _ = self.get_object_validators(obj)
+            expected = parse_etags(self.request.META['HTTP_IF_MATCH'])
+            if '*' not in expected and etag not in expected:
+                raise PreconditionFailed(
+                    {'error': 'The resource has been modified.'}
+                )
+        return obj
+
+    def list(self, request, *args, **kwargs):
+        if not validators_enabled():
+            return super().list(request, *args, **kwargs)
+
+        etag, last_modified = self.get_list_validators(request)
+        if etag is None:
+            return super().list(request, *args, **kwargs)
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return set_validators(not_modified, etag, last_modified)
+        response = super().list(request, *args, **kwargs)
+        return set_validators(response, etag, last_modified)
+
+    async def alist(self, request, *args, **kwargs):
+        if not validators_enabled():
+            return await super().alist(request, *args, **kwargs)
+
+        etag, last_modified = await self.aget_list_validators(request)
+        if etag is None:
+            return await super().alist(request, *args, **kwargs)
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return set_validators(not_modified, etag, last_modified)
+        response = await super().alist(request, *args, **kwargs)
+        return set_validators(response, etag, last_modified)
+
+    def retrieve(self, request, *args, **kwargs):
+        if not validators_enabled():
+            return super().retrieve(request, *args, **kwargs)
+
+        if any(header in request.META for header in CONDITIONAL_HEADERS):
+            etag, last_modified = self.lookup_object_validators()
+            if etag is not None:
+                not_modified = self.get_not_modified(request, etag, last_modified)
+                if not_modified is not None:
+                    return set_validators(not_modified, etag, last_modified)
+
+        self._conditional_object = None
+        response = super().retrieve(request, *args, **kwargs)
+        if response.status_code == 200 and self._conditional_object is not None:
+            set_validators(response, *self.get_object_validators(self._conditional_object))
+        return response
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        obj = getattr(self, '_conditional_object', None)
+        if (obj is not None and self.action in self.precondition_actions
+                and response.status_code == status.HTTP_200_OK
+                and conditional_requests_enabled()):
+            # Hand back the validator for the new state so the client can
+            # chain the next If-Match.
+            set_validators(response, *self.get_object_validators(obj))
+        return super().finalize_response(request, response, *args, **kwargs)
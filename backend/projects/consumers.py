@@ -0,0 +1,107 @@
+"""
+WebSocket endpoint streaming a project's board deltas.
+
+Clients connect to /ws/projects/<project_id>/?token=<access token> and
+receive the JSON messages published by projects.realtime. Connections that
+fall behind are closed with code 4000; clients should then catch up through
+the changes feed and reconnect. Membership is checked on connect and again
+whenever the project's membership changes; users who lost access are
+disconnected with 4403.
+"""
+import asyncio
+import re
+import uuid
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework.exceptions import AuthenticationFailed
+
+from accounts.authentication import CachedJWTAuthentication
+
+from .membership import aload_project_access, load_project_access
+from .realtime import CHANNEL, OVERFLOW, access_message, get_broker
+
+PROJECT_PATH = re.compile(r'^/ws/projects/(?P<project_id>[^/]+)/$')
+
+CLOSE_RESYNC = 4000
+CLOSE_FORBIDDEN = 4403
+CLOSE_NOT_FOUND = 4404
+
+
+@sync_to_async
+def authorize(token, project_id):
+    """Return the token's user if they can see the project, else None."""
+    authentication = CachedJWTAuthentication()
+    try:
+        user = authentication.get_user(authentication.get_validated_token(token))
+    except (AuthenticationFailed, InvalidToken, TokenError):
+        return None
+    if not load_project_access(user).is_member(project_id):
+        return None
+    return user
+
+
+async def reject(send, code):
+    """
+    Close with an application code. Closing before accepting would reject
+    the handshake instead, which browsers report as 1006 without the code.
+    """
+    await send({'type': 'websocket.accept'})
+    await send({'type': 'websocket.close', 'code': code})
+
+
+async def forward(messages, send, user, project_id):
+    access_changed = access_message(project_id)
+    async for message in messages:
+        if message is OVERFLOW:
+            await send({'type': 'websocket.close', 'code': CLOSE_RESYNC})
+            return
+        if message == access_changed:
+            if not (await aload_project_access(user)).is_member(project_id):
+                await send({'type': 'websocket.close', 'code': CLOSE_FORBIDDEN})
+                return
+            continue
+        await send({'type': 'websocket.send', 'text': message})
+
+
+async def wait_for_disconnect(receive):
+    while True:
+        message = await receive()
+        if message['type'] == 'websocket.disconnect':
+            return
+
+
+async def project_updates(scope, receive, send):
+    """ASGI application for the project updates WebSocket."""
+    message = await receive()
+    if message['type'] != 'websocket.connect':
+        return
+
+    match = PROJECT_PATH.match(scope['path'])
+    try:
+        project_id = uuid.UUID(match['project_id']) if match else None
+    except ValueError:
+        project_id = None
+    if project_id is None:
+        await reject(send, CLOSE_NOT_FOUND)
+        return
+
+    query = parse_qs(scope.get('query_string', b'').decode())
+    token = query.get('token', [''])[0]
+    user = await authorize(token, project_id) if token else None
+    if user is None:
+        await reject(send, CLOSE_FORBIDDEN)
+        return
+
+    async with get_broker().subscribe(CHANNEL.format(project_id=project_id)) as messages:
+        await send({'type': 'websocket.accept'})
+        tasks = {
+            asyncio.ensure_future(forward(messages, send, user, project_id)),
+            asyncio.ensure_future(wait_for_disconnect(receive)),
+        }
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
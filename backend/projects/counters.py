@@ -0,0 +1,223 @@
+"""
+Maintenance of the denormalized task counters on Project and Sprint.
+
+Every write path that changes a task's project, sprint, status or story
+points records the change in a CounterDelta, which is applied as one
+F-expression UPDATE per affected project and sprint. Single saves and
+deletes go through signals (see projects.signals); bulk paths build a delta
+for the whole batch. `recount()` rebuilds the counters from scratch.
+
+The same comparison feeds the TaskStatusEvent log: every status or sprint
+change recorded here is also written as an event for the sprint analytics.
+"""
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from .models import Project, Sprint, Task, TaskStatusEvent
+
+COUNTER_FIELDS = Project.COUNTER_FIELDS
+
+_deferred = ContextVar('deferred_counter_delta', default=None)
+
+
+class CounterDelta:
+    """
+    Accumulated counter changes, keyed by project and sprint.
+    """
+    def __init__(self):
+        self.projects = defaultdict(Counter)
+        self.sprints = defaultdict(Counter)
+
+    def add(self, state, sign=1):
+        """Count (or with sign=-1, uncount) a task in the given counted state."""
+        if state is None:
+            return
+        project_id, sprint_id, status, story_points = state
+        changes = {'tasks_total': sign, f'tasks_{status}': sign}
+        if status == 'deployed' and story_points:
+            changes['points_deployed'] = sign * story_points
+
+        targets = [self.projects[project_id]]
+        if sprint_id is not None:
+            targets.append(self.sprints[sprint_id])
+        for counters in targets:
+            for field, value in changes.items():
+                counters[field] += value
+
+    def change(self, old_state, new_state):
+        if old_state != new_state:
+            self.add(old_state, -1)
+            self.add(new_state, 1)
+
+    def merge(self, other):
+        for target, source in ((self.projects, other.projects),
+                               (self.sprints, other.sprints)):
+            for pk, counters in source.items():
+                target[pk].update(counters)
+
+    def apply(self):
+        """
+        Write the accumulated changes, one UPDATE per project/sprint.
+
+        Sprints are touched as well, since their serialized form (and so the
+        changes feed) carries the counters.
+        """
+        now = timezone.now()
+        for model, changes in ((Project, self.projects), (Sprint, self.sprints)):
+            for pk, counters in changes.items():
+                updates = {
+                    field: F(field) + value
+                    for field, value in counters.items() if value
+                }
+                if updates:
+                    if model is Sprint:
+                        updates['updated_at'] = now
+                    model.objects.filter(pk=pk).update(**updates)
+        self.projects.clear()
+        self.sprints.clear()
+
+
+def record(delta):
+    """
+    Apply `delta` now, or fold it into the enclosing deferred_counters()
+    block.
+    """
+    pending = _deferred.get()
+    if pending is not None:
+        pending.merge(delta)
+    else:
+        delta.apply()
+
+
+@contextmanager
+def deferred_counters():
+    """
+    Collect counter changes made inside the block (including from signals
+    on cascaded deletes) and apply them once at the end.
+    """
+    if _deferred.get() is not None:
+        yield _deferred.get()
+        return
+
+    delta = CounterDelta()
+    token = _deferred.set(delta)
+    try:
+        with transaction.atomic():
+            yield delta
+            _deferred.reset(token)
+            token = None
+            delta.apply()
+    finally:
+        if token is not None:
+            _deferred.reset(token)
+
+
+def status_event(task, old_state, new_state, now):
+    """The TaskStatusEvent for a change of status or sprint, or None."""
+    if old_state is not None and old_state[1:3] == new_state[1:3]:
+        return None
+    _, sprint_id, status, story_points = new_state
+    return TaskStatusEvent(
+        task_id=task.pk,
+        sprint_id=sprint_id,
+        from_status=old_state[2] if old_state else '',
+        status=status,
+        story_points=story_points,
+        changed_at=now,
+    )
+
+
+def record_task_changes(tasks):
+    """
+    Record counter changes for saved task instances, comparing each one's
+    snapshot with its current state, then refresh the snapshots. Unsaved
+    (newly created) tasks have no snapshot and are counted as additions.
+    Status and sprint changes are logged with one INSERT.
+    """
+    delta = CounterDelta()
+    events = []
+    now = timezone.now()
+    for task in tasks:
+        old_state = getattr(task, '_counted_state', None)
+        new_state = task.get_counted_state()
+        delta.change(old_state, new_state)
+        event = status_event(task, old_state, new_state, now)
+        if event is not None:
+            events.append(event)
+        task.snapshot_counted_state()
+    record(delta)
+    if events:
+        TaskStatusEvent.objects.bulk_create(events, batch_size=500)
+
+
+def release_unfinished_tasks(sprint):
+    """
+    Move a sprint's unfinished tasks back to the backlog, logging a
+    TaskStatusEvent for each, and drop them from the sprint's counters.
+    Project counters are unaffected.
+    """
+    with transaction.atomic():
+        now = timezone.now()
+        unfinished = sprint.tasks.exclude(status='deployed')
+        released = list(unfinished.values_list('id', 'status', 'story_points'))
+        unfinished.update(sprint=None, updated_at=now)
+        TaskStatusEvent.objects.bulk_create([
+            TaskStatusEvent(
+                task_id=task_id, sprint_id=None, from_status=status, status=status,
+                story_points=story_points, changed_at=now
+            )
+            for task_id, status, story_points in released
+        ])
+        Sprint.objects.filter(pk=sprint.pk).update(
+            updated_at=now,
+            tasks_total=F('tasks_deployed'),
+            **{
+                f'tasks_{status}': 0
+                for status, _ in Task.STATUS_CHOICES if status != 'deployed'
+            }
+        )
+
+
+def recount(project_ids=None):
+    """
+    Rebuild project and sprint counters with grouped aggregate queries.
+
+    Returns the number of projects and sprints updated.
+    """
+    projects = Project.objects.all()
+    sprints = Sprint.objects.all()
+    tasks = Task.objects.order_by()
+    if project_ids is not None:
+        projects = projects.filter(pk__in=project_ids)
+        sprints = sprints.filter(project_id__in=project_ids)
+        tasks = tasks.filter(project_id__in=project_ids)
+
+    def totals(group_by):
+        result = defaultdict(Counter)
+        rows = tasks.values(group_by, 'status').annotate(
+            count=Count('pk'), points=Sum('story_points')
+        )
+        for row in rows:
+            counters = result[row[group_by]]
+            counters['tasks_total'] += row['count']
+            counters[f"tasks_{row['status']}"] += row['count']
+            if row['status'] == 'deployed':
+                counters['points_deployed'] += row['points'] or 0
+        return result
+
+    updated = 0
+    with transaction.atomic():
+        for queryset, counts in ((projects, totals('project_id')),
+                                 (sprints, totals('sprint_id'))):
+            objects = list(queryset.only('pk'))
+            for obj in objects:
+                for field in COUNTER_FIELDS:
+                    setattr(obj, field, counts[obj.pk][field])
+            queryset.model.objects.bulk_update(objects, COUNTER_FIELDS, batch_size=500)
+            updated += len(objects)
+    return updated
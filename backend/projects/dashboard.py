@@ -0,0 +1,152 @@
+"""
+Per-user dashboard summary.
+
+The summary is built from the stored project counters and a few grouped
+queries over the user's projects, each bounded by an index and a limit, so
+its cost does not grow with the number of projects beyond the rows returned:
+
+- task counts per project and status (stored on Project, see TaskCounters),
+  and the user's assigned tasks per project and status (one GROUP BY);
+- the user's open assigned tasks, most recently updated first;
+- active sprints with their days remaining;
+- the latest comments.
+
+When DASHBOARD_CACHE_TIMEOUT is set the summary is cached per user, keyed by
+the version tokens of the user's projects (see projects.caching). Any write
+to one of those projects, or a change to the user's memberships, makes the
+entry unreachable. A summary read from a replica is kept for at most
+REPLICA_LAG_SECONDS, as cached responses are (see projects.replicas).
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+from django.utils import timezone
+
+from .caching import get_project_versions
+from .models import Comment, Project, Sprint, Task
+from .replicas import replica_cache_timeout
+
+DASHBOARD_KEY = 'dashboard:{user_id}:{digest}'
+
+ASSIGNED_TASK_LIMIT = 20
+RECENT_COMMENT_LIMIT = 10
+
+STATUSES = [status for status, _ in Task.STATUS_CHOICES]
+
+
+def project_counts(user, project_ids):
+    """Task counts per status for each project, overall and assigned to the user."""
+    assigned = {}
+    rows = Task.objects.filter(
+        project_id__in=project_ids, assigned_to=user
+    ).order_by().values('project_id', 'status').annotate(count=Count('pk'))
+    for row in rows:
+        assigned.setdefault(row['project_id'], dict.fromkeys(STATUSES, 0))
+        assigned[row['project_id']][row['status']] = row['count']
+
+    projects = Project.objects.filter(pk__in=project_ids).order_by('name').values(
+        'id', 'name', 'tasks_total', *(f'tasks_{status}' for status in STATUSES)
+    )
+    return [
+        {
+            'id': project['id'],
+            'name': project['name'],
+            'tasks_total': project['tasks_total'],
+            'tasks_by_status': {
+                status: project[f'tasks_{status}'] for status in STATUSES
+            },
+            'assigned_by_status': assigned.get(
+                project['id'], dict.fromkeys(STATUSES, 0)
+            ),
+        }
+        for project in projects
+    ]
+
+
+def assigned_open_tasks(user, project_ids):
+    return list(
+        Task.objects.filter(project_id__in=project_ids, assigned_to=user)
+        .exclude(status='deployed')
+        .order_by('-updated_at')
+        .values(
+            'id', 'title', 'status', 'priority', 'story_points', 'project_id',
+            'sprint_id', 'updated_at'
+        )[:ASSIGNED_TASK_LIMIT]
+    )
+
+
+def active_sprints(project_ids, today):
+    sprints = Sprint.objects.filter(
+        project_id__in=project_ids, status='active'
+    ).order_by('end_date').values(
+        'id', 'name', 'project_id', 'start_date', 'end_date', 'tasks_total',
+        'tasks_deployed', 'points_deployed'
+    )
+    return [
+        {
+            **sprint,
+            'days_remaining': max((sprint['end_date'] - today).days, 0),
+            'completion_percentage': (
+                int(sprint['tasks_deployed'] / sprint['tasks_total'] * 100)
+                if sprint['tasks_total'] else 0
+            ),
+        }
+        for sprint in sprints
+    ]
+
+
+def recent_comments(project_ids):
+    comments = Comment.objects.filter(
+        task__project_id__in=project_ids
+    ).order_by('-created_at').values(
+        'id', 'text', 'task_id', 'task__title', 'task__project_id', 'user__email',
+        'created_at'
+    )[:RECENT_COMMENT_LIMIT]
+    return [
+        {
+            'id': comment['id'],
+            'text': comment['text'],
+            'task_id': comment['task_id'],
+            'task_title': comment['task__title'],
+            'project_id': comment['task__project_id'],
+            'user_email': comment['user__email'],
+            'created_at': comment['created_at'],
+        }
+        for comment in comments
+    ]
+
+
+def build_dashboard(user, project_ids):
+    project_ids = list(project_ids)
+    return {
+        'projects': project_counts(user, project_ids),
+        'assigned_tasks': assigned_open_tasks(user, project_ids),
+        'active_sprints': active_sprints(project_ids, timezone.localdate()),
+        'recent_comments': recent_comments(project_ids),
+    }
+
+
+def dashboard_cache_key(user, project_ids):
+    versions = get_project_versions(project_ids)
+    parts = [
+        f'{project_id}:{versions[project_id]}'
+        for project_id in sorted(versions, key=str)
+    ]
+    digest = hashlib.sha256('|'.join(parts).encode()).hexdigest()
+    return DASHBOARD_KEY.format(user_id=user.pk, digest=digest)
+
+
+def get_dashboard(user, access):
+    """Return the user's dashboard, from the cache when enabled."""
+    timeout = getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 0)
+    if not timeout:
+        return build_dashboard(user, access.member_ids)
+
+    key = dashboard_cache_key(user, access.member_ids)
+    dashboard = cache.get(key)
+    if dashboard is None:
+        dashboard = build_dashboard(user, access.member_ids)
+        cache.set(key, dashboard, replica_cache_timeout(timeout))
+    return dashboard
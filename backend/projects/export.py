@@ -0,0 +1,250 @@
+"""
+Streaming export of a project's tasks and comments as JSON, NDJSON or CSV.
+
+Rows are read with .values_list().iterator(), so neither model instances
+nor the whole result set are held in memory, and each batch of rows is
+encoded and handed to the server before the next one is read. Sprint names
+come from a map loaded up front and user emails from a map seeded with the
+project's owner and members, so no row triggers a query of its own (users
+who have left the project are looked up once each on first use).
+
+The response starts with the project header before the task query runs, so
+the first byte does not wait for the database.
+"""
+import csv
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.utils.text import slugify
+from rest_framework.renderers import BaseRenderer
+
+from .models import Comment, Sprint, Task
+
+User = get_user_model()
+
+EXPORT_CHUNK_SIZE = 2000
+
+TASK_COLUMNS = [
+    'id', 'title', 'description', 'status', 'priority', 'story_points',
+    'order', 'sprint_id', 'sprint_name', 'assigned_to_id', 'assigned_to_email',
+    'created_by_id', 'created_by_email', 'created_at', 'updated_at',
+]
+
+COMMENT_COLUMNS = [
+    'id', 'task_id', 'user_id', 'user_email', 'text', 'created_at', 'updated_at',
+]
+
+CONTENT_TYPES = {
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+encoder = DjangoJSONEncoder(ensure_ascii=False)
+
+
+class UserEmails(dict):
+    """Map of user ID to email that looks up unknown IDs on first use."""
+    def __missing__(self, user_id):
+        email = None
+        if user_id is not None:
+            email = User.objects.filter(pk=user_id).values_list(
+                'email', flat=True
+            ).first()
+        self[user_id] = email
+        return email
+
+
+def project_user_emails(project):
+    return UserEmails(
+        User.objects.filter(
+            Q(pk=project.owner_id) | Q(projects=project)
+        ).values_list('id', 'email')
+    )
+
+
+def export_tasks(project, users, sprints):
+    """Yield the project's tasks as dicts keyed by TASK_COLUMNS."""
+    rows = Task.objects.filter(project_id=project.pk).order_by(
+        'updated_at'
+    ).values_list(
+        'id', 'title', 'description', 'status', 'priority', 'story_points',
+        'order', 'sprint_id', 'assigned_to_id', 'created_by_id',
+        'created_at', 'updated_at',
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    for (pk, title, description, status, priority, story_points, order,
+         sprint_id, assigned_to_id, created_by_id, created_at, updated_at) in rows:
+        yield {
+            'id': pk,
+            'title': title,
+            'description': description,
+            'status': status,
+            'priority': priority,
+            'story_points': story_points,
+            'order': order,
+            'sprint_id': sprint_id,
+            'sprint_name': sprints.get(sprint_id),
+            'assigned_to_id': assigned_to_id,
+            'assigned_to_email': users[assigned_to_id],
+            'created_by_id': created_by_id,
+            'created_by_email': users[created_by_id],
+            'created_at': created_at,
+            'updated_at': updated_at,
+        }
+
+
+def export_comments(project, users):
+    """Yield the project's comments as dicts keyed by COMMENT_COLUMNS."""
+    rows = Comment.objects.filter(task__project_id=project.pk).order_by(
+        'task_id', 'created_at'
+    ).values_list(
+        'id', 'task_id', 'user_id', 'text', 'created_at', 'updated_at'
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    for pk, task_id, user_id, text, created_at, updated_at in rows:
+        yield {
+            'id': pk,
+            'task_id': task_id,
+            'user_id': user_id,
+            'user_email': users[user_id],
+            'text': text,
+            'created_at': created_at,
+            'updated_at': updated_at,
+        }
+
+
+def batches(rows, size=EXPORT_CHUNK_SIZE):
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+def project_header(project):
+    return {'id': project.pk, 'name': project.name}
+
+
+def stream_json(project, tasks, comments):
+    yield f'{{"project": {encoder.encode(project_header(project))}, "tasks": ['
+    separator = ''
+    for batch in batches(tasks):
+        yield separator + ', '.join(encoder.encode(row) for row in batch)
+        separator = ', '
+    yield '], "comments": ['
+    separator = ''
+    for batch in batches(comments):
+        yield separator + ', '.join(encoder.encode(row) for row in batch)
+        separator = ', '
+    yield ']}\n'
+
+
+def stream_ndjson(project, tasks, comments):
+    """One object per line, each tagged with its record type."""
+    yield encoder.encode({'type': 'project', **project_header(project)}) + '\n'
+    for record_type, rows in (('task', tasks), ('comment', comments)):
+        for batch in batches(rows):
+            yield ''.join(
+                encoder.encode({'type': record_type, **row}) + '\n' for row in batch
+            )
+
+
+# Cell prefixes spreadsheets read as the start of a formula.
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+class Echo:
+    """File-like object whose write() returns the line for csv.writer."""
+    def write(self, value):
+        return value
+
+
+def stream_csv(columns, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(columns)
+    for batch in batches(rows):
+        yield ''.join(
+            writer.writerow([csv_value(row[column]) for column in columns])
+            for row in batch
+        )
+
+
+def csv_value(value):
+    if value is None:
+        return ''
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        # Spreadsheets would run it as a formula; a leading quote keeps it text.
+        return f"'{value}"
+    return value
+
+
+def aiterate(chunks):
+    """
+    Wrap a sync iterator for ASGI, pulling each chunk in the thread that
+    owns the database connection. Django would otherwise buffer the whole
+    sync iterator before sending anything.
+    """
+    pull = sync_to_async(next)
+
+    async def achunks():
+        while (chunk := await pull(chunks, None)) is not None:
+            yield chunk
+    return achunks()
+
+
+def export_response(request, project, export_format, records='tasks'):
+    """
+    Return a StreamingHttpResponse exporting the project. CSV holds a
+    single record type, so `records` selects 'tasks' or 'comments'.
+    """
+    users = project_user_emails(project)
+    sprints = dict(Sprint.objects.filter(project=project).values_list('id', 'name'))
+    tasks = export_tasks(project, users, sprints)
+    comments = export_comments(project, users)
+
+    if export_format == 'csv':
+        if records == 'comments':
+            chunks = stream_csv(COMMENT_COLUMNS, comments)
+        else:
+            chunks = stream_csv(TASK_COLUMNS, tasks)
+    elif export_format == 'ndjson':
+        chunks = stream_ndjson(project, tasks, comments)
+    else:
+        chunks = stream_json(project, tasks, comments)
+
+    if isinstance(getattr(request, '_request', request), ASGIRequest):
+        chunks = aiterate(chunks)
+    response = StreamingHttpResponse(chunks, content_type=CONTENT_TYPES[export_format])
+    filename = slugify(project.name) or 'project'
+    if export_format == 'csv':
+        filename = f'{filename}-{records}'
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{export_format}"'
+    return response
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Renders a payload (such as an error) as a single NDJSON line."""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return (encoder.encode(data) + '\n').encode()
+
+
+class CSVRenderer(BaseRenderer):
+    """Renders a flat dict (such as an error) as a header and one row."""
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if not data:
+            return b''
+        writer = csv.writer(Echo())
+        rows = [writer.writerow(data.keys()), writer.writerow(data.values())]
+        return ''.join(rows).encode()
@@ -0,0 +1,87 @@
+import asyncio
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, override_settings
+
+from accounts.authentication import ClaimsRefreshToken
+from projects.models import Project
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare concurrent-request throughput of the sync and async read '
+        'routes (project list, task list, board) through the ASGI handler.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('email', help='User whose projects are read.')
+        parser.add_argument(
+            '--project',
+            help="Project to read tasks and board from (default: the user's largest)."
+        )
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=20)
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(email=options['email'])
+        except User.DoesNotExist:
+            raise CommandError(f"No user with email {options['email']}")
+
+        project_id = options['project'] or (
+            Project.objects.visible_to(user).order_by('-tasks_total')
+            .values_list('id', flat=True).first()
+        )
+        if project_id is None:
+            raise CommandError('The user has no projects.')
+
+        endpoints = [
+            ('project list', '/api/projects/', '/api/async/projects/'),
+            ('task list', f'/api/tasks/?project_id={project_id}',
+             f'/api/async/tasks/?project_id={project_id}'),
+            ('board', f'/api/projects/{project_id}/board/',
+             f'/api/async/projects/{project_id}/board/'),
+        ]
+        client = AsyncClient()
+        access = ClaimsRefreshToken.for_user(user).access_token
+        self.headers = {'Authorization': f'Bearer {access}'}
+
+        self.stdout.write(
+            f"{options['requests']} requests per route, "
+            f"{options['concurrency']} concurrent\n"
+        )
+        # The test client always sends Host: testserver.
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            for label, sync_url, async_url in endpoints:
+                for mode, url in (('sync', sync_url), ('async', async_url)):
+                    throughput, latencies = asyncio.run(self.run(
+                        client, url, options['requests'], options['concurrency']
+                    ))
+                    self.stdout.write(
+                        f'{label:<14}{mode:<7}{throughput:>9.1f} req/s   '
+                        f'p50 {statistics.median(latencies) * 1000:7.1f} ms   '
+                        f'p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:7.1f} ms'
+                    )
+
+    async def run(self, client, url, requests, concurrency):
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies = []
+
+        async def fetch():
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.get(url, headers=self.headers)
+                latencies.append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    raise CommandError(f'{url} returned {response.status_code}')
+
+        started = time.perf_counter()
+        await asyncio.gather(*(fetch() for _ in range(requests)))
+        elapsed = time.perf_counter() - started
+        latencies.sort()
+        return requests / elapsed, latencies
@@ -0,0 +1,154 @@
+import random
+import statistics
+import threading
+import time
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client, override_settings
+
+from accounts.authentication import ClaimsRefreshToken
+from projects.models import Project, Task
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Load test concurrent board edits: threads moving tasks between '
+        'columns and reading the board, through the WSGI handler and the '
+        'configured database. Run once with --baseline to compare against '
+        "Django's default connection handling."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('email', help='User whose project is edited.')
+        parser.add_argument(
+            '--project',
+            help="Project to edit (default: the user's largest)."
+        )
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument(
+            '--write-ratio',
+            type=float,
+            default=0.5,
+            help='Share of requests that move a task; the rest read the board.'
+        )
+        parser.add_argument(
+            '--baseline',
+            action='store_true',
+            help=(
+                'Use a new connection per request and, on SQLite, the rollback '
+                'journal, default busy timeout and deferred transactions.'
+            )
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(email=options['email'])
+        except User.DoesNotExist:
+            raise CommandError(f"No user with email {options['email']}")
+
+        project_id = options['project'] or (
+            Project.objects.visible_to(user).order_by('-tasks_total')
+            .values_list('id', flat=True).first()
+        )
+        if project_id is None:
+            raise CommandError('The user has no projects.')
+        self.task_ids = list(
+            Task.objects.filter(project_id=project_id).values_list('id', flat=True)[:500]
+        )
+        if not self.task_ids:
+            raise CommandError('The project has no tasks.')
+        self.board_url = f'/api/projects/{project_id}/board/'
+        self.headers = {
+            'Authorization': f'Bearer {ClaimsRefreshToken.for_user(user).access_token}'
+        }
+
+        if options['baseline']:
+            self.use_baseline()
+        connections.close_all()
+        database = connections['default'].settings_dict
+        self.stdout.write(
+            f"{connections['default'].vendor}  CONN_MAX_AGE={database['CONN_MAX_AGE']}  "
+            f"OPTIONS={database['OPTIONS']}"
+        )
+        self.stdout.write(
+            f"{options['requests']} requests, {options['concurrency']} threads, "
+            f"{options['write_ratio']:.0%} writes\n"
+        )
+
+        # The test client always sends Host: testserver.
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            elapsed, latencies, statuses = self.run(
+                options['requests'], options['concurrency'], options['write_ratio']
+            )
+
+        for kind in ('read', 'write'):
+            values = sorted(latencies[kind])
+            if values:
+                self.stdout.write(
+                    f'{kind:<7}{len(values):>7}   '
+                    f'p50 {statistics.median(values) * 1000:7.1f} ms   '
+                    f'p95 {values[int(len(values) * 0.95) - 1] * 1000:7.1f} ms'
+                )
+        errors = sum(count for status, count in statuses.items() if status >= 400)
+        self.stdout.write(
+            f"\n{options['requests'] / elapsed:.1f} req/s, {errors} errors "
+            f"({dict(sorted(statuses.items()))})"
+        )
+
+    def use_baseline(self):
+        database = connections.settings['default']
+        database['CONN_MAX_AGE'] = 0
+        database['CONN_HEALTH_CHECKS'] = False
+        if database['ENGINE'].endswith('sqlite3'):
+            # WAL mode persists in the file, so switch back explicitly.
+            database['OPTIONS'] = {'init_command': 'PRAGMA journal_mode=DELETE'}
+        else:
+            database['OPTIONS'].pop('pool', None)
+
+    def run(self, requests, concurrency, write_ratio):
+        latencies = {'read': [], 'write': []}
+        statuses = Counter()
+        lock = threading.Lock()
+        remaining = iter(range(requests))
+
+        def worker():
+            client = Client(raise_request_exception=False)
+            rng = random.Random()
+            try:
+                while True:
+                    with lock:
+                        if next(remaining, None) is None:
+                            return
+                    started = time.perf_counter()
+                    if rng.random() < write_ratio:
+                        kind = 'write'
+                        response = client.patch(
+                            f'/api/tasks/{rng.choice(self.task_ids)}/move/',
+                            {'status': rng.choice(
+                                ['backlog', 'implementing', 'testing', 'deployed']
+                            )},
+                            content_type='application/json',
+                            headers=self.headers,
+                        )
+                    else:
+                        kind = 'read'
+                        response = client.get(self.board_url, headers=self.headers)
+                    with lock:
+                        latencies[kind].append(time.perf_counter() - started)
+                        statuses[response.status_code] += 1
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - started, latencies, statuses
@@ -0,0 +1,60 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from projects.importer import IMPORT_BATCH_SIZE, KINDS, ImportFailed, ProjectImporter
+
+
+class Command(BaseCommand):
+    help = (
+        'Import projects, sprints, tasks and comments from an NDJSON file '
+        '(see projects.importer for the record format).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="NDJSON file to import, or '-' for stdin.")
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE)
+        parser.add_argument(
+            '--bulk-create',
+            action='store_true',
+            help="Insert with bulk_create instead of the database's fast path."
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Validate and insert, then roll back.'
+        )
+
+    def handle(self, *args, **options):
+        importer = ProjectImporter(
+            batch_size=options['batch_size'],
+            fast_path=not options['bulk_create'],
+            progress=self.report_progress,
+        )
+        self.stdout.write(f'Importing with {importer.method}')
+        try:
+            if options['path'] == '-':
+                summary = importer.run(sys.stdin, dry_run=options['dry_run'])
+            else:
+                with open(options['path'], encoding='utf-8') as lines:
+                    summary = importer.run(lines, dry_run=options['dry_run'])
+        except OSError as e:
+            raise CommandError(str(e))
+        except ImportFailed as e:
+            for error in e.errors:
+                self.stderr.write(f"line {error['line']}: {error['error']}")
+            raise CommandError(f'Import failed: {e}; nothing was imported.')
+
+        counts = ', '.join(f"{summary[f'{kind}s']} {kind}s" for kind in KINDS)
+        verb = 'Validated' if options['dry_run'] else 'Imported'
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {counts} in {summary['seconds']:.1f}s "
+            f"({summary['rows_per_second']} rows/s)."
+        ))
+
+    def report_progress(self, counts, elapsed):
+        rows = sum(counts.values())
+        self.stdout.write(
+            f'  {rows:>10} rows  {rows / elapsed if elapsed else 0:>10.0f} rows/s  '
+            + '  '.join(f'{kind}s={counts[kind]}' for kind in KINDS)
+        )
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from projects.search import reindex
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search documents of projects, sprints, tasks and comments.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'project_ids',
+            nargs='*',
+            help='Only rebuild these projects (default: all).'
+        )
+
+    def handle(self, *args, **options):
+        project_ids = options['project_ids'] or None
+        written = reindex(project_ids)
+        self.stdout.write(
+            self.style.SUCCESS(f'Indexed {written} documents.')
+        )
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from projects.counters import recount
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the denormalized task counters on projects and sprints.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'project_ids',
+            nargs='*',
+            help='Only recount these projects (default: all).'
+        )
+
+    def handle(self, *args, **options):
+        project_ids = options['project_ids'] or None
+        updated = recount(project_ids)
+        self.stdout.write(
+            self.style.SUCCESS(f'Recounted {updated} projects and sprints.')
+        )
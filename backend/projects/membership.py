@@ -0,0 +1,106 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Project
+from .replicas import replica_cache_timeout
+
+CACHE_KEY = 'project-access:{user_id}'
+
+
+class ProjectAccess:
+    """
+    The set of projects a user can see, and which of them they own.
+    """
+    def __init__(self, owned_ids, member_ids):
+        self.owned_ids = frozenset(owned_ids)
+        self.member_ids = frozenset(member_ids) | self.owned_ids
+
+    def is_member(self, project_id):
+        """Check if the user is a member or owner of the project."""
+        return project_id in self.member_ids
+
+    def is_owner(self, project_id):
+        """Check if the user owns the project."""
+        return project_id in self.owned_ids
+
+
+def access_cache_enabled():
+    return bool(getattr(settings, 'PROJECT_ACCESS_CACHE_TIMEOUT', 0))
+
+
+def accessible_projects(user):
+    return Project.objects.visible_to(user).order_by().values_list('id', 'owner_id')
+
+
+def build_project_access(user, rows):
+    owned_ids, member_ids = [], []
+    for project_id, owner_id in rows:
+        member_ids.append(project_id)
+        if owner_id == user.pk:
+            owned_ids.append(project_id)
+    return ProjectAccess(owned_ids, member_ids)
+
+
+def load_project_access(user):
+    """Load a user's accessible projects with a single query."""
+    return build_project_access(user, accessible_projects(user))
+
+
+async def aload_project_access(user):
+    """load_project_access() with the async ORM."""
+    return build_project_access(user, [row async for row in accessible_projects(user)])
+
+
+def get_project_access(request):
+    """
+    Return the ProjectAccess for the request's user, memoized on the request.
+
+    When PROJECT_ACCESS_CACHE_TIMEOUT is set, the result is also kept in the
+    Django cache for that many seconds; membership and project signals
+    invalidate the entry (see projects.signals).
+    """
+    access = getattr(request, '_project_access', None)
+    if access is not None:
+        return access
+
+    user = request.user
+    if access_cache_enabled():
+        key = CACHE_KEY.format(user_id=user.pk)
+        access = cache.get(key)
+        if access is None:
+            access = load_project_access(user)
+            cache.set(
+                key, access, replica_cache_timeout(settings.PROJECT_ACCESS_CACHE_TIMEOUT)
+            )
+    else:
+        access = load_project_access(user)
+
+    request._project_access = access
+    return access
+
+
+async def aget_project_access(request):
+    """get_project_access() for async views."""
+    access = getattr(request, '_project_access', None)
+    if access is not None:
+        return access
+
+    user = request.user
+    if access_cache_enabled():
+        key = CACHE_KEY.format(user_id=user.pk)
+        access = await cache.aget(key)
+        if access is None:
+            access = await aload_project_access(user)
+            await cache.aset(
+                key, access, replica_cache_timeout(settings.PROJECT_ACCESS_CACHE_TIMEOUT)
+            )
+    else:
+        access = await aload_project_access(user)
+
+    request._project_access = access
+    return access
+
+
+def invalidate_project_access(user_ids):
+    """Drop cached ProjectAccess entries for the given users."""
+    cache.delete_many([CACHE_KEY.format(user_id=user_id) for user_id in user_ids])
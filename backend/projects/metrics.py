@@ -0,0 +1,308 @@
+"""
+Per-endpoint request metrics.
+
+MetricsMiddleware records, for every request, the number of database
+queries and the time spent running them, the time spent serializing, the
+response size and the total time. It labels them by view: the viewset and
+action (`ProjectViewSet.list`, `TaskViewSet.move`), the view class and
+method for other API views, or the view function's path.
+
+- metrics_view serves the totals in the Prometheus text format to
+  scrapers sending `Authorization: Bearer <METRICS_TOKEN>`; without a
+  token set it is disabled. The peer address is not trusted, since behind
+  a local reverse proxy every request comes from 127.0.0.1. Totals are
+  kept per process, so scrape each worker (or run one) to see all
+  traffic.
+- With METRICS_SERVER_TIMING, responses carry a Server-Timing header with
+  the request's own figures, which browser developer tools display.
+- A statement run METRICS_DUPLICATE_QUERY_THRESHOLD or more times in one
+  request (numbers and IN lists aside) is logged as a warning with its
+  fingerprint: usually an N+1 query.
+
+Serializer time is the time spent in to_representation() of serializers
+using TimedSerializerMixin, including any queries it triggers.
+
+Queries are counted by an execute wrapper on every database connection,
+installed as each one is opened. Under ASGI the ORM runs in sync_to_async
+worker threads, whose connections are not the middleware thread's.
+"""
+import hmac
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import Http404, HttpResponse
+
+logger = logging.getLogger(__name__)
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+COUNTERS = {
+    'api_requests_total': 'Requests by view, method and status.',
+    'api_db_queries_total': 'Database queries.',
+    'api_db_duration_seconds_total': 'Time spent running database queries.',
+    'api_serializer_duration_seconds_total': 'Time spent serializing responses.',
+    'api_response_bytes_total': 'Response body bytes (streamed bodies excluded).',
+    'api_duplicate_queries_total': 'Queries repeating an earlier statement of the same request.',
+}
+HISTOGRAMS = {
+    'api_request_duration_seconds': (
+        'Request duration.',
+        (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    ),
+    'api_request_queries': (
+        'Database queries per request.',
+        (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000),
+    ),
+}
+
+NUMBER = re.compile(r'\b\d+\b')
+PLACEHOLDER_LIST = re.compile(r'\((?:%s|\?)(?:, (?:%s|\?))*\)')
+
+# The metrics of the request being served.
+_current = ContextVar('request_metrics', default=None)
+
+
+def fingerprint(sql):
+    """`sql` with numbers and lists of placeholders collapsed."""
+    return PLACEHOLDER_LIST.sub('(...)', NUMBER.sub('?', sql))
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializing = False
+        self.statements = Counter()
+
+    def repeated(self):
+        """Runs per fingerprint, for statements run more than once."""
+        fingerprints = Counter()
+        for sql, count in self.statements.items():
+            fingerprints[fingerprint(sql)] += count
+        return {sql: count for sql, count in fingerprints.items() if count > 1}
+
+
+def record_query(execute, sql, params, many, context):
+    """Database execute wrapper adding each query to the current request's metrics."""
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.db_time += time.perf_counter() - started
+        metrics.queries += 1
+        metrics.statements[sql] += 1
+
+
+def install_query_recorder(sender=None, connection=None, **kwargs):
+    """connection_created receiver adding record_query to the connection."""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class TimedSerializerMixin:
+    """Serializer mixin counting to_representation() towards serializer time."""
+
+    def to_representation(self, instance):
+        metrics = _current.get()
+        # Nested serializers count as part of the outermost one.
+        if metrics is None or metrics.serializing:
+            return super().to_representation(instance)
+        metrics.serializing = True
+        started = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            metrics.serializer_time += time.perf_counter() - started
+            metrics.serializing = False
+
+
+def format_labels(labels):
+    def escape(value):
+        return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in labels) + '}'
+
+
+class Registry:
+    """Counters and histograms by metric name and labels, for one process."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+
+    def increment(self, name, labels, value=1):
+        key = (name, tuple(labels.items()))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, labels, value):
+        key = (name, tuple(labels.items()))
+        bounds = HISTOGRAMS[name][1]
+        with self.lock:
+            buckets, total, count = self.histograms.get(key, ([0] * len(bounds), 0, 0))
+            for index, bound in enumerate(bounds):
+                if value <= bound:
+                    buckets[index] += 1
+            self.histograms[key] = (buckets, total + value, count + 1)
+
+    def clear(self):
+        with self.lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def render(self):
+        """The metrics in the Prometheus text exposition format."""
+        with self.lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted(
+                (key, (list(buckets), total, count))
+                for key, (buckets, total, count) in self.histograms.items()
+            )
+
+        lines = []
+        for name, documentation in COUNTERS.items():
+            lines += [f'# HELP {name} {documentation}', f'# TYPE {name} counter']
+            lines += [
+                f'{name}{format_labels(labels)} {value:g}'
+                for (metric, labels), value in counters if metric == name
+            ]
+        for name, (documentation, bounds) in HISTOGRAMS.items():
+            lines += [f'# HELP {name} {documentation}', f'# TYPE {name} histogram']
+            for (metric, labels), (buckets, total, count) in histograms:
+                if metric != name:
+                    continue
+                cumulative = [(f'{bound:g}', value) for bound, value in zip(bounds, buckets)]
+                for bound, value in [*cumulative, ('+Inf', count)]:
+                    lines.append(f"{name}_bucket{format_labels((*labels, ('le', bound)))} {value}")
+                lines.append(f'{name}_sum{format_labels(labels)} {total:g}')
+                lines.append(f'{name}_count{format_labels(labels)} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+def view_label(request):
+    """`ViewSet.action`, `APIView.method` or the view function's dotted path."""
+    match = request.resolver_match
+    if match is None:
+        return 'unresolved'
+    view = match.func
+    view_class = getattr(view, 'cls', None)
+    if view_class is None:
+        return f'{view.__module__}.{view.__qualname__}'
+    method = request.method.lower()
+    actions = getattr(view, 'actions', None) or {}
+    return f'{view_class.__name__}.{actions.get(method, method)}'
+
+
+def server_timing(metrics, duration):
+    return ', '.join([
+        f'db;dur={metrics.db_time * 1000:.1f};desc="{metrics.queries} queries"',
+        f'serialize;dur={metrics.serializer_time * 1000:.1f}',
+        f'total;dur={duration * 1000:.1f}',
+    ])
+
+
+class MetricsMiddleware:
+    """Record each request's metrics under its view (see module docstring)."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'METRICS_ENABLED', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        connection_created.connect(
+            install_query_recorder, dispatch_uid='metrics-install-query-recorder'
+        )
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = self.start()
+        token = _current.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics = self.start()
+        token = _current.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics)
+
+    @staticmethod
+    def start():
+        # Connections opened before the middleware was loaded.
+        for connection in connections.all(initialized_only=True):
+            install_query_recorder(connection=connection)
+        return RequestMetrics()
+
+    def finish(self, request, response, metrics):
+        duration = time.perf_counter() - metrics.started
+        view = view_label(request)
+        labels = {'view': view}
+
+        registry.increment('api_requests_total', {
+            'view': view, 'method': request.method, 'status': response.status_code
+        })
+        registry.increment('api_db_queries_total', labels, metrics.queries)
+        registry.increment('api_db_duration_seconds_total', labels, metrics.db_time)
+        registry.increment(
+            'api_serializer_duration_seconds_total', labels, metrics.serializer_time
+        )
+        if not response.streaming:
+            registry.increment('api_response_bytes_total', labels, len(response.content))
+        registry.observe('api_request_duration_seconds', labels, duration)
+        registry.observe('api_request_queries', labels, metrics.queries)
+
+        repeated = metrics.repeated()
+        if repeated:
+            registry.increment(
+                'api_duplicate_queries_total', labels,
+                sum(count - 1 for count in repeated.values())
+            )
+        threshold = getattr(settings, 'METRICS_DUPLICATE_QUERY_THRESHOLD', 0)
+        for sql, count in repeated.items():
+            if threshold and count >= threshold:
+                logger.warning(
+                    'Query repeated %d times in %s %s (%s): %s',
+                    count, request.method, request.path, view, sql
+                )
+
+        if getattr(settings, 'METRICS_SERVER_TIMING', False):
+            response['Server-Timing'] = server_timing(metrics, duration)
+        return response
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint, for requests bearing METRICS_TOKEN."""
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    scheme, _, credentials = request.headers.get('Authorization', '').partition(' ')
+    if not token or scheme.lower() != 'bearer' or not hmac.compare_digest(
+        credentials.encode(), token.encode()
+    ):
+        raise Http404
+    return HttpResponse(registry.render(), content_type=PROMETHEUS_CONTENT_TYPE)
@@ -0,0 +1,75 @@
+# Generated by Django 5.1.3 on 2026-10-17 20:15
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def demote_extra_active_sprints(apps, schema_editor):
+    """Keep only the latest active sprint per project before adding the constraint."""
+    Sprint = apps.get_model("projects", "Sprint")
+    seen_projects = set()
+    active_sprints = Sprint.objects.filter(status="active").order_by(
+        "project_id", "-start_date", "-created_at"
+    )
+    for sprint in active_sprints.only("id", "project_id"):
+        if sprint.project_id in seen_projects:
+            Sprint.objects.filter(id=sprint.id).update(status="planning")
+        seen_projects.add(sprint.project_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("projects", "0001_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                fields=["task", "created_at"], name="comment_task_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="sprint",
+            index=models.Index(
+                fields=["project", "status"], name="sprint_project_status_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="task",
+            index=models.Index(
+                fields=["project", "status"], name="task_project_status_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="task",
+            index=models.Index(
+                fields=["sprint", "status"], name="task_sprint_status_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="task",
+            index=models.Index(
+                fields=["project", "sprint"], name="task_project_sprint_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="task",
+            index=models.Index(
+                fields=["order", "-created_at"], name="task_order_created_idx"
+            ),
+        ),
+        migrations.RunPython(
+            demote_extra_active_sprints, migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name="sprint",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("status", "active")),
+                fields=("project",),
+                name="one_active_sprint_per_project",
+            ),
+        ),
+    ]
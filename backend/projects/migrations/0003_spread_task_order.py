@@ -0,0 +1,35 @@
+from django.db import migrations
+
+ORDER_GAP = 1024
+
+
+def spread_task_order(apps, schema_editor):
+    """Renumber each board column with gaps so cards can be inserted between."""
+    Task = apps.get_model("projects", "Task")
+    tasks = Task.objects.order_by(
+        "project_id", "sprint_id", "status", "order", "-created_at", "id"
+    ).only("id", "project_id", "sprint_id", "status", "order")
+
+    batch, column, position = [], None, 0
+    for task in tasks.iterator(chunk_size=2000):
+        key = (task.project_id, task.sprint_id, task.status)
+        position = position + 1 if key == column else 1
+        column = key
+        task.order = position * ORDER_GAP
+        batch.append(task)
+        if len(batch) >= 2000:
+            Task.objects.bulk_update(batch, ["order"])
+            batch = []
+    if batch:
+        Task.objects.bulk_update(batch, ["order"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("projects", "0002_composite_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(spread_task_order, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,112 @@
+# Generated by Django 5.1.3 on 2026-10-17 20:24
+
+from collections import Counter, defaultdict
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+COUNTER_FIELDS = [
+    "tasks_total",
+    "tasks_backlog",
+    "tasks_implementing",
+    "tasks_testing",
+    "tasks_deployed",
+    "points_deployed",
+]
+
+
+def recount(apps, schema_editor):
+    Project = apps.get_model("projects", "Project")
+    Sprint = apps.get_model("projects", "Sprint")
+    Task = apps.get_model("projects", "Task")
+
+    for model, group_by in ((Project, "project_id"), (Sprint, "sprint_id")):
+        counts = defaultdict(Counter)
+        rows = (
+            Task.objects.order_by()
+            .values(group_by, "status")
+            .annotate(count=Count("pk"), points=Sum("story_points"))
+        )
+        for row in rows:
+            counters = counts[row[group_by]]
+            counters["tasks_total"] += row["count"]
+            counters[f"tasks_{row['status']}"] += row["count"]
+            if row["status"] == "deployed":
+                counters["points_deployed"] += row["points"] or 0
+
+        objects = list(model.objects.filter(pk__in=list(counts)).only("pk"))
+        for obj in objects:
+            for field in COUNTER_FIELDS:
+                setattr(obj, field, counts[obj.pk][field])
+        model.objects.bulk_update(objects, COUNTER_FIELDS, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("projects", "0003_spread_task_order"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="project",
+            name="points_deployed",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="project",
+            name="tasks_backlog",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="project",
+            name="tasks_deployed",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="project",
+            name="tasks_implementing",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="project",
+            name="tasks_testing",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="project",
+            name="tasks_total",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="sprint",
+            name="points_deployed",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="sprint",
+            name="tasks_backlog",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="sprint",
+            name="tasks_deployed",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="sprint",
+            name="tasks_implementing",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="sprint",
+            name="tasks_testing",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="sprint",
+            name="tasks_total",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(recount, migrations.RunPython.noop),
+    ]
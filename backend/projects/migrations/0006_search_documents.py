@@ -0,0 +1,160 @@
+# Generated by Django 5.1.3 on 2026-10-17 20:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+FTS_TABLE = "projects_searchdocument_fts"
+
+
+def create_search_index(apps, schema_editor):
+    """
+    Index the documents: a generated, weighted tsvector column with a GIN
+    index on PostgreSQL, an FTS5 table synced by triggers on SQLite.
+    """
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute(
+            "ALTER TABLE projects_searchdocument ADD COLUMN vector tsvector "
+            "GENERATED ALWAYS AS ("
+            "setweight(to_tsvector('english'::regconfig, title), 'A') || "
+            "setweight(to_tsvector('english'::regconfig, body), 'B')"
+            ") STORED"
+        )
+        schema_editor.execute(
+            "CREATE INDEX search_document_vector_idx "
+            "ON projects_searchdocument USING gin (vector)"
+        )
+    elif vendor == "sqlite":
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+            "title, body, content='projects_searchdocument', content_rowid='id', "
+            "tokenize='porter unicode61')"
+        )
+        schema_editor.execute(
+            "CREATE TRIGGER projects_searchdocument_ai "
+            "AFTER INSERT ON projects_searchdocument BEGIN "
+            f"INSERT INTO {FTS_TABLE}(rowid, title, body) "
+            "VALUES (new.id, new.title, new.body); END"
+        )
+        schema_editor.execute(
+            "CREATE TRIGGER projects_searchdocument_ad "
+            "AFTER DELETE ON projects_searchdocument BEGIN "
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, body) "
+            "VALUES ('delete', old.id, old.title, old.body); END"
+        )
+        schema_editor.execute(
+            "CREATE TRIGGER projects_searchdocument_au "
+            "AFTER UPDATE ON projects_searchdocument BEGIN "
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, body) "
+            "VALUES ('delete', old.id, old.title, old.body); "
+            f"INSERT INTO {FTS_TABLE}(rowid, title, body) "
+            "VALUES (new.id, new.title, new.body); END"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        for trigger in ("ai", "ad", "au"):
+            schema_editor.execute(f"DROP TRIGGER projects_searchdocument_{trigger}")
+        schema_editor.execute(f"DROP TABLE {FTS_TABLE}")
+
+
+def index_existing_rows(apps, schema_editor):
+    columns = "kind, object_id, project_id, sprint_id, task_id, comment_id, title, body"
+    for select in [
+        "SELECT 'project', p.id, p.id, NULL, NULL, NULL, p.name, p.description "
+        "FROM projects_project p",
+        "SELECT 'sprint', s.id, s.project_id, s.id, NULL, NULL, s.name, s.goal "
+        "FROM projects_sprint s",
+        "SELECT 'task', t.id, t.project_id, NULL, t.id, NULL, t.title, t.description "
+        "FROM projects_task t",
+        "SELECT 'comment', c.id, t.project_id, NULL, c.task_id, c.id, '', c.text "
+        "FROM projects_comment c JOIN projects_task t ON t.id = c.task_id",
+    ]:
+        schema_editor.execute(
+            f"INSERT INTO projects_searchdocument ({columns}) {select}"
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("projects", "0005_tombstones_and_updated_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SearchDocument",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("project", "Project"),
+                            ("sprint", "Sprint"),
+                            ("task", "Task"),
+                            ("comment", "Comment"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("object_id", models.UUIDField()),
+                ("title", models.CharField(blank=True, max_length=300)),
+                ("body", models.TextField(blank=True)),
+                (
+                    "comment",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="projects.comment",
+                    ),
+                ),
+                (
+                    "project",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="search_documents",
+                        to="projects.project",
+                    ),
+                ),
+                (
+                    "sprint",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="projects.sprint",
+                    ),
+                ),
+                (
+                    "task",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="projects.task",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("kind", "object_id"),
+                        name="search_document_object_unique",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+        migrations.RunPython(index_existing_rows, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,139 @@
+# Generated by Django 5.1.3 on 2026-10-17 21:30
+
+import django.core.serializers.json
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from django.db import migrations, models
+
+
+def log_current_status(apps, schema_editor):
+    """
+    Start every existing task's history with its current status and sprint,
+    dated at its creation: earlier changes were never recorded.
+    """
+    Task = apps.get_model("projects", "Task")
+    TaskStatusEvent = apps.get_model("projects", "TaskStatusEvent")
+    rows = Task.objects.order_by().values_list(
+        "id", "sprint_id", "status", "story_points", "created_at"
+    )
+    batch = []
+    for task_id, sprint_id, status, story_points, created_at in rows.iterator(
+        chunk_size=2000
+    ):
+        batch.append(
+            TaskStatusEvent(
+                task_id=task_id,
+                sprint_id=sprint_id,
+                status=status,
+                story_points=story_points,
+                changed_at=created_at,
+            )
+        )
+        if len(batch) >= 2000:
+            TaskStatusEvent.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        TaskStatusEvent.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("projects", "0006_search_documents"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SprintAnalytics",
+            fields=[
+                (
+                    "sprint",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="analytics",
+                        serialize=False,
+                        to="projects.sprint",
+                    ),
+                ),
+                (
+                    "data",
+                    models.JSONField(
+                        encoder=django.core.serializers.json.DjangoJSONEncoder
+                    ),
+                ),
+                ("computed_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="TaskStatusEvent",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                (
+                    "from_status",
+                    models.CharField(
+                        blank=True,
+                        choices=[
+                            ("backlog", "Backlog"),
+                            ("implementing", "Implementing"),
+                            ("testing", "Testing"),
+                            ("deployed", "Deployed"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("backlog", "Backlog"),
+                            ("implementing", "Implementing"),
+                            ("testing", "Testing"),
+                            ("deployed", "Deployed"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("story_points", models.IntegerField(blank=True, null=True)),
+                ("changed_at", models.DateTimeField(default=django.utils.timezone.now)),
+                (
+                    "sprint",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to="projects.sprint",
+                    ),
+                ),
+                (
+                    "task",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="status_events",
+                        to="projects.task",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["changed_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["sprint", "changed_at"], name="status_event_sprint_idx"
+                    ),
+                    models.Index(
+                        fields=["task", "changed_at"], name="status_event_task_idx"
+                    ),
+                ],
+            },
+        ),
+        migrations.RunPython(log_current_status, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.3 on 2026-10-17 21:35
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("projects", "0007_sprint_analytics"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(fields=["created_at"], name="comment_created_idx"),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.1.3 on 2026-10-17 22:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def copy_task_projects(apps, schema_editor):
+    Comment = apps.get_model("projects", "Comment")
+    Task = apps.get_model("projects", "Task")
+    Comment.objects.update(
+        project_id=models.Subquery(
+            Task.objects.filter(pk=models.OuterRef("task_id")).values("project_id")[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("projects", "0009_task_project_order_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="comment",
+            name="project",
+            field=models.ForeignKey(
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="comments",
+                to="projects.project",
+            ),
+        ),
+        migrations.RunPython(copy_task_projects, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="comment",
+            name="project",
+            field=models.ForeignKey(
+                editable=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="comments",
+                to="projects.project",
+            ),
+        ),
+        migrations.RemoveIndex(
+            model_name="comment",
+            name="comment_updated_idx",
+        ),
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                fields=["project", "updated_at"], name="comment_project_updated_idx"
+            ),
+        ),
+    ]
@@ -1,12 +1,162 @@
 import uuid
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models.functions import Coalesce
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
 
 User = get_user_model()
 
 
-class Project(models.Model):
+class ProjectAccessQuerySet(models.QuerySet):
+    """
+    Base QuerySet for models whose access is granted through a project.
+
+    `project_path` is the lookup from the model to its project ('' for
+    Project itself).
+    """
+    project_path = ''
+
+    def visible_to(self, user):
+        """
+        Restrict to rows in projects the user owns or is a member of.
+
+        Membership is tested with a correlated EXISTS on the members table
+        instead of joining it, so rows are never duplicated and no DISTINCT
+        is needed.
+        """
+        prefix = f'{self.project_path}__' if self.project_path else ''
+        is_member = Project.members.through.objects.filter(
+            project_id=models.OuterRef(f'{prefix}pk'),
+            user_id=user.pk
+        )
+        return self.filter(
+            models.Q(**{f'{prefix}owner': user.pk}) | models.Exists(is_member)
+        )
+
+
+class ProjectQuerySet(ProjectAccessQuerySet):
+    """
+    QuerySet helpers for projects.
+    """
+    def with_stats(self):
+        """
+        Annotate the counters and active sprint used by ProjectSerializer.
+
+        Task counts are stored on the project (see TaskCounters); members,
+        sprints and the active sprint use correlated subqueries so no join
+        multiplies the rows.
+        """
+        members_count = Project.members.through.objects.filter(
+            project_id=models.OuterRef('pk')
+        ).order_by().values('project_id').annotate(
+            count=models.Count('pk')
+        ).values('count')
+        sprints_count = Sprint.objects.filter(
+            project_id=models.OuterRef('pk')
+        ).order_by().values('project_id').annotate(
+            count=models.Count('pk')
+        ).values('count')
+        active_sprint = Sprint.objects.filter(
+            project_id=models.OuterRef('pk'),
+            status='active'
+        ).order_by('-start_date')
+
+        return self.select_related('owner').prefetch_related('members').annotate(
+            members_count=Coalesce(
+                models.Subquery(members_count), 0
+            ),
+            sprints_count=Coalesce(
+                models.Subquery(sprints_count), 0
+            ),
+            active_sprint_pk=models.Subquery(active_sprint.values('id')[:1]),
+            active_sprint_name=models.Subquery(active_sprint.values('name')[:1]),
+            active_sprint_start=models.Subquery(
+                active_sprint.values('start_date')[:1]
+            ),
+            active_sprint_end=models.Subquery(active_sprint.values('end_date')[:1]),
+        )
+
+
+class SprintQuerySet(ProjectAccessQuerySet):
+    project_path = 'project'
+
+
+class TaskQuerySet(ProjectAccessQuerySet):
+    project_path = 'project'
+
+    def with_details(self):
+        """
+        Load the users and comment count used by TaskSerializer in the same
+        query.
+        """
+        comments_count = Comment.objects.filter(
+            task_id=models.OuterRef('pk')
+        ).order_by().values('task_id').annotate(
+            count=models.Count('pk')
+        ).values('count')
+        return self.select_related('assigned_to', 'created_by').annotate(
+            comments_count=Coalesce(models.Subquery(comments_count), 0)
+        )
+
+
+class CommentQuerySet(ProjectAccessQuerySet):
+    project_path = 'task__project'
+
+    def follow_tasks(self, tasks):
+        """
+        Move the comments of tasks moved between projects to the task's new
+        project, touching them so the new project's sync clients get them.
+        """
+        now = timezone.now()
+        for task in tasks:
+            self.filter(task_id=task.pk).update(project_id=task.project_id, updated_at=now)
+
+
+class TaskCounters(models.Model):
+    """
+    Denormalized task totals, kept current by projects.counters.
+    """
+    tasks_total = models.PositiveIntegerField(default=0, editable=False)
+    tasks_backlog = models.PositiveIntegerField(default=0, editable=False)
+    tasks_implementing = models.PositiveIntegerField(default=0, editable=False)
+    tasks_testing = models.PositiveIntegerField(default=0, editable=False)
+    tasks_deployed = models.PositiveIntegerField(default=0, editable=False)
+    points_deployed = models.PositiveIntegerField(default=0, editable=False)
+
+    COUNTER_FIELDS = [
+        'tasks_total', 'tasks_backlog', 'tasks_implementing', 'tasks_testing',
+        'tasks_deployed', 'points_deployed',
+    ]
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        # Counters are only ever changed with F() updates; never write back
+        # possibly stale in-memory values when saving an existing row.
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
+    def get_tasks_by_status(self):
+        return {
+            status: getattr(self, f'tasks_{status}')
+            for status, _ in Task.STATUS_CHOICES
+        }
+
+    def get_completion_percentage(self):
+        """Calculate the percentage of deployed tasks."""
+        if self.tasks_total == 0:
+            return 0
+        return int((self.tasks_deployed / self.tasks_total) * 100)
+
+
+class Project(TaskCounters):
     """
     Project model representing a project with team members.
     """
@@ -26,6 +176,8 @@ class Project(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ProjectQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created_at']
 
@@ -37,7 +189,7 @@ class Project(models.Model):
         return user == self.owner or self.members.filter(id=user.id).exists()
 
 
-class Sprint(models.Model):
+class Sprint(TaskCounters):
     """
     Sprint model representing a time-boxed iteration within a project.
     """
@@ -65,43 +217,46 @@ class Sprint(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = SprintQuerySet.as_manager()
+
     class Meta:
         ordering = ['-start_date']
+        indexes = [
+            models.Index(fields=['project', 'status'], name='sprint_project_status_idx'),
+            models.Index(fields=['project', 'updated_at'], name='sprint_project_updated_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['project'],
+                condition=models.Q(status='active'),
+                name='one_active_sprint_per_project',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.project.name} - {self.name}"
 
     def clean(self):
-        """Validate sprint dates and active sprint constraints."""
+        """Validate sprint dates."""
         if self.end_date and self.start_date and self.end_date <= self.start_date:
             raise ValidationError('End date must be after start date.')
 
-        # Check only one active sprint per project
-        if self.status == 'active':
-            active_sprints = Sprint.objects.filter(
-                project=self.project,
-                status='active'
-            ).exclude(id=self.id)
-            if active_sprints.exists():
-                raise ValidationError('Only one active sprint allowed per project.')
-
     def save(self, *args, **kwargs):
         self.clean()
-        super().save(*args, **kwargs)
+        # One active sprint per project is enforced by a partial unique index.
+        try:
+            with transaction.atomic():
+                super().save(*args, **kwargs)
+        except IntegrityError as e:
+            if self.status == 'active':
+                raise ValidationError('Only one active sprint allowed per project.') from e
+            raise
 
     @property
     def is_active(self):
         """Check if sprint is currently active."""
         return self.status == 'active'
 
-    def get_completion_percentage(self):
-        """Calculate the percentage of completed tasks in this sprint."""
-        total_tasks = self.tasks.count()
-        if total_tasks == 0:
-            return 0
-        completed_tasks = self.tasks.filter(status='deployed').count()
-        return int((completed_tasks / total_tasks) * 100)
-
 
 class Task(models.Model):
     """
@@ -162,12 +317,55 @@ class Task(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = TaskQuerySet.as_manager()
+
+    COUNTED_FIELDS = ('project_id', 'sprint_id', 'status', 'story_points')
+    # The values copied into the task's search document (see projects.search).
+    INDEXED_FIELDS = ('project_id', 'title', 'description')
+
     class Meta:
         ordering = ['order', '-created_at']
+        indexes = [
+            models.Index(fields=['project', 'status'], name='task_project_status_idx'),
+            models.Index(fields=['sprint', 'status'], name='task_sprint_status_idx'),
+            models.Index(fields=['project', 'sprint'], name='task_project_sprint_idx'),
+            models.Index(
+                fields=['project', 'order', '-created_at'], name='task_project_order_idx'
+            ),
+            models.Index(fields=['project', 'updated_at'], name='task_project_updated_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.snapshot_counted_state()
+        instance.snapshot_indexed_state()
+        return instance
+
+    def get_counted_state(self):
+        """The values that feed the project and sprint counters."""
+        return tuple(getattr(self, name) for name in self.COUNTED_FIELDS)
+
+    def snapshot_counted_state(self):
+        """Remember the counted values as stored, or None if any is deferred."""
+        if all(name in self.__dict__ for name in self.COUNTED_FIELDS):
+            self._counted_state = self.get_counted_state()
+        else:
+            self._counted_state = None
+
+    def get_indexed_state(self):
+        return tuple(getattr(self, name) for name in self.INDEXED_FIELDS)
+
+    def snapshot_indexed_state(self):
+        """Remember the indexed values as stored, or None if any is deferred."""
+        if all(name in self.__dict__ for name in self.INDEXED_FIELDS):
+            self._indexed_state = self.get_indexed_state()
+        else:
+            self._indexed_state = None
+
 
 class Comment(models.Model):
     """
@@ -179,6 +377,14 @@ class Comment(models.Model):
         related_name='comments',
         on_delete=models.CASCADE
     )
+    # The task's project, copied so the changes feed can range scan
+    # (project, updated_at) without joining tasks.
+    project = models.ForeignKey(
+        Project,
+        related_name='comments',
+        on_delete=models.CASCADE,
+        editable=False
+    )
     user = models.ForeignKey(
         User,
         related_name='comments',
@@ -188,8 +394,177 @@ class Comment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CommentQuerySet.as_manager()
+
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['task', 'created_at'], name='comment_task_created_idx'),
+            models.Index(fields=['project', 'updated_at'], name='comment_project_updated_idx'),
+            models.Index(fields=['created_at'], name='comment_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.email} on {self.task.title}: {self.text[:50]}"
+
+    def save(self, *args, **kwargs):
+        if Comment.task.is_cached(self):
+            self.project_id = self.task.project_id
+        elif self.project_id is None and self.task_id is not None:
+            self.project_id = (
+                Task.objects.filter(pk=self.task_id)
+                .values_list('project_id', flat=True)
+                .first()
+            )
+        super().save(*args, **kwargs)
+
+
+class Tombstone(models.Model):
+    """
+    Record of a deleted task, sprint or comment, so incremental sync clients
+    can drop it.
+    """
+    KIND_CHOICES = [
+        ('task', 'Task'),
+        ('sprint', 'Sprint'),
+        ('comment', 'Comment'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    project = models.ForeignKey(
+        Project,
+        related_name='tombstones',
+        on_delete=models.CASCADE
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.UUIDField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['deleted_at']
+        indexes = [
+            models.Index(fields=['project', 'deleted_at'], name='tombstone_project_deleted_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id}"
+
+
+class SearchDocument(models.Model):
+    """
+    Searchable text of a project, sprint, task or comment, kept in sync by
+    projects.signals and indexed per database (see projects.search).
+
+    The integer primary key doubles as the SQLite FTS5 rowid. The nullable
+    foreign keys point at the indexed row, so deleting it (or anything it
+    cascades from) deletes the document too.
+    """
+    KIND_CHOICES = [
+        ('project', 'Project'),
+        ('sprint', 'Sprint'),
+        ('task', 'Task'),
+        ('comment', 'Comment'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.UUIDField()
+    project = models.ForeignKey(
+        Project,
+        related_name='search_documents',
+        on_delete=models.CASCADE
+    )
+    sprint = models.ForeignKey(
+        Sprint,
+        related_name='+',
+        null=True,
+        on_delete=models.CASCADE
+    )
+    task = models.ForeignKey(
+        Task,
+        related_name='+',
+        null=True,
+        on_delete=models.CASCADE
+    )
+    comment = models.ForeignKey(
+        Comment,
+        related_name='+',
+        null=True,
+        on_delete=models.CASCADE
+    )
+    title = models.CharField(max_length=300, blank=True)
+    body = models.TextField(blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['kind', 'object_id'], name='search_document_object_unique'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id}"
+
+
+class TaskStatusEvent(models.Model):
+    """
+    A change of a task's status or sprint, written by
+    projects.counters.record_task_changes. The log feeds the sprint
+    analytics (see projects.analytics).
+
+    `sprint` and `story_points` are the task's values after the change;
+    `from_status` is blank for a newly created task.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    task = models.ForeignKey(
+        Task,
+        related_name='status_events',
+        on_delete=models.CASCADE
+    )
+    sprint = models.ForeignKey(
+        Sprint,
+        related_name='+',
+        null=True,
+        on_delete=models.SET_NULL
+    )
+    from_status = models.CharField(
+        max_length=20,
+        choices=Task.STATUS_CHOICES,
+        blank=True
+    )
+    status = models.CharField(max_length=20, choices=Task.STATUS_CHOICES)
+    story_points = models.IntegerField(null=True, blank=True)
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['changed_at']
+        indexes = [
+            models.Index(fields=['sprint', 'changed_at'], name='status_event_sprint_idx'),
+            models.Index(fields=['task', 'changed_at'], name='status_event_task_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.task_id}: {self.from_status or '-'} -> {self.status}"
+
+
+class SprintAnalyticsQuerySet(ProjectAccessQuerySet):
+    project_path = 'sprint__project'
+
+
+class SprintAnalytics(models.Model):
+    """
+    Burndown, velocity and cycle time of a completed sprint, computed once
+    when the sprint is completed (see projects.analytics).
+    """
+    sprint = models.OneToOneField(
+        Sprint,
+        primary_key=True,
+        related_name='analytics',
+        on_delete=models.CASCADE
+    )
+    data = models.JSONField(encoder=DjangoJSONEncoder)
+    computed_at = models.DateTimeField(auto_now=True)
+
+    objects = SprintAnalyticsQuerySet.as_manager()
+
+    def __str__(self):
+        return f"Analytics for {self.sprint_id}"
@@ -0,0 +1,147 @@
+"""
+Sparse ordering for tasks within a board column.
+
+Tasks in a column (same project, sprint and status) are ordered by
+(order, -created_at, id). Orders are spaced ORDER_GAP apart so a card can
+usually be dropped between two neighbours by giving it the midpoint, which
+touches a single row. Only when two neighbours are adjacent integers is the
+column renumbered.
+"""
+from django.db.models import Max
+
+from .models import Task
+
+ORDER_GAP = 1024
+
+
+def next_order(project_id, sprint_id, status):
+    """Return an order that places a new task at the end of its column."""
+    last = Task.objects.filter(
+        project_id=project_id,
+        sprint_id=sprint_id,
+        status=status
+    ).aggregate(last=Max('order'))['last']
+    return ORDER_GAP if last is None else last + ORDER_GAP
+
+
+def assign_next_orders(tasks):
+    """
+    Append unsaved tasks to the end of their columns, in list order, with a
+    single grouped query for the current column ends.
+    """
+    if not tasks:
+        return
+
+    last_orders = {
+        (row['project_id'], row['sprint_id'], row['status']): row['last']
+        for row in Task.objects.filter(
+            project_id__in={task.project_id for task in tasks}
+        ).order_by().values('project_id', 'sprint_id', 'status').annotate(
+            last=Max('order')
+        )
+    }
+    for task in tasks:
+        key = (task.project_id, task.sprint_id, task.status)
+        last_orders[key] = last_orders.get(key, 0) + ORDER_GAP
+        task.order = last_orders[key]
+
+
+def _sort_key(entry):
+    return (entry['order'], -entry['created_at'].timestamp(), str(entry['id']))
+
+
+class ColumnPlanner:
+    """
+    Plan a batch of task moves, computing sparse orders in memory.
+
+    Each target column is loaded once (id, order, created_at only). Tasks
+    being moved are excluded from the loaded columns and re-inserted as they
+    are placed, so moves within one batch see each other's positions.
+    """
+    def __init__(self, moving_ids):
+        self.moving_ids = set(moving_ids)
+        self.columns = {}
+        self.placed = {}
+        # id -> new order for tasks that are not part of the batch but had
+        # to be renumbered.
+        self.renumbered = {}
+
+    def _column(self, key):
+        if key not in self.columns:
+            project_id, sprint_id, status = key
+            rows = Task.objects.filter(
+                project_id=project_id,
+                sprint_id=sprint_id,
+                status=status
+            ).exclude(
+                id__in=self.moving_ids
+            ).values('id', 'order', 'created_at')
+            self.columns[key] = sorted(rows, key=_sort_key)
+        return self.columns[key]
+
+    def _remove(self, task_id):
+        for column in self.columns.values():
+            for index, entry in enumerate(column):
+                if entry['id'] == task_id:
+                    del column[index]
+                    return
+
+    def place(self, task, after_id):
+        """
+        Place `task` directly after `after_id` (None for the top) in the
+        column given by its current project, sprint and status.
+
+        Returns False if `after_id` is not in that column.
+        """
+        self._remove(task.id)
+        column = self._column((task.project_id, task.sprint_id, task.status))
+
+        if after_id is None:
+            index = 0
+        else:
+            positions = [entry['id'] for entry in column]
+            if after_id not in positions:
+                return False
+            index = positions.index(after_id) + 1
+
+        previous = column[index - 1]['order'] if index > 0 else None
+        following = column[index]['order'] if index < len(column) else None
+
+        if previous is None and following is None:
+            order = ORDER_GAP
+        elif previous is None:
+            order = following - ORDER_GAP
+        elif following is None:
+            order = previous + ORDER_GAP
+        elif following - previous > 1:
+            order = (previous + following) // 2
+        else:
+            order = None
+
+        entry = {'id': task.id, 'order': order, 'created_at': task.created_at}
+        column.insert(index, entry)
+        self.placed[task.id] = task
+
+        if order is None:
+            # No room between the neighbours: spread the whole column out.
+            for position, item in enumerate(column, start=1):
+                item['order'] = position * ORDER_GAP
+                if item['id'] in self.placed:
+                    self.placed[item['id']].order = item['order']
+                else:
+                    self.renumbered[item['id']] = item['order']
+
+        task.order = entry['order']
+        return True
+
+    def track(self, task):
+        """Record a task moved with an explicit order in its target column."""
+        self._remove(task.id)
+        self.placed[task.id] = task
+        key = (task.project_id, task.sprint_id, task.status)
+        if key in self.columns:
+            column = self.columns[key]
+            column.append(
+                {'id': task.id, 'order': task.order, 'created_at': task.created_at}
+            )
+            column.sort(key=_sort_key)
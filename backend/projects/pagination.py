@@ -0,0 +1,151 @@
+import datetime
+import decimal
+import json
+import operator
+import uuid
+from functools import reduce
+
+from django.db import models
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, Cursor
+
+
+class KeysetCursorPagination(CursorPagination):
+    """
+    Cursor pagination that seeks on the full ordering tuple.
+
+    DRF's CursorPagination only positions on the first ordering field and
+    falls back to an offset for ties, which degrades to OFFSET scans when
+    that field has many duplicates (e.g. Task.order defaults to 0). Here the
+    cursor stores every ordering value and the page is fetched with a
+    lexicographic keyset filter, with `id` appended as a unique tie-breaker,
+    so page cost stays constant at any depth.
+
+    Ordering fields must be non-nullable model fields.
+
+    Send `?paginate=false` to get the plain, unpaginated list.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = ('-created_at',)
+    tie_breaker = 'id'
+    opt_out_query_param = 'paginate'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.get_page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self.set_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset() for async views, fetching with the async ORM."""
+        queryset = self.get_page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self.set_page([item async for item in queryset])
+
+    def get_page_queryset(self, queryset, request, view=None):
+        """
+        Return the queryset for the requested page (one row past the page
+        size, to detect more), or None when pagination is off. Does not
+        touch the database.
+        """
+        if request.query_params.get(self.opt_out_query_param) == 'false':
+            return None
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+
+        if self.cursor is None:
+            self.reverse, self.position = False, None
+        else:
+            self.reverse = self.cursor.reverse
+            try:
+                self.position = json.loads(self.cursor.position)
+            except (TypeError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+            if not isinstance(self.position, list) or len(self.position) != len(self.ordering):
+                raise NotFound(self.invalid_cursor_message)
+
+        ordering = self._reverse_ordering(self.ordering) if self.reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if self.position is not None:
+            queryset = queryset.filter(self._keyset_filter(ordering, self.position))
+        return queryset[:self.page_size + 1]
+
+    def set_page(self, results):
+        """Trim the fetched rows to the page and work out the links."""
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if self.reverse:
+            self.page.reverse()
+            self.has_previous = has_more
+            self.has_next = self.position is not None
+        else:
+            self.has_next = has_more
+            self.has_previous = self.position is not None
+
+        return self.page
+
+    def get_ordering(self, request, queryset, view):
+        ordering = tuple(super().get_ordering(request, queryset, view))
+        names = {field.lstrip('-') for field in ordering}
+        if self.tie_breaker not in names and 'pk' not in names:
+            ordering += (self.tie_breaker,)
+        return ordering
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        cursor = Cursor(
+            offset=0, reverse=False, position=self._position(self.page[-1])
+        )
+        return self.encode_cursor(cursor)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        cursor = Cursor(
+            offset=0, reverse=True, position=self._position(self.page[0])
+        )
+        return self.encode_cursor(cursor)
+
+    def _position(self, item):
+        """Serialize the ordering values of `item` into a cursor position."""
+        values = []
+        for field in self.ordering:
+            value = operator.attrgetter(field.lstrip('-'))(item)
+            if isinstance(value, (datetime.date, datetime.time)):
+                value = value.isoformat()
+            elif isinstance(value, (uuid.UUID, decimal.Decimal)):
+                value = str(value)
+            values.append(value)
+        return json.dumps(values)
+
+    @staticmethod
+    def _reverse_ordering(ordering):
+        return tuple(
+            field[1:] if field.startswith('-') else f'-{field}'
+            for field in ordering
+        )
+
+    @staticmethod
+    def _keyset_filter(ordering, position):
+        """
+        Build `(f1, f2, ...) > (v1, v2, ...)` honouring each field's direction.
+        """
+        conditions = []
+        equal = models.Q()
+        for field, value in zip(ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            conditions.append(equal & models.Q(**{f'{name}__{lookup}': value}))
+            equal &= models.Q(**{name: value})
+        return reduce(operator.or_, conditions)
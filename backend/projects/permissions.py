@@ -1,21 +1,24 @@
 from rest_framework import permissions
 
+from .membership import get_project_access
+
+
+def get_project_id(obj):
+    """Get the project ID from different object types without loading the project."""
+    if hasattr(obj, 'project_id'):
+        return obj.project_id
+    elif hasattr(obj, 'task'):
+        return obj.task.project_id
+    return obj.pk
+
 
 class IsProjectMember(permissions.BasePermission):
     """
     Permission to check if user is a member or owner of the project.
     """
     def has_object_permission(self, request, view, obj):
-        # Get the project from different object types
-        if hasattr(obj, 'project'):
-            project = obj.project
-        elif hasattr(obj, 'task'):
-            project = obj.task.project
-        else:
-            project = obj
-
         # Check if user is owner or member
-        return project.is_member(request.user)
+        return get_project_access(request).is_member(get_project_id(obj))
 
 
 class IsProjectOwner(permissions.BasePermission):
@@ -23,15 +26,7 @@ class IsProjectOwner(permissions.BasePermission):
     Permission to check if user is the owner of the project.
     """
     def has_object_permission(self, request, view, obj):
-        # Get the project from different object types
-        if hasattr(obj, 'project'):
-            project = obj.project
-        elif hasattr(obj, 'task'):
-            project = obj.task.project
-        else:
-            project = obj
-
-        return project.owner == request.user
+        return get_project_access(request).is_owner(get_project_id(obj))
 
 
 class IsTaskCreatorOrAssignee(permissions.BasePermission):
@@ -40,15 +35,17 @@ class IsTaskCreatorOrAssignee(permissions.BasePermission):
     Also allows project members to view tasks.
     """
     def has_object_permission(self, request, view, obj):
+        access = get_project_access(request)
+
         # Allow read access to all project members
         if request.method in permissions.SAFE_METHODS:
-            return obj.project.is_member(request.user)
+            return access.is_member(obj.project_id)
 
         # Allow edit/delete only for creator or assignee
         return (
-            obj.created_by == request.user or
-            obj.assigned_to == request.user or
-            obj.project.owner == request.user
+            obj.created_by_id == request.user.pk or
+            obj.assigned_to_id == request.user.pk or
+            access.is_owner(obj.project_id)
         )
 
 
@@ -59,7 +56,7 @@ class IsCommentOwner(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         # Allow read access to project members
         if request.method in permissions.SAFE_METHODS:
-            return obj.task.project.is_member(request.user)
+            return get_project_access(request).is_member(obj.task.project_id)
 
         # Allow edit/delete only for comment owner
-        return obj.user == request.user
+        return obj.user_id == request.user.pk
@@ -0,0 +1,209 @@
+"""
+Real-time fan-out of board changes.
+
+Writes publish compact deltas for tasks, sprints and comments to a
+per-project channel once their transaction commits. WebSocket connections
+(see projects.consumers) subscribe to the channel of the project they are
+watching. Each message is encoded to JSON once, however many subscribers it
+reaches.
+
+Membership changes publish an access_message() on the project's channel so
+connections recheck their user's access instead of streaming to a user who
+was removed.
+
+The broker is pluggable through REALTIME_BROKER. InMemoryBroker only reaches
+subscribers in the publishing process; RedisBroker uses Redis pub/sub so
+every worker process sees every message.
+"""
+import asyncio
+import json
+import threading
+from collections import defaultdict
+from contextlib import asynccontextmanager
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+CHANNEL = 'project:{project_id}'
+
+# Sent to a subscriber that fell too far behind; it should resync.
+OVERFLOW = object()
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+class InMemoryBroker:
+    """
+    Process-local pub/sub. Subscribers are asyncio queues, fed thread-safely
+    so sync views running in worker threads can publish.
+    """
+    def __init__(self, queue_size=1000):
+        self.queue_size = queue_size
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(self._offer, queue, message)
+
+    @staticmethod
+    def _offer(queue, message):
+        try:
+            queue.put_nowait(message)
+        except asyncio.QueueFull:
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(OVERFLOW)
+
+    @asynccontextmanager
+    async def subscribe(self, channel):
+        subscriber = (asyncio.get_running_loop(), asyncio.Queue(self.queue_size))
+        with self._lock:
+            self._subscribers[channel].add(subscriber)
+
+        async def messages():
+            while True:
+                yield await subscriber[1].get()
+
+        try:
+            yield messages()
+        finally:
+            with self._lock:
+                self._subscribers[channel].discard(subscriber)
+                if not self._subscribers[channel]:
+                    del self._subscribers[channel]
+
+
+class RedisBroker:
+    """Pub/sub through Redis (requires the redis package and REDIS_URL)."""
+    def __init__(self, url=None):
+        import redis
+
+        self.url = url or settings.REDIS_URL
+        self.client = redis.Redis.from_url(self.url)
+
+    def publish(self, channel, message):
+        self.client.publish(channel, message)
+
+    @asynccontextmanager
+    async def subscribe(self, channel):
+        import redis.asyncio
+
+        client = redis.asyncio.Redis.from_url(self.url)
+        pubsub = client.pubsub()
+        await pubsub.subscribe(channel)
+
+        async def messages():
+            async for message in pubsub.listen():
+                if message['type'] == 'message':
+                    yield message['data'].decode()
+
+        try:
+            yield messages()
+        finally:
+            await pubsub.unsubscribe(channel)
+            await pubsub.aclose()
+            await client.aclose()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(settings.REALTIME_BROKER)()
+    return _broker
+
+
+def task_delta(task, action):
+    delta = {'type': 'task', 'action': action, 'id': task.pk}
+    if action != 'deleted':
+        delta['data'] = {
+            'title': task.title,
+            'status': task.status,
+            'priority': task.priority,
+            'story_points': task.story_points,
+            'order': task.order,
+            'sprint': task.sprint_id,
+            'assigned_to': task.assigned_to_id,
+            'created_by': task.created_by_id,
+            'updated_at': task.updated_at,
+        }
+    return delta
+
+
+def order_delta(task_id, order, updated_at):
+    """A neighbour renumbered to make room for a moved task."""
+    return {
+        'type': 'task',
+        'action': 'reordered',
+        'id': task_id,
+        'data': {'order': order, 'updated_at': updated_at},
+    }
+
+
+def sprint_delta(sprint, action):
+    delta = {'type': 'sprint', 'action': action, 'id': sprint.pk}
+    if action != 'deleted':
+        delta['data'] = {
+            'name': sprint.name,
+            'status': sprint.status,
+            'start_date': sprint.start_date,
+            'end_date': sprint.end_date,
+            'updated_at': sprint.updated_at,
+        }
+    return delta
+
+
+def comment_delta(comment, action):
+    delta = {'type': 'comment', 'action': action, 'id': comment.pk}
+    if action != 'deleted':
+        delta['data'] = {
+            'task': comment.task_id,
+            'user': comment.user_id,
+            'text': comment.text,
+            'created_at': comment.created_at,
+        }
+    return delta
+
+
+def publish(project_id, deltas):
+    """Publish deltas to the project's channel when the transaction commits."""
+    if not deltas or not getattr(settings, 'REALTIME_ENABLED', True):
+        return
+    message = json.dumps(
+        {'project': project_id, 'deltas': deltas}, cls=DjangoJSONEncoder
+    )
+    channel = CHANNEL.format(project_id=project_id)
+    transaction.on_commit(lambda: get_broker().publish(channel, message))
+
+
+def access_message(project_id):
+    """Tells a project's connections to recheck access; never forwarded."""
+    return json.dumps({'project': str(project_id), 'access': 'changed'})
+
+
+def publish_access_change(project_ids):
+    """Make the projects' connections recheck access once the transaction commits."""
+    if not getattr(settings, 'REALTIME_ENABLED', True):
+        return
+    for project_id in set(project_ids):
+        channel = CHANNEL.format(project_id=project_id)
+        message = access_message(project_id)
+        transaction.on_commit(
+            lambda channel=channel, message=message: get_broker().publish(channel, message)
+        )
+
+
+def publish_task_changes(tasks, action):
+    """Publish one message per project for a batch of tasks."""
+    deltas = defaultdict(list)
+    for task in tasks:
+        deltas[task.project_id].append(task_delta(task, action))
+    for project_id, project_deltas in deltas.items():
+        publish(project_id, project_deltas)
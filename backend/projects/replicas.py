@@ -0,0 +1,111 @@
+"""
+Read-replica routing for the API's read traffic.
+
+DATABASE_REPLICA_URLS adds read replicas of the default database as
+DATABASES['replica_1'], ['replica_2'], ... and lists them in
+REPLICA_DATABASES. ReplicaReadMixin then sends the queries of safe
+`replica_actions` requests (list and retrieve) to one of them, picked at
+random per request. Everything else goes to the primary:
+
+- writes, and every query made while serving a write request;
+- reads by a user who wrote in the last REPLICA_LAG_SECONDS, so they see
+  their own changes even if the replica has not caught up;
+- queries made before the view runs (authentication) or outside the API.
+
+Without replicas configured the router has no effect.
+
+A response or project access computed from a replica can lag a write that
+has already bumped the project version, so while reading from a replica
+those caches keep entries for at most REPLICA_LAG_SECONDS (see
+replica_cache_timeout()), and such responses carry no ETag or Last-Modified
+(see projects.conditional).
+"""
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.permissions import SAFE_METHODS
+
+RECENT_WRITE_KEY = 'recent-write:{user_id}'
+
+# The replica serving the current request's reads, if any.
+_read_database = ContextVar('read_database', default=None)
+
+
+def replica_databases():
+    return getattr(settings, 'REPLICA_DATABASES', [])
+
+
+def replica_lag():
+    return getattr(settings, 'REPLICA_LAG_SECONDS', 0)
+
+
+def reading_from_replica():
+    return _read_database.get() is not None
+
+
+def replica_cache_timeout(timeout):
+    """`timeout`, capped at the replica lag while reading from a replica."""
+    if reading_from_replica():
+        return min(timeout, replica_lag())
+    return timeout
+
+
+def mark_recent_write(user):
+    """Send the user's reads to the primary for the next REPLICA_LAG_SECONDS."""
+    if replica_lag():
+        cache.set(RECENT_WRITE_KEY.format(user_id=user.pk), True, replica_lag())
+
+
+def wrote_recently(user):
+    return bool(cache.get(RECENT_WRITE_KEY.format(user_id=user.pk)))
+
+
+class ReplicaRouter:
+    """
+    Route reads to the replica chosen for the current request, and all
+    writes to the primary.
+    """
+    def db_for_read(self, model, **hints):
+        return _read_database.get()
+
+    def db_for_write(self, model, **hints):
+        # Not None: Django would otherwise write rows read from a replica
+        # back to the replica.
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary.
+        return True
+
+
+class ReplicaReadMixin:
+    """
+    Viewset mixin serving safe `replica_actions` requests from a read replica.
+    """
+    replica_actions = ['list', 'retrieve']
+
+    def use_replica(self, request):
+        return (
+            request.method in SAFE_METHODS
+            and self.action in self.replica_actions
+            and request.user.is_authenticated
+            and not wrote_recently(request.user)
+        )
+
+    def initial(self, request, *args, **kwargs):
+        replicas = replica_databases()
+        # Accessing request.user authenticates before any read is routed.
+        if replicas and self.use_replica(request):
+            _read_database.set(random.choice(replicas))
+        super().initial(request, *args, **kwargs)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        # The var may have been set in another context (async views), so it
+        # is cleared rather than reset with a token.
+        _read_database.set(None)
+        if (request.method not in SAFE_METHODS and response.status_code < 400
+                and request.user.is_authenticated and replica_databases()):
+            mark_recent_write(request.user)
+        return super().finalize_response(request, response, *args, **kwargs)
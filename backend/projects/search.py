@@ -0,0 +1,199 @@
+"""
+Ranked full-text search over projects, sprints, tasks and comments.
+
+Every searchable row has a SearchDocument (title and body) written by
+projects.signals on save and removed by cascade on delete. The documents
+are indexed by the database itself, so the index cannot drift from them:
+
+- PostgreSQL: a stored generated tsvector column, `vector`, with titles
+  weighted above bodies, and a GIN index on it. Ranked with ts_rank_cd.
+- SQLite: an external-content FTS5 table kept in step with the documents
+  by triggers. Ranked with bm25, titles weighted 10:1.
+
+Both are created by migration 0006. A query matches documents containing
+every word of `q`, after stemming (so "deploy" finds "deploying"). Only
+documents holding those words are read and ranked, so the cost follows the
+number of matches rather than the table size. Prefix matching is left out
+on purpose: a short prefix can expand to a large share of the vocabulary,
+and every document it matches has to be ranked.
+"""
+import re
+
+from django.db import connection
+
+from .models import Comment, Project, SearchDocument, Sprint, Task
+
+SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+
+# Words beyond this are ignored.
+MAX_TERMS = 10
+
+POSTGRES_CONFIG = 'english'
+
+FTS_TABLE = 'projects_searchdocument_fts'
+
+# Task fields a bulk update must change for its documents to be rewritten.
+INDEXED_TASK_FIELDS = {'title', 'description', 'project'}
+
+# (SELECT producing document rows, its project column) per kind, for
+# INSERT ... SELECT rebuilds.
+DOCUMENT_SOURCES = [
+    ("SELECT 'project', p.id, p.id, NULL, NULL, NULL, p.name, p.description "
+     "FROM projects_project p", 'p.id'),
+    ("SELECT 'sprint', s.id, s.project_id, s.id, NULL, NULL, s.name, s.goal "
+     "FROM projects_sprint s", 's.project_id'),
+    ("SELECT 'task', t.id, t.project_id, NULL, t.id, NULL, t.title, t.description "
+     "FROM projects_task t", 't.project_id'),
+    ("SELECT 'comment', c.id, t.project_id, NULL, c.task_id, c.id, '', c.text "
+     "FROM projects_comment c JOIN projects_task t ON t.id = c.task_id", 't.project_id'),
+]
+
+DOCUMENT_COLUMNS = (
+    'kind, object_id, project_id, sprint_id, task_id, comment_id, title, body'
+)
+
+
+def document_for(instance):
+    """Return the unsaved SearchDocument for a project, sprint, task or comment."""
+    if isinstance(instance, Project):
+        return SearchDocument(
+            kind='project', object_id=instance.pk, project_id=instance.pk,
+            title=instance.name, body=instance.description
+        )
+    if isinstance(instance, Sprint):
+        return SearchDocument(
+            kind='sprint', object_id=instance.pk, project_id=instance.project_id,
+            sprint_id=instance.pk, title=instance.name, body=instance.goal
+        )
+    if isinstance(instance, Task):
+        return SearchDocument(
+            kind='task', object_id=instance.pk, project_id=instance.project_id,
+            task_id=instance.pk, title=instance.title, body=instance.description
+        )
+    return SearchDocument(
+        kind='comment', object_id=instance.pk, project_id=instance.task.project_id,
+        task_id=instance.task_id, comment_id=instance.pk, body=instance.text
+    )
+
+
+def index(instances):
+    """Insert or update the documents of the instances with one upsert."""
+    SearchDocument.objects.bulk_create(
+        [document_for(instance) for instance in instances],
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=['kind', 'object_id'],
+        update_fields=['project', 'title', 'body'],
+    )
+
+
+def move_comments(tasks):
+    """Point the comment documents of tasks moved between projects at the new project."""
+    for task in tasks:
+        SearchDocument.objects.filter(kind='comment', task_id=task.pk).update(
+            project_id=task.project_id
+        )
+
+
+def reindex(project_ids=None):
+    """
+    Rebuild the documents of the given projects (default: all) with one
+    INSERT ... SELECT per kind. Returns the number of documents written.
+    """
+    documents = SearchDocument.objects.all()
+    params = []
+    if project_ids is not None:
+        project_ids = list(project_ids)
+        if not project_ids:
+            return 0
+        documents = documents.filter(project_id__in=project_ids)
+        pk_field = Project._meta.pk
+        params = [pk_field.get_db_prep_value(pk, connection) for pk in project_ids]
+    documents.delete()
+
+    written = 0
+    with connection.cursor() as cursor:
+        for select, project_column in DOCUMENT_SOURCES:
+            sql = f'INSERT INTO projects_searchdocument ({DOCUMENT_COLUMNS}) {select}'
+            if params:
+                placeholders = ', '.join(['%s'] * len(params))
+                sql += f' WHERE {project_column} IN ({placeholders})'
+            cursor.execute(sql, params)
+            written += cursor.rowcount
+    return written
+
+
+def search_terms(q):
+    return re.findall(r'[^\W_]+', q.lower())[:MAX_TERMS]
+
+
+def search(q, project_ids, limit=SEARCH_LIMIT):
+    """
+    Return up to `limit` documents in `project_ids` matching `q`, best
+    first, as dicts with the document's type, id, project, task (for tasks
+    and comments), title, snippet and rank.
+    """
+    terms = search_terms(q)
+    project_ids = list(project_ids)
+    if not terms or not project_ids:
+        return []
+
+    pk_field = Project._meta.pk
+    scope = [pk_field.get_db_prep_value(pk, connection) for pk in project_ids]
+    placeholders = ', '.join(['%s'] * len(scope))
+    if connection.vendor == 'postgresql':
+        query = ' & '.join(terms)
+        # Headlines are only built for the rows returned.
+        sql = f"""
+            SELECT r.kind, r.object_id, r.project_id, r.task_id, r.title, r.score,
+                   ts_headline(%s::regconfig, r.body, r.q,
+                               'StartSel="", StopSel="", MaxWords=30, MinWords=10')
+                       AS snippet
+            FROM (
+                SELECT d.*, q, ts_rank_cd(d.vector, q) AS score
+                FROM projects_searchdocument d, to_tsquery(%s::regconfig, %s) q
+                WHERE d.vector @@ q AND d.project_id IN ({placeholders})
+                ORDER BY score DESC
+                LIMIT %s
+            ) r
+            ORDER BY r.score DESC
+        """
+        params = [POSTGRES_CONFIG, POSTGRES_CONFIG, query, *scope, limit]
+    else:
+        query = ' '.join(f'"{term}"' for term in terms)
+        # Snippets are only built for the rows returned.
+        sql = f"""
+            SELECT d.kind, d.object_id, d.project_id, d.task_id, d.title, r.score,
+                   snippet({FTS_TABLE}, 1, '', '', '…', 24) AS snippet
+            FROM (
+                SELECT d.id, -bm25({FTS_TABLE}, 10.0, 1.0) AS score
+                FROM {FTS_TABLE}
+                JOIN projects_searchdocument d ON d.id = {FTS_TABLE}.rowid
+                WHERE {FTS_TABLE} MATCH %s AND d.project_id IN ({placeholders})
+                ORDER BY score DESC
+                LIMIT %s
+            ) r
+            JOIN {FTS_TABLE} ON {FTS_TABLE}.rowid = r.id
+            JOIN projects_searchdocument d ON d.id = r.id
+            WHERE {FTS_TABLE} MATCH %s
+            ORDER BY r.score DESC
+        """
+        params = [query, *scope, limit, query]
+
+    uuid_field = SearchDocument._meta.get_field('object_id')
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [
+            {
+                'type': kind,
+                'id': uuid_field.to_python(object_id),
+                'project': uuid_field.to_python(project_id),
+                'task': uuid_field.to_python(task_id),
+                'title': title,
+                'snippet': snippet,
+                'rank': score,
+            }
+            for kind, object_id, project_id, task_id, title, score, snippet
+            in cursor.fetchall()
+        ]
@@ -1,11 +1,20 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
-from .models import Project, Sprint, Task, Comment
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.utils import timezone
+from .models import Project, Sprint, Task, Comment, Tombstone
+from .caching import bump_project_versions
+from .counters import record_task_changes
+from .membership import get_project_access
+from .metrics import TimedSerializerMixin
+from .ordering import assign_next_orders, next_order
+from .realtime import publish, publish_task_changes, task_delta
+from .search import INDEXED_TASK_FIELDS, index, move_comments
 
 User = get_user_model()
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Basic user serializer for nested representations."""
     class Meta:
         model = User
@@ -13,7 +22,7 @@ class UserSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'email']
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for task comments."""
     user = UserSerializer(read_only=True)
 
@@ -27,8 +36,134 @@ class CommentSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
-class TaskSerializer(serializers.ModelSerializer):
+class BulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    PrimaryKeyRelatedField that resolves against objects preloaded by a
+    list serializer, instead of running one lookup per value.
+    """
+    def to_internal_value(self, data):
+        preloaded = getattr(self.parent, 'preloaded', None)
+        if not preloaded or self.field_name not in preloaded:
+            return super().to_internal_value(data)
+
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = self.get_queryset().model._meta.pk.to_python(data)
+        except DjangoValidationError:
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return preloaded[self.field_name][pk]
+        except (KeyError, TypeError):
+            self.fail('does_not_exist', pk_value=data)
+
+
+class TaskListSerializer(serializers.ListSerializer):
+    """
+    Batch create/update for tasks.
+
+    Related projects, sprints and users are resolved with one in_bulk query
+    per field before the items are validated, and writes use
+    bulk_create/bulk_update. Errors are reported per item.
+    """
+    def preload_related(self, data):
+        preloaded = {}
+        if not isinstance(data, list):
+            return preloaded
+
+        for name, field in self.child.fields.items():
+            if field.read_only or not isinstance(field, BulkPrimaryKeyRelatedField):
+                continue
+            pk_field = field.get_queryset().model._meta.pk
+            pks = set()
+            for item in data:
+                value = item.get(name) if isinstance(item, dict) else None
+                if value is None or isinstance(value, bool):
+                    continue
+                try:
+                    pks.add(pk_field.to_python(value))
+                except DjangoValidationError:
+                    # Reported by the field for that item.
+                    continue
+            preloaded[name] = field.get_queryset().in_bulk(pks)
+        return preloaded
+
+    def to_internal_value(self, data):
+        self.child.preloaded = self.preload_related(data)
+        self._pending_instances = (
+            iter(self.instance) if self.instance is not None else None
+        )
+        try:
+            return super().to_internal_value(data)
+        finally:
+            self.child.preloaded = None
+            self.child.instance = None
+
+    def run_child_validation(self, data):
+        # Instances are passed in the same order as the submitted items.
+        if self._pending_instances is not None:
+            self.child.instance = next(self._pending_instances)
+        return super().run_child_validation(data)
+
+    def create(self, validated_data):
+        user = self.context['request'].user
+        tasks = [Task(created_by=user, **attrs) for attrs in validated_data]
+        assign_next_orders([
+            task for task, attrs in zip(tasks, validated_data)
+            if 'order' not in attrs
+        ])
+        tasks = Task.objects.bulk_create(tasks, batch_size=500)
+        record_task_changes(tasks)
+        bump_project_versions({task.project_id for task in tasks})
+        publish_task_changes(tasks, 'created')
+        index(tasks)
+        for task in tasks:
+            task.comments_count = 0
+        return tasks
+
+    def update(self, instance, validated_data):
+        fields = set()
+        for task, attrs in zip(instance, validated_data):
+            for attr, value in attrs.items():
+                setattr(task, attr, value)
+                fields.add(attr)
+
+        now = timezone.now()
+        for task in instance:
+            task.updated_at = now
+        previous_projects = {
+            task.pk: task._counted_state[0] for task in instance
+            if getattr(task, '_counted_state', None)
+        }
+        Task.objects.bulk_update(instance, [*fields, 'updated_at'], batch_size=500)
+        record_task_changes(instance)
+        bump_project_versions(
+            set(previous_projects.values()) | {task.project_id for task in instance}
+        )
+
+        # Tasks moved to another project are gone from the old one.
+        left = [
+            task for task in instance
+            if previous_projects.get(task.pk, task.project_id) != task.project_id
+        ]
+        Tombstone.objects.bulk_create([
+            Tombstone(project_id=previous_projects[task.pk], kind='task', object_id=task.pk)
+            for task in left
+        ])
+        for task in left:
+            publish(previous_projects[task.pk], [task_delta(task, 'deleted')])
+        publish_task_changes(instance, 'updated')
+        Comment.objects.follow_tasks(left)
+        if fields & INDEXED_TASK_FIELDS:
+            index(instance)
+            move_comments(left)
+        return instance
+
+
+class TaskSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for tasks with basic information."""
+    serializer_related_field = BulkPrimaryKeyRelatedField
+
     assigned_to_details = UserSerializer(source='assigned_to', read_only=True)
     created_by_details = UserSerializer(source='created_by', read_only=True)
     comments_count = serializers.SerializerMethodField()
@@ -42,15 +177,70 @@ class TaskSerializer(serializers.ModelSerializer):
             'order', 'created_at', 'updated_at', 'comments_count'
         ]
         read_only_fields = ['id', 'created_by', 'created_at', 'updated_at']
+        list_serializer_class = TaskListSerializer
 
     def get_comments_count(self, obj):
+        if hasattr(obj, 'comments_count'):
+            return obj.comments_count
         return obj.comments.count()
 
+    def validate_project(self, value):
+        request = self.context.get('request')
+        if request and not get_project_access(request).is_member(value.pk):
+            raise serializers.ValidationError(
+                "You are not a member of this project."
+            )
+        return value
+
+    def validate(self, data):
+        """Keep the task in a sprint of its own project."""
+        task = self.instance
+        project_id = data['project'].pk if 'project' in data else task.project_id
+        if 'sprint' in data:
+            sprint_project_id = data['sprint'].project_id if data['sprint'] else None
+        else:
+            # The current sprint belongs to the task's current project.
+            sprint_project_id = task.project_id if task and task.sprint_id else None
+        if sprint_project_id is not None and sprint_project_id != project_id:
+            raise serializers.ValidationError(
+                {'sprint': "Sprint does not belong to this project."}
+            )
+        return data
+
     def create(self, validated_data):
         validated_data['created_by'] = self.context['request'].user
+        if 'order' not in validated_data:
+            # Append to the end of the column, leaving room to insert between.
+            sprint = validated_data.get('sprint')
+            validated_data['order'] = next_order(
+                validated_data['project'].pk,
+                sprint.pk if sprint else None,
+                validated_data.get('status', 'backlog')
+            )
         return super().create(validated_data)
 
 
+class TaskMoveSerializer(serializers.Serializer):
+    """
+    A single entry in a bulk task move.
+
+    Give either an explicit `order` or `after`, the ID of the task to place
+    this one after in its target column (null for the top of the column).
+    """
+    id = serializers.UUIDField()
+    status = serializers.ChoiceField(choices=Task.STATUS_CHOICES, required=False)
+    sprint = serializers.UUIDField(required=False, allow_null=True)
+    order = serializers.IntegerField(required=False)
+    after = serializers.UUIDField(required=False, allow_null=True)
+
+    def validate(self, data):
+        if 'order' in data and 'after' in data:
+            raise serializers.ValidationError(
+                "Provide either order or after, not both."
+            )
+        return data
+
+
 class TaskDetailSerializer(TaskSerializer):
     """Detailed task serializer with comments."""
     comments = CommentSerializer(many=True, read_only=True)
@@ -59,7 +249,7 @@ class TaskDetailSerializer(TaskSerializer):
         fields = TaskSerializer.Meta.fields + ['comments']
 
 
-class SprintSerializer(serializers.ModelSerializer):
+class SprintSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for sprints with basic information."""
     tasks_count = serializers.SerializerMethodField()
     completed_tasks = serializers.SerializerMethodField()
@@ -70,15 +260,16 @@ class SprintSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'name', 'project', 'start_date', 'end_date',
             'status', 'goal', 'created_at', 'updated_at',
-            'tasks_count', 'completed_tasks', 'completion_percentage'
+            'tasks_count', 'completed_tasks', 'completion_percentage',
+            'points_deployed'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'created_at', 'updated_at', 'points_deployed']
 
     def get_tasks_count(self, obj):
-        return obj.tasks.count()
+        return obj.tasks_total
 
     def get_completed_tasks(self, obj):
-        return obj.tasks.filter(status='deployed').count()
+        return obj.tasks_deployed
 
     def get_completion_percentage(self, obj):
         return obj.get_completion_percentage()
@@ -91,22 +282,21 @@ class SprintSerializer(serializers.ModelSerializer):
                     "End date must be after start date."
                 )
 
-        # Check for only one active sprint per project
-        if data.get('status') == 'active':
-            project = data.get('project') or self.instance.project
-            active_sprints = Sprint.objects.filter(
-                project=project,
-                status='active'
-            )
-            if self.instance:
-                active_sprints = active_sprints.exclude(id=self.instance.id)
+        return data
 
-            if active_sprints.exists():
-                raise serializers.ValidationError(
-                    "Only one active sprint allowed per project."
-                )
+    def create(self, validated_data):
+        # Only one active sprint per project is enforced by the database;
+        # Sprint.save() reports a violation as a ValidationError.
+        try:
+            return super().create(validated_data)
+        except DjangoValidationError as e:
+            raise serializers.ValidationError(e.messages)
 
-        return data
+    def update(self, instance, validated_data):
+        try:
+            return super().update(instance, validated_data)
+        except DjangoValidationError as e:
+            raise serializers.ValidationError(e.messages)
 
 
 class SprintDetailSerializer(SprintSerializer):
@@ -117,7 +307,7 @@ class SprintDetailSerializer(SprintSerializer):
         fields = SprintSerializer.Meta.fields + ['tasks']
 
 
-class ProjectSerializer(serializers.ModelSerializer):
+class ProjectSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for projects with basic information."""
     owner_details = UserSerializer(source='owner', read_only=True)
     members_count = serializers.SerializerMethodField()
@@ -131,20 +321,37 @@ class ProjectSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'name', 'description', 'owner', 'owner_details',
             'members', 'members_count', 'sprints_count', 'tasks_count',
-            'active_sprint', 'tasks_by_status', 'created_at', 'updated_at'
+            'active_sprint', 'tasks_by_status', 'points_deployed',
+            'created_at', 'updated_at'
+        ]
+        read_only_fields = [
+            'id', 'owner', 'points_deployed', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'owner', 'created_at', 'updated_at']
 
     def get_members_count(self, obj):
+        if hasattr(obj, 'members_count'):
+            return obj.members_count
         return obj.members.count()
 
     def get_sprints_count(self, obj):
+        if hasattr(obj, 'sprints_count'):
+            return obj.sprints_count
         return obj.sprints.count()
 
     def get_tasks_count(self, obj):
-        return obj.tasks.count()
+        return obj.tasks_total
 
     def get_active_sprint(self, obj):
+        if hasattr(obj, 'active_sprint_pk'):
+            if obj.active_sprint_pk is None:
+                return None
+            return {
+                'id': str(obj.active_sprint_pk),
+                'name': obj.active_sprint_name,
+                'start_date': obj.active_sprint_start,
+                'end_date': obj.active_sprint_end
+            }
+
         active_sprint = obj.sprints.filter(status='active').first()
         if active_sprint:
             return {
@@ -156,12 +363,7 @@ class ProjectSerializer(serializers.ModelSerializer):
         return None
 
     def get_tasks_by_status(self, obj):
-        return {
-            'backlog': obj.tasks.filter(status='backlog').count(),
-            'implementing': obj.tasks.filter(status='implementing').count(),
-            'testing': obj.tasks.filter(status='testing').count(),
-            'deployed': obj.tasks.filter(status='deployed').count(),
-        }
+        return obj.get_tasks_by_status()
 
     def create(self, validated_data):
         members = validated_data.pop('members', [])
@@ -0,0 +1,227 @@
+from django.db.models import QuerySet
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .caching import bump_project_versions
+from .counters import CounterDelta, record, record_task_changes
+from .membership import access_cache_enabled, invalidate_project_access
+from .realtime import (
+    comment_delta, publish, publish_access_change, sprint_delta, task_delta
+)
+from .models import Project, Sprint, Task, Comment, Tombstone
+from .search import INDEXED_TASK_FIELDS, index, move_comments
+
+DELTAS = {Task: task_delta, Sprint: sprint_delta, Comment: comment_delta}
+
+
+@receiver(m2m_changed, sender=Project.members.through)
+def project_members_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Invalidate cached project access when membership changes."""
+    if not access_cache_enabled():
+        return
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+
+    if reverse:
+        # user.projects.add(...) and friends: only that user is affected.
+        invalidate_project_access([instance.pk])
+    elif action == 'pre_clear':
+        invalidate_project_access(instance.members.values_list('id', flat=True))
+    else:
+        invalidate_project_access(pk_set or [])
+
+
+@receiver(pre_save, sender=Project)
+def project_owner_changing(sender, instance, **kwargs):
+    """Remember the previous owner so they lose cached access too."""
+    if not access_cache_enabled() or instance._state.adding:
+        instance._previous_owner_id = None
+    else:
+        instance._previous_owner_id = (
+            Project.objects.filter(pk=instance.pk)
+            .values_list('owner_id', flat=True)
+            .first()
+        )
+
+
+@receiver(post_save, sender=Project)
+def project_saved(sender, instance, created, **kwargs):
+    """Invalidate cached project access for the project's users."""
+    if not access_cache_enabled():
+        return
+    user_ids = {instance.owner_id}
+    previous_owner_id = getattr(instance, '_previous_owner_id', None)
+    if previous_owner_id is not None and previous_owner_id != instance.owner_id:
+        user_ids.add(previous_owner_id)
+    invalidate_project_access(user_ids)
+
+
+@receiver(post_delete, sender=Project)
+def project_deleted(sender, instance, **kwargs):
+    """Invalidate cached project access for the deleted project's users."""
+    if not access_cache_enabled():
+        return
+    invalidate_project_access([instance.owner_id])
+
+
+@receiver(pre_save, sender=Task)
+def task_load_counted_state(sender, instance, **kwargs):
+    """Fetch the stored counted state if the instance has no snapshot."""
+    if not instance._state.adding and getattr(instance, '_counted_state', None) is None:
+        instance._counted_state = (
+            Task.objects.filter(pk=instance.pk)
+            .values_list(*Task.COUNTED_FIELDS)
+            .first()
+        )
+
+
+@receiver(post_save, sender=Task)
+def task_saved(sender, instance, created, **kwargs):
+    """Update project and sprint counters and versions for the saved task."""
+    previous_state = getattr(instance, '_counted_state', None)
+    record_task_changes([instance])
+    bump_project_versions({
+        instance.project_id, previous_state[0] if previous_state else None
+    })
+    publish(instance.project_id, [task_delta(instance, 'created' if created else 'updated')])
+    if previous_state and previous_state[0] != instance.project_id:
+        # Gone from the old project as far as its sync clients are concerned.
+        Tombstone.objects.create(
+            project_id=previous_state[0], kind='task', object_id=instance.pk
+        )
+        publish(previous_state[0], [task_delta(instance, 'deleted')])
+        Comment.objects.follow_tasks([instance])
+        move_comments([instance])
+
+
+@receiver(post_delete, sender=Task)
+def task_deleted(sender, instance, **kwargs):
+    """Remove the deleted task from its project and sprint counters."""
+    delta = CounterDelta()
+    state = getattr(instance, '_counted_state', None) or instance.get_counted_state()
+    delta.add(state, -1)
+    record(delta)
+    bump_project_versions([instance.project_id])
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Project)
+def project_changed(sender, instance, created=False, **kwargs):
+    """
+    Invalidate cached responses for the project. Its open update streams
+    recheck access, as the owner may have changed or the project be gone.
+    """
+    bump_project_versions([instance.pk])
+    if not created:
+        publish_access_change([instance.pk])
+
+
+@receiver(post_save, sender=Sprint)
+@receiver(post_delete, sender=Sprint)
+def sprint_changed(sender, instance, **kwargs):
+    """Invalidate cached responses for the sprint's project."""
+    bump_project_versions([instance.project_id])
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_changed(sender, instance, origin=None, **kwargs):
+    """
+    Invalidate cached responses for the comment's project and touch the task
+    so its ETag covers its comments. Comments deleted with their task or
+    project are covered by the parent's own delete.
+    """
+    if deleted_along_with(origin, Task, Project):
+        return
+    Task.objects.filter(pk=instance.task_id).update(updated_at=timezone.now())
+    bump_project_versions([instance.project_id])
+
+
+@receiver(m2m_changed, sender=Project.members.through)
+def project_members_versions(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Invalidate cached responses for projects whose members changed, and make
+    their open update streams recheck access.
+    """
+    project_ids = []
+    if reverse:
+        if action in ('post_add', 'post_remove'):
+            project_ids = list(pk_set or [])
+        elif action == 'pre_clear':
+            project_ids = list(instance.projects.values_list('id', flat=True))
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        project_ids = [instance.pk]
+    bump_project_versions(project_ids)
+    publish_access_change(project_ids)
+
+
+def deleted_along_with(origin, *models):
+    """Whether a delete cascaded from an instance or queryset of `models`."""
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return origin_model in models
+
+
+@receiver(post_delete, sender=Task)
+@receiver(post_delete, sender=Sprint)
+@receiver(post_delete, sender=Comment)
+def record_tombstone(sender, instance, origin=None, **kwargs):
+    """
+    Leave a tombstone for incremental sync and broadcast the deletion.
+    Nothing is recorded for rows deleted with their project, nor for
+    comments deleted with their task, since clients drop those along with
+    the parent.
+    """
+    if deleted_along_with(origin, Project):
+        return
+    if sender is Comment and deleted_along_with(origin, Task):
+        return
+    Tombstone.objects.create(
+        project_id=instance.project_id,
+        kind=sender._meta.model_name,
+        object_id=instance.pk
+    )
+    publish(instance.project_id, [DELTAS[sender](instance, 'deleted')])
+
+
+@receiver(post_save, sender=Sprint)
+@receiver(post_save, sender=Comment)
+def publish_saved(sender, instance, created, **kwargs):
+    """Broadcast sprint and comment writes to the project's subscribers."""
+    publish(
+        instance.project_id, [DELTAS[sender](instance, 'created' if created else 'updated')]
+    )
+
+
+@receiver(pre_delete, sender=Sprint)
+def sprint_releasing_tasks(sender, instance, **kwargs):
+    """Touch the tasks whose sprint is about to be cleared by SET_NULL."""
+    instance.tasks.update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_save, sender=Sprint)
+@receiver(post_save, sender=Task)
+@receiver(post_save, sender=Comment)
+def index_saved(sender, instance, created, update_fields=None, **kwargs):
+    """Keep the saved row's search document current."""
+    if sender is Task and not created and task_document_unchanged(instance, update_fields):
+        return
+    index([instance])
+    if sender is Task:
+        instance.snapshot_indexed_state()
+
+
+def task_document_unchanged(task, update_fields):
+    """
+    Whether a task save left its search document as it was, as task moves
+    (status, order and sprint) do.
+    """
+    if update_fields is not None:
+        names = {Task._meta.get_field(name).name for name in update_fields}
+        if not names & INDEXED_TASK_FIELDS:
+            return True
+    previous = getattr(task, '_indexed_state', None)
+    return previous is not None and previous == task.get_indexed_state()
@@ -0,0 +1,2043 @@
+import asyncio
+import csv
+import io
+import json
+import os
+import re
+import tempfile
+from datetime import date, datetime, timedelta
+
+from asgiref.sync import sync_to_async
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.core.exceptions import ValidationError
+from django.db import connection, connections
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .analytics import sprint_analytics
+from .changes import encode_cursor
+from .consumers import project_updates
+from .counters import recount
+from .membership import get_project_access
+from .metrics import MetricsMiddleware, fingerprint, registry
+from .models import (
+    Project, SearchDocument, Sprint, SprintAnalytics, Task, TaskStatusEvent, Comment,
+    Tombstone
+)
+from .ordering import ORDER_GAP
+from .replicas import RECENT_WRITE_KEY
+
+User = get_user_model()
+
+
+class ProjectListQueryCountTests(APITestCase):
+    """The project list must not issue per-project queries."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='owner', email='owner@example.com', password='pass'
+        )
+        self.other = User.objects.create_user(
+            username='member', email='member@example.com', password='pass'
+        )
+        self.client.force_authenticate(self.user)
+
+    def create_project(self, index):
+        project = Project.objects.create(name=f'Project {index}', owner=self.user)
+        project.members.add(self.user, self.other)
+        sprint = Sprint.objects.create(
+            name='Sprint 1',
+            project=project,
+            start_date=date(2025, 1, 1),
+            end_date=date(2025, 1, 15),
+            status='active'
+        )
+        Sprint.objects.create(
+            name='Sprint 2',
+            project=project,
+            start_date=date(2025, 1, 16),
+            end_date=date(2025, 1, 30)
+        )
+        for status, _ in Task.STATUS_CHOICES:
+            Task.objects.create(
+                title=f'{status} task',
+                project=project,
+                sprint=sprint,
+                status=status,
+                created_by=self.user
+            )
+        Task.objects.create(
+            title='Extra backlog task',
+            project=project,
+            created_by=self.user
+        )
+        return project
+
+    def list_query_count(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/api/projects/')
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries), response.data['results']
+
+    def test_query_count_is_independent_of_project_count(self):
+        self.create_project(1)
+        single_count, _ = self.list_query_count()
+
+        for index in range(2, 11):
+            self.create_project(index)
+        many_count, data = self.list_query_count()
+
+        self.assertEqual(len(data), 10)
+        self.assertEqual(single_count, many_count)
+        # Projects and members, plus the ETag aggregate and membership load.
+        self.assertEqual(many_count, 4)
+
+    def test_annotated_values_match_per_object_counts(self):
+        project = self.create_project(1)
+        _, data = self.list_query_count()
+
+        item = data[0]
+        self.assertEqual(item['members_count'], 2)
+        self.assertEqual(item['sprints_count'], 2)
+        self.assertEqual(item['tasks_count'], 5)
+        self.assertEqual(item['tasks_by_status'], {
+            'backlog': 2,
+            'implementing': 1,
+            'testing': 1,
+            'deployed': 1,
+        })
+        active = project.sprints.get(status='active')
+        self.assertEqual(item['active_sprint']['id'], str(active.id))
+        self.assertEqual(item['active_sprint']['name'], active.name)
+
+
+class KeysetPaginationTests(APITestCase):
+    """Task lists are paginated on (order, -created_at, id)."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='owner', email='owner@example.com', password='pass'
+        )
+        self.project = Project.objects.create(name='Project', owner=self.user)
+        self.client.force_authenticate(self.user)
+        # Every task shares order=0, so the tie-breakers decide the position.
+        self.tasks = [
+            Task.objects.create(
+                title=f'Task {index}',
+                project=self.project,
+                created_by=self.user
+            )
+            for index in range(7)
+        ]
+
+    def test_walks_all_pages_forward_and_back(self):
+        expected = [
+            str(task.id) for task in
+            Task.objects.filter(project=self.project).order_by('order', '-created_at', 'id')
+        ]
+
+        url = f'/api/tasks/?project_id={self.project.id}&page_size=3'
+        seen, pages = [], []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.data)
+            seen.extend(item['id'] for item in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(seen, expected)
+        self.assertEqual(len(pages), 3)
+
+        response = self.client.get(pages[-1]['previous'])
+        self.assertEqual(
+            [item['id'] for item in response.data['results']],
+            expected[3:6]
+        )
+
+    def test_opt_out_returns_plain_list(self):
+        response = self.client.get(
+            f'/api/tasks/?project_id={self.project.id}&paginate=false'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(response.data, list)
+        self.assertEqual(len(response.data), 7)
+
+
+class IndexUsageTests(APITestCase):
+    """EXPLAIN the hot access paths and check they hit the composite indexes."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='owner', email='owner@example.com', password='pass'
+        )
+        self.project = Project.objects.create(name='Project', owner=self.user)
+        self.sprint = Sprint.objects.create(
+            name='Sprint',
+            project=self.project,
+            start_date=date(2025, 1, 1),
+            end_date=date(2025, 1, 15)
+        )
+        self.task = Task.objects.create(
+            title='Task', project=self.project, created_by=self.user
+        )
+        if connection.vendor == 'postgresql':
+            # Tiny test tables would otherwise always be sequentially scanned.
+            with connection.cursor() as cursor:
+                cursor.execute('SET enable_seqscan = off')
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan)
+
+    def test_board_query(self):
+        # Unordered: with the default ordering a planner without statistics
+        # may pick task_project_order_idx to skip the sort instead.
+        self.assertUsesIndex(
+            Task.objects.filter(project=self.project, sprint=self.sprint).order_by(),
+            'task_project_sprint_idx'
+        )
+        self.assertUsesIndex(
+            Task.objects.filter(sprint=self.sprint, status='testing'),
+            'task_sprint_status_idx'
+        )
+
+    def test_backlog_query(self):
+        self.assertUsesIndex(
+            Task.objects.filter(project=self.project, sprint__isnull=True).order_by(),
+            'task_project_sprint_idx'
+        )
+        self.assertUsesIndex(
+            Task.objects.filter(project=self.project, status='backlog').order_by(),
+            'task_project_status_idx'
+        )
+
+    def test_ordered_task_list(self):
+        self.assertUsesIndex(
+            Task.objects.filter(project=self.project).order_by('order', '-created_at'),
+            'task_project_order_idx'
+        )
+
+    def test_active_sprint_and_comment_queries(self):
+        self.assertUsesIndex(
+            Sprint.objects.filter(project=self.project, status='active'),
+            'sprint_project_status_idx'
+        )
+        self.assertUsesIndex(
+            Comment.objects.filter(task=self.task),
+            'comment_task_created_idx'
+        )
+
+    def test_changes_queries(self):
+        since = timezone.now()
+        self.assertUsesIndex(
+            Task.objects.filter(project=self.project, updated_at__gt=since),
+            'task_project_updated_idx'
+        )
+        self.assertUsesIndex(
+            Sprint.objects.filter(project=self.project, updated_at__gt=since),
+            'sprint_project_updated_idx'
+        )
+        self.assertUsesIndex(
+            Comment.objects.filter(project=self.project, updated_at__gt=since),
+            'comment_project_updated_idx'
+        )
+        self.assertUsesIndex(
+            Tombstone.objects.filter(project=self.project, deleted_at__gt=since),
+            'tombstone_project_deleted_idx'
+        )
+
+
+class ActiveSprintConstraintTests(APITestCase):
+    """Only one active sprint per project, enforced by the database."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='owner', email='owner@example.com', password='pass'
+        )
+        self.project = Project.objects.create(name='Project', owner=self.user)
+        self.client.force_authenticate(self.user)
+        self.active = Sprint.objects.create(
+            name='Active',
+            project=self.project,
+            start_date=date(2025, 1, 1),
+            end_date=date(2025, 1, 15),
+            status='active'
+        )
+        self.planned = Sprint.objects.create(
+            name='Planned',
+            project=self.project,
+            start_date=date(2025, 1, 16),
+            end_date=date(2025, 1, 30)
+        )
+
+    def test_model_save_rejects_second_active_sprint(self):
+        self.planned.status = 'active'
+        with self.assertRaises(ValidationError):
+            self.planned.save()
+
+    def test_api_rejects_second_active_sprint(self):
+        response = self.client.patch(
+            f'/api/sprints/{self.planned.id}/', {'status': 'active'}
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_set_active_swaps_active_sprint(self):
+        response = self.client.patch(f'/api/sprints/{self.planned.id}/set_active/')
+        self.assertEqual(response.status_code, 200)
+        self.active.refresh_from_db()
+        self.assertEqual(self.active.status, 'planning')
+
+
+class ProjectAccessTests(APITestCase):
+    """Membership is resolved once per request and optionally cached."""
+
+    def setUp(self):
+        self.owner = User.objects.create_user(
+            username='owner', email='owner@example.com', password='pass'
+        )
+        self.member = User.objects.create_user(
+            username='member', email='member@example.com', password='pass'
+        )
+        self.project = Project.objects.create(name='Project', owner=self.owner)
+
+    def make_request(self, user):
+        request = RequestFactory().get('/')
+        request.user = user
+        return request
+
+    def test_memoized_per_request(self):
+        request = self.make_request(self.owner)
+        with self.assertNumQueries(1):
+            access = get_project_access(request)
+            self.assertIs(get_project_access(request), access)
+        self.assertTrue(access.is_owner(self.project.pk))
+        self.assertTrue(access.is_member(self.project.pk))
+
+    @override_settings(PROJECT_ACCESS_CACHE_TIMEOUT=30)
+    def test_cache_invalidated_by_membership_changes(self):
+        access = get_project_access(self.make_request(self.member))
+        self.assertFalse(access.is_member(self.project.pk))
+
+        with self.assertNumQueries(0):
+            get_project_access(self.make_request(self.member))
+
+        self.project.members.add(self.member)
+        access = get_project_access(self.make_request(self.member))
+        self.assertTrue(access.is_member(self.project.pk))
+        self.assertFalse(access.is_owner(self.project.pk))
+
+        self.project.members.clear()
+        access = get_project_access(self.make_request(self.member))
+        self.assertFalse(access.is_member(self.project.pk))
+
+    def test_comment_permission_check_does_not_load_project(self):
+        task = Task.objects.create(
+            title='Task', project=self.project, created_by=self.owner
+        )
+        comment = Comment.objects.create(task=task, user=self.owner, text='Hi')
+        self.client.force_authenticate(self.owner)
+        # Comment lookup (with its task and author) plus the membership load.
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/api/comments/{comment.id}/')
+        self.assertEqual(response.status_code, 200)
+
+
+class BulkMoveTests(APITestCase):
+    """POST /api/tasks/bulk_move/ applies many moves in one transaction."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='owner', email='owner@example.com', password='pass'
+        )
+        self.project = Project.objects.create(name='Project', owner=self.user)
+        self.client.force_authenticate(self.user)
+        self.tasks = []
+        for index in range(3):
+            response = self.client.post('/api/tasks/', {
+                'title': f'Task {index}',
+                'project': str(self.project.id),
+            })
+            self.assertEqual(response.status_code, 201)
+            self.tasks.append(Task.objects.get(id=response.data['id']))
+
+    def column_ids(self, status):
+        return list(
+            Task.objects.filter(project=self.project, status=status)
+            .order_by('order', '-created_at', 'id')
+            .values_list('id', flat=True)
+        )
+
+    def test_new_tasks_are_spaced_out(self):
+        orders = [task.order for task in self.tasks]
+        self.assertEqual(orders, sorted(orders))
+        self.assertTrue(all(b - a > 1 for a, b in zip(orders, orders[1:])))
+
+    def test_single_card_move_touches_one_row(self):
+        first, second, third = self.tasks
+        response = self.client.post('/api/tasks/bulk_move/', [
+            {'id': str(third.id), 'after': str(first.id)},
+        ], format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['reordered'], [])
+        self.assertEqual(self.column_ids('backlog'), [first.id, third.id, second.id])
+
+    def test_moves_across_columns_and_renumbers_when_full(self):
+        first, second, third = self.tasks
+        Task.objects.filter(id=first.id).update(status='testing', order=1)
+        Task.objects.filter(id=second.id).update(status='testing', order=2)
+
+        response = self.client.post('/api/tasks/bulk_move/', [
+            {'id': str(third.id), 'status': 'testing', 'after': str(first.id)},
+        ], format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.column_ids('testing'), [first.id, third.id, second.id])
+        self.assertEqual(len(response.data['reordered']), 2)
+
+    def test_rejects_foreign_sprint_and_writes_nothing(self):
+        other = Project.objects.create(name='Other', owner=self.user)
+        sprint = Sprint.objects.create(
+            name='Sprint',
+            project=other,
+            start_date=date(2025, 1, 1),
+            end_date=date(2025, 1, 15)
+        )
+        response = self.client.post('/api/tasks/bulk_move/', [
+            {'id': str(self.tasks[0].id), 'status': 'testing'},
+            {'id': str(self.tasks[1].id), 'sprint': str(sprint.id)},
+        ], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(1, response.data['errors'])
+        self.assertFalse(Task.objects.filter(status='testing').exists())
+
+
+class BulkTaskTests(APITestCase):
+    """Batch create, partial update and delete on /api/tasks/."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='owner', email='owner@example.com', password='pass'
+        )
+        self.project = Project.objects.create(name='Project', owner=self.user)
+        self.sprint = Sprint.objects.create(
+            name='Sprint',
+            project=self.project,
+            start_date=date(2025, 1, 1),
+            end_date=date(2025, 1, 15)
+        )
+        self.client.force_authenticate(self.user)
+
+    def payload(self, count):
+        return [
+            {
+                'title': f'Task {index}',
+                'project': str(self.project.id),
+                'sprint': str(self.sprint.id),
+                'assigned_to': self.user.id,
+            }
+            for index in range(count)
+        ]
+
+    def test_bulk_create_query_count_is_constant(self):
+        with CaptureQueriesContext(connection) as small:
+            response = self.client.post('/api/tasks/', self.payload(2), format='json')
+        self.assertEqual(response.status_code, 201)
+
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.post('/api/tasks/', self.payload(20), format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data), 20)
+
+        self.assertEqual(len(large), len(small))
+        orders = list(
+            Task.objects.order_by('order').values_list('order', flat=True)
+        )
+        self.assertEqual(len(set(orders)), 22)
+
+    def test_bulk_create_reports_per_item_errors(self):
+        payload = self.payload(3)
+        payload[1]['sprint'] = 'not-a-uuid'
+        payload[2]['project'] = str(Project.objects.create(
+            name='Other',
+            owner=User.objects.create_user(
+                username='other', email='other@example.com', password='pass'
+            )
+        ).id)
+
+        response = self.client.post('/api/tasks/', payload, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data[0], {})
+        self.assertIn('sprint', response.data[1])
+        self.assertIn('project', response.data[2])
+        self.assertFalse(Task.objects.exists())
+
+    def test_rejects_sprints_of_other_projects(self):
+        other = Project.objects.create(name='Other', owner=self.user)
+        other_sprint = Sprint.objects.create(
+            name='Other Sprint',
+            project=other,
+            start_date=date(2025, 1, 1),
+            end_date=date(2025, 1, 15)
+        )
+        payload = self.payload(2)
+        payload[1]['sprint'] = str(other_sprint.id)
+
+        response = self.client.post('/api/tasks/', payload[1], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('sprint', response.data)
+        response = self.client.post('/api/tasks/', payload, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data[0], {})
+        self.assertIn('sprint', response.data[1])
+        self.assertFalse(Task.objects.exists())
+
+        self.client.post('/api/tasks/', self.payload(1), format='json')
+        task = Task.objects.get()
+        response = self.client.patch(
+            f'/api/tasks/{task.id}/', {'sprint': str(other_sprint.id)}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        # Moving the task to another project must not keep its old sprint.
+        response = self.client.patch(
+            '/api/tasks/', [{'id': str(task.id), 'project': str(other.id)}], format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('sprint', response.data[0])
+        response = self.client.patch('/api/tasks/', [{
+            'id': str(task.id), 'project': str(other.id), 'sprint': str(other_sprint.id)
+        }], format='json')
+        self.assertEqual(response.status_code, 200)
+
+        other_sprint.refresh_from_db()
+        self.sprint.refresh_from_db()
+        self.assertEqual(other_sprint.tasks_total, 1)
+        self.assertEqual(self.sprint.tasks_total, 0)
+
+    def test_bulk_partial_update_and_delete(self):
+        self.client.post('/api/tasks/', self.payload(3), format='json')
+        tasks = list(Task.objects.order_by('order'))
+
+        response = self.client.patch('/api/tasks/', [
+            {'id': str(tasks[0].id), 'status': 'testing'},
+            {'id': str(tasks[1].id), 'priority': 'high', 'sprint': None},
+        ], format='json')
+        self.assertEqual(response.status_code, 200)
+        tasks[0].refresh_from_db()
+        tasks[1].refresh_from_db()
+        self.assertEqual(tasks[0].status, 'testing')
+        self.assertEqual(tasks[1].priority, 'high')
+        self.assertIsNone(tasks[1].sprint_id)
+
+        response = self.client.delete(
+            '/api/tasks/', [str(tasks[0].id), str(tasks[1].id)], format='json'
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(list(Task.objects.all()), [tasks[2]])
+
+
+class BoardTests(APITestCase):
+    """GET /api/projects/{id}/board/ costs a constant number of queries."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='owner', email='owner@example.com', password='pass'
+        )
+        self.project = Project.objects.create(name='Project', owner=self.user)
+        self.sprint = Sprint.objects.create(
+            name='Sprint',
+            project=self.project,
+            start_date=date(2025, 1, 1),
+            end_date=date(2025, 1, 15)
+        )
+        self.client.force_authenticate(self.user)
+
+    def create_tasks(self, count):
+        for index in range(count):
+            assignee = User.objects.create_user(
+                username=f'user{Task.objects.count()}',
+                email=f'user{Task.objects.count()}@example.com',
+                password='pass'
+            )
+            task = Task.objects.create(
+                title=f'Task {index}',
+                description='x' * 200,
+                project=self.project,
+                sprint=self.sprint,
+                status=Task.STATUS_CHOICES[index % 4][0],
+                assigned_to=assignee,
+                created_by=self.user
+            )
+            Comment.objects.create(task=task, user=assignee, text='Hi')
+
+    def get_board(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(
+                f'/api/projects/{self.project.id}/board/?sprint={self.sprint.id}'
+            )
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries), response.data
+
+    def test_query_count_is_constant(self):
+        self.create_tasks(2)
+        small_count, _ = self.get_board()
+        self.create_tasks(10)
+        large_count, data = self.get_board()
+
+        self.assertEqual(small_count, large_count)
+        self.assertEqual(sum(len(tasks) for tasks in data['columns'].values()), 12)
+        self.assertEqual(len(data['users']), 13)
+
+    def test_rows_are_compact(self):
+        self.create_tasks(1)
+        _, data = self.get_board()
+        row = data['columns']['backlog'][0]
+        self.assertEqual(row['comments_count'], 1)
+        self.assertEqual(len(row['description_preview']), 101)
+        self.assertIn(str(row['assigned_to']), data['users'])
+
+    def test_backlog_filter(self):
+        Task.objects.create(title='Loose', project=self.project, created_by=self.user)
+        self.create_tasks(1)
+        response = self.client.get(
+            f'/api/projects/{self.project.id}/board/?sprint=backlog'
+        )
+        self.assertEqual(
+            [row['title'] for row in response.data['columns']['backlog']],
+            ['Loose']
+        )
+
+
+class TaskAndSprintQueryCountTests(APITestCase):
+    """Task and sprint reads must not issue per-task queries."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='owner', email='owner@example.com', password='pass'
+        )
+        self.project = Project.objects.create(name='Project', owner=self.user)
+        self.sprint = Sprint.objects.create(
+            name='Sprint',
+            project=self.project,
+            start_date=date(2025, 1, 1),
+            end_date=date(2025, 1, 15)
+        )
+        self.client.force_authenticate(self.user)
+
+    def create_tasks(self, count):
+        for index in range(count):
+            assignee = User.objects.create_user(
+                username=f'user{Task.objects.count()}',
+                email=f'user{Task.objects.count()}@example.com',
+                password='pass'
+            )
+            task = Task.objects.create(
+                title=f'Task {index}',
+                project=self.project,
+                sprint=self.sprint,
+                status='deployed' if index % 2 else 'backlog',
+                assigned_to=assignee,
+                created_by=self.user
+            )
+            Comment.objects.create(task=task, user=assignee, text='Hi')
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries), response.data
+
+    def test_task_list(self):
+        url = f'/api/tasks/?project_id={self.project.id}'
+        self.create_tasks(2)
+        small, _ = self.count_queries(url)
+        self.create_tasks(8)
+        large, data = self.count_queries(url)
+
+        self.assertEqual(small, large)
+        # Tasks plus the ETag aggregate.
+        self.assertEqual(large, 2)
+        self.assertTrue(all(item['comments_count'] == 1 for item in data['results']))
+        self.assertTrue(all(item['assigned_to_details'] for item in data['results']))
+
+    def test_task_retrieve(self):
+        self.create_tasks(1)
+        task = Task.objects.get()
+        # Task with users and comment count, comments with authors, access.
+        count, data = self.count_queries(f'/api/tasks/{task.id}/')
+        self.assertEqual(count, 3)
+        self.assertEqual(len(data['comments']), 1)
+
+    def test_sprint_retrieve(self):
+        url = f'/api/sprints/{self.sprint.id}/'
+        self.create_tasks(2)
+        small, _ = self.count_queries(url)
+        self.create_tasks(8)
+        large, data = self.count_queries(url)
+
+        self.assertEqual(small, large)
+        self.assertEqual(data['tasks_count'], 10)
+        self.assertEqual(data['completed_tasks'], 5)
+        self.assertEqual(data['completion_percentage'], 50)
+
+    def test_task_delete_with_comments(self):
+        def task_with_comments(count):
+            task = Task.objects.create(
+                title='Task', project=self.project, created_by=self.user
+            )
+            for index in range(count):
+                Comment.objects.create(task=task, user=self.user, text=f'Comment {index}')
+            return Task.objects.get(pk=task.pk)
+
+        single = task_with_comments(1)
+        with CaptureQueriesContext(connection) as context:
+            single.delete()
+        several = task_with_comments(5)
+        # Cascaded comments cost no queries of their own.
+        with self.assertNumQueries(len(context)):
+            several.delete()
+
+
+class TaskCounterTests(APITestCase):
+    """Stored project and sprint counters track every task write path."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='owner', email='owner@example.com', password='pass'
+        )
+        self.project = Project.objects.create(name='Project', owner=self.user)
+        self.sprint = Sprint.objects.create(
+            name='Sprint',
+            project=self.project,
+            start_date=date(2025, 1, 1),
+            end_date=date(2025, 1, 15)
+        )
+        self.client.force_authenticate(self.user)
+
+    def counters(self):
+        self.project.refresh_from_db()
+        self.sprint.refresh_from_db()
+        return [
+            {field: getattr(obj, field) for field in Project.COUNTER_FIELDS}
+            for obj in (self.project, self.sprint)
+        ]
+
+    def assertCountersMatchRecount(self):
+        maintained = self.counters()
+        recount()
+        self.assertEqual(maintained, self.counters())
+
+    def test_write_paths_keep_counters_exact(self):
+        self.client.post('/api/tasks/', [
+            {
+                'title': f'Task {index}',
+                'project': str(self.project.id),
+                'sprint': str(self.sprint.id),
+                'story_points': 3,
+            }
+            for index in range(4)
+        ], format='json')
+        tasks = list(Task.objects.order_by('order'))
+        self.assertEqual(self.counters()[1]['tasks_backlog'], 4)
+
+        self.client.patch(f'/api/tasks/{tasks[0].id}/move/', {'status': 'deployed'})
+        self.client.post('/api/tasks/bulk_move/', [
+            {'id': str(tasks[1].id), 'status': 'deployed'},
+            {'id': str(tasks[2].id), 'status': 'testing'},
+        ], format='json')
+        self.client.patch('/api/tasks/', [
+            {'id': str(tasks[1].id), 'story_points': 5},
+        ], format='json')
+        self.assertCountersMatchRecount()
+
+        project, sprint = self.counters()
+        self.assertEqual(project['points_deployed'], 8)
+        self.assertEqual(sprint['tasks_deployed'], 2)
+
+        self.client.delete(f'/api/tasks/{tasks[3].id}/')
+        self.client.patch(f'/api/sprints/{self.sprint.id}/complete/')
+        self.assertCountersMatchRecount()
+
+        project, sprint = self.counters()
+        self.assertEqual(project['tasks_total'], 3)
+        self.assertEqual(sprint['tasks_total'], 2)
+        self.assertEqual(sprint['tasks_testing'], 0)
+
+        self.client.delete('/api/tasks/', [str(tasks[0].id)], format='json')
+        self.assertCountersMatchRecount()
+
+    def test_move_rejects_invalid_input(self):
+        task = Task.objects.create(title='Task', project=self.project, created_by=self.user)
+        other = Project.objects.create(name='Other', owner=self.user)
+        other_sprint = Sprint.objects.create(
+            name='Other sprint', project=other,
+            start_date=date(2025, 1, 1), end_date=date(2025, 1, 15)
+        )
+        url = f'/api/tasks/{task.id}/move/'
+        for data in ({'status': 'garbage'}, {'order': 'first'},
+                     {'sprint': str(other_sprint.id)}):
+            response = self.client.patch(url, data, format='json')
+            self.assertEqual(response.status_code, 400, data)
+            self.assertIn(next(iter(data)), response.data)
+
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.sprint_id), ('backlog', None))
+        self.assertCountersMatchRecount()
+
+        response = self.client.patch(
+            url, {'status': 'testing', 'sprint': str(self.sprint.id)}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.counters()[1]['tasks_testing'], 1)
+        self.client.patch(url, {'sprint': ''}, format='json')
+        task.refresh_from_db()
+        self.assertIsNone(task.sprint_id)
+
+
+@override_settings(RESPONSE_CACHE_TIMEOUT=60, PROJECT_ACCESS_CACHE_TIMEOUT=60)
+class ResponseCacheTests(APITestCase):
+    """Project and sprint reads are cached until the project changes."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='owner', email='owner@example.com', password='pass'
+        )
+        self.project = Project.objects.create(name='Project', owner=self.user)
+        self.project.members.add(self.user)
+        self.client.force_authenticate(self.user)
+
+    def test_hits_skip_the_orm(self):
+        urls = [
+            '/api/projects/',
+            f'/api/projects/{self.project.id}/',
+            f'/api/sprints/?project_id={self.project.id}',
+        ]
+        for url in urls:
+            first = self.client.get(url)
+            with self.assertNumQueries(0):
+                second = self.client.get(url)
+            self.assertEqual(first.data, second.data)
+
+    def test_writes_invalidate(self):
+        url = f'/api/projects/{self.project.id}/'
+        self.assertEqual(self.client.get(url).data['tasks_count'], 0)
+
+        Task.objects.create(title='Task', project=self.project, created_by=self.user)
+        self.assertEqual(self.client.get(url).data['tasks_count'], 1)
+
+        self.client.post('/api/tasks/', [
+            {'title': 'Bulk', 'project': str(self.project.id)},
+        ], format='json')
+        self.assertEqual(self.client.get(url).data['tasks_count'], 2)
+
+        other = User.objects.create_user(
+            username='other', email='other@example.com', password='pass'
+        )
+        self.project.members.add(other)
+        self.assertEqual(self.client.get(url).data['members_count'], 2)
+
+    def test_non_members_are_not_served_from_cache(self):
+        url = f'/api/projects/{self.project.id}/'
+        self.client.get(url)
+        stranger = User.objects.create_user(
+            username='stranger', email='stranger@example.com', password='pass'
+        )
+        self.client.force_authenticate(stranger)
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+class ConditionalRequestTests(APITestCase):
+    """Reads carry validators; revalidation and If-Match are honoured."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='owner', email='owner@example.com', password='pass'
+        )
+        self.project = Project.objects.create(name='Project', owner=self.user)
+        self.task = Task.objects.create(
+            title='Task', project=self.project, created_by=self.user
+        )
+        self.client.force_authenticate(self.user)
+
+    def revalidate(self, url):
+        etag = self.client.get(url)['ETag']
+        return etag, self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_reads_are_not_modified(self):
+        urls = [
+            '/api/projects/',
+            f'/api/projects/{self.project.id}/',
+            f'/api/tasks/?project_id={self.project.id}',
+            f'/api/tasks/{self.task.id}/',
+        ]
+        for url in urls:
+            _, response = self.revalidate(url)
+            self.assertEqual(response.status_code, 304, url)
+            self.assertFalse(response.content)
+
+    def test_not_modified_skips_loading_the_object(self):
+        url = f'/api/tasks/{self.task.id}/'
+        etag = self.client.get(url)['ETag']
+        # The updated_at projection only: no task, comments or users.
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_writes_change_validators(self):
+        task_url = f'/api/tasks/{self.task.id}/'
+        project_url = f'/api/projects/{self.project.id}/'
+        task_etag = self.client.get(task_url)['ETag']
+        project_etag = self.client.get(project_url)['ETag']
+
+        Comment.objects.create(task=self.task, user=self.user, text='Hi')
+        response = self.client.get(task_url, HTTP_IF_NONE_MATCH=task_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['comments']), 1)
+
+        Task.objects.create(title='Other', project=self.project, created_by=self.user)
+        response = self.client.get(project_url, HTTP_IF_NONE_MATCH=project_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['tasks_count'], 2)
+
+    @override_settings(RESPONSE_CACHE_TIMEOUT=60, PROJECT_ACCESS_CACHE_TIMEOUT=60)
+    def test_cache_hits_answer_revalidation(self):
+        url = '/api/projects/'
+        etag, _ = self.revalidate(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_if_match_guards_updates_and_moves(self):
+        url = f'/api/tasks/{self.task.id}/'
+        etag = self.client.get(url)['ETag']
+
+        response = self.client.patch(
+            f'{url}move/', {'status': 'testing'}, HTTP_IF_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+        new_etag = response['ETag']
+        self.assertNotEqual(new_etag, etag)
+
+        response = self.client.patch(url, {'title': 'Stale'}, HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 412)
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.title, 'Task')
+
+        response = self.client.patch(url, {'title': 'Fresh'}, HTTP_IF_MATCH=new_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], self.client.get(url)['ETag'])
+
+
+class ChangesFeedTests(APITestCase):
+    """The changes feed returns only what changed after the cursor."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='owner', email='owner@example.com', password='pass'
+        )
+        self.project = Project.objects.create(name='Project', owner=self.user)
+        self.sprint = Sprint.objects.create(
+            name='Sprint',
+            project=self.project,
+            start_date=date(2025, 1, 1),
+            end_date=date(2025, 1, 15)
+        )
+        self.tasks = [
+            Task.objects.create(
+                title=f'Task {index}', project=self.project,
+                sprint=self.sprint, created_by=self.user
+            )
+            for index in range(3)
+        ]
+        self.comment = Comment.objects.create(
+            task=self.tasks[0], user=self.user, text='Hi'
+        )
+        # Age the fixtures past the cursor overlap window.
+        past = timezone.now() - timedelta(hours=1)
+        for model in (Task, Sprint, Comment):
+            model.objects.update(created_at=past, updated_at=past)
+        self.url = f'/api/projects/{self.project.id}/changes/'
+        self.client.force_authenticate(self.user)
+
+    def ids(self, rows):
+        return {str(row['id']) for row in rows}
+
+    def test_start_cursor_then_incremental(self):
+        # No full dump: clients load the lists after taking a cursor.
+        initial = self.client.get(self.url).data
+        self.assertEqual(list(initial), ['cursor'])
+
+        cursor = initial['cursor']
+        # Project and membership, then one range scan per table.
+        with self.assertNumQueries(6):
+            unchanged = self.client.get(self.url, {'since': cursor}).data
+        for kind in ('tasks', 'sprints', 'comments'):
+            self.assertEqual(unchanged[kind], {'created': [], 'updated': [], 'deleted': []})
+
+        self.client.patch(f'/api/tasks/{self.tasks[1].id}/move/', {'status': 'testing'})
+        self.client.delete(f'/api/tasks/{self.tasks[2].id}/')
+        self.client.delete(f'/api/comments/{self.comment.id}/')
+        new_task = Task.objects.create(
+            title='New', project=self.project, created_by=self.user
+        )
+
+        changes = self.client.get(self.url, {'since': cursor}).data
+        self.assertEqual(self.ids(changes['tasks']['created']), {str(new_task.id)})
+        # The comment's task was touched; the moved task changed status.
+        self.assertEqual(
+            self.ids(changes['tasks']['updated']),
+            {str(self.tasks[0].id), str(self.tasks[1].id)}
+        )
+        self.assertEqual(changes['tasks']['deleted'], [self.tasks[2].id])
+        self.assertEqual(changes['comments']['deleted'], [self.comment.id])
+        # Sprint counters changed, so the sprint is resent.
+        self.assertEqual(self.ids(changes['sprints']['updated']), {str(self.sprint.id)})
+        self.assertEqual(changes['sprints']['updated'][0]['tasks_count'], 2)
+
+    def test_cascaded_comments_leave_no_tombstones(self):
+        cursor = self.client.get(self.url).data['cursor']
+        self.client.delete(f'/api/tasks/{self.tasks[0].id}/')
+        changes = self.client.get(self.url, {'since': cursor}).data
+        self.assertEqual(changes['tasks']['deleted'], [self.tasks[0].id])
+        self.assertEqual(changes['comments']['deleted'], [])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.url, {'since': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(CHANGES_RETENTION_DAYS=30)
+    def test_expired_cursors_and_pruning(self):
+        old = timezone.now() - timedelta(days=31)
+        response = self.client.get(self.url, {'since': encode_cursor(old)})
+        self.assertEqual(response.status_code, 410)
+
+        self.client.delete(f'/api/tasks/{self.tasks[1].id}/')
+        self.client.delete(f'/api/tasks/{self.tasks[2].id}/')
+        Tombstone.objects.filter(object_id=self.tasks[1].id).update(deleted_at=old)
+        call_command('prune_tombstones', stdout=io.StringIO())
+        self.assertEqual(
+            list(Tombstone.objects.values_list('object_id', flat=True)), [self.tasks[2].id]
+        )
+
+    def test_comments_follow_moved_tasks(self):
+        other = Project.objects.create(name='Other', owner=self.user)
+        self.assertEqual(self.comment.project_id, self.project.id)
+        cursor = self.client.get(f'/api/projects/{other.id}/changes/').data['cursor']
+
+        self.client.patch(
+            f'/api/tasks/{self.tasks[0].id}/', {'project': str(other.id), 'sprint': ''}
+        )
+        self.comment.refresh_from_db()
+        self.assertEqual(self.comment.project_id, other.id)
+        changes = self.client.get(
+            f'/api/projects/{other.id}/changes/', {'since': cursor}
+        ).data
+        self.assertEqual(self.ids(changes['comments']['updated']), {str(self.comment.id)})
+
+
+class RealtimeTests(APITestCase):
+    """Project members receive committed board deltas over the WebSocket."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='owner', email='owner@example.com', password='pass'
+        )
+        self.stranger = User.objects.create_user(
+            username='stranger', email='stranger@example.com', password='pass'
+        )
+        self.project = Project.objects.create(name='Project', owner=self.user)
+        self.task = Task.objects.create(
+            title='Task', project=self.project, created_by=self.user
+        )
+        self.client.force_authenticate(self.user)
+
+    async def connect(self, user):
+        inbox, outbox = asyncio.Queue(), asyncio.Queue()
+        scope = {
+            'type': 'websocket',
+            'path': f'/ws/projects/{self.project.id}/',
+            'query_string': f'token={AccessToken.for_user(user)}'.encode(),
+        }
+        await inbox.put({'type': 'websocket.connect'})
+        app = asyncio.ensure_future(project_updates(scope, inbox.get, outbox.put))
+        return app, inbox, outbox
+
+    def write(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f'/api/tasks/{self.task.id}/move/', {'status': 'testing'})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                '/api/comments/', {'task': str(self.task.id), 'text': 'Hi'}
+            )
+
+    async def test_members_receive_deltas(self):
+        app, inbox, outbox = await self.connect(self.user)
+        self.assertEqual((await outbox.get())['type'], 'websocket.accept')
+
+        await sync_to_async(self.write)()
+        moved = json.loads((await asyncio.wait_for(outbox.get(), 1))['text'])
+        commented = json.loads((await asyncio.wait_for(outbox.get(), 1))['text'])
+        self.assertEqual(moved['deltas'][0]['type'], 'task')
+        self.assertEqual(moved['deltas'][0]['action'], 'updated')
+        self.assertEqual(moved['deltas'][0]['data']['status'], 'testing')
+        self.assertEqual(commented['deltas'][0]['type'], 'comment')
+        self.assertEqual(commented['deltas'][0]['data']['text'], 'Hi')
+
+        await inbox.put({'type': 'websocket.disconnect'})
+        await asyncio.wait_for(app, 1)
+
+    async def test_non_members_are_rejected(self):
+        app, _, outbox = await self.connect(self.stranger)
+        await asyncio.wait_for(app, 1)
+        # Accepted first, so the browser sees the code rather than 1006.
+        self.assertEqual(await outbox.get(), {'type': 'websocket.accept'})
+        self.assertEqual(await outbox.get(), {'type': 'websocket.close', 'code': 4403})
+
+    async def test_removed_members_are_disconnected(self):
+        member = await sync_to_async(User.objects.create_user)(
+            username='member', email='member@example.com', password='pass'
+        )
+        await sync_to_async(self.project.members.add)(member)
+        app, inbox, outbox = await self.connect(member)
+        self.assertEqual((await outbox.get())['type'], 'websocket.accept')
+
+        def change_members():
+            other = User.objects.create_user(
+                username='other', email='other@example.com', password='pass'
+            )
+            with self.captureOnCommitCallbacks(execute=True):
+                self.project.members.add(other)
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.delete(
+                    f'/api/projects/{self.project.id}/remove-member/{member.id}/'
+                )
+
+        await sync_to_async(change_members)()
+        # Still a member after the first change; only the removal closes.
+        await asyncio.wait_for(app, 1)
+        self.assertEqual(outbox.get_nowait(), {'type': 'websocket.close', 'code': 4403})
+        self.assertTrue(outbox.empty())
+
+
+class AsyncReadTests(APITestCase):
+    """The async read routes return the same payloads as the sync ones."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='owner', email='owner@example.com', password='pass'
+        )
+        self.project = Project.objects.create(name='Project', owner=self.user)
+        self.project.members.add(self.user)
+        self.sprint = Sprint.objects.create(
+            name='Sprint',
+            project=self.project,
+            start_date=date(2025, 1, 1),
+            end_date=date(2025, 1, 15),
+            status='active'
+        )
+        for index in range(3):
+            task = Task.objects.create(
+                title=f'Task {index}', project=self.project,
+                sprint=self.sprint if index else None, created_by=self.user
+            )
+            Comment.objects.create(task=task, user=self.user, text='Hi')
+        self.client.force_authenticate(self.user)
+
+    def test_payloads_match_sync_routes(self):
+        pairs = [
+            ('/api/projects/', '/api/async/projects/'),
+            (f'/api/tasks/?project_id={self.project.id}&page_size=2',
+             f'/api/async/tasks/?project_id={self.project.id}&page_size=2'),
+            (f'/api/tasks/?sprint={self.sprint.id}&paginate=false',
+             f'/api/async/tasks/?sprint={self.sprint.id}&paginate=false'),
+            (f'/api/projects/{self.project.id}/board/?sprint=backlog',
+             f'/api/async/projects/{self.project.id}/board/?sprint=backlog'),
+        ]
+        for sync_url, async_url in pairs:
+            expected = self.client.get(sync_url)
+            response = self.client.get(async_url)
+            self.assertEqual(response.status_code, 200, async_url)
+            self.assertEqual(
+                json.loads(response.content.replace(b'/api/async/', b'/api/')),
+                json.loads(expected.content),
+                async_url
+            )
+
+    def test_revalidation_and_errors(self):
+        url = '/api/async/projects/'
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        board = f'/api/async/projects/{self.project.id}/board/'
+        self.assertEqual(self.client.get(f'{board}?sprint=nope').status_code, 400)
+        self.assertEqual(self.client.post(board).status_code, 405)
+
+        stranger = User.objects.create_user(
+            username='stranger', email='stranger@example.com', password='pass'
+        )
+        self.client.force_authenticate(stranger)
+        self.assertEqual(self.client.get(board).status_code, 404)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get(url).status_code, 401)
+
+
+class ExportTests(APITestCase):
+    """Exports stream every row with a fixed number of queries."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='owner', email='owner@example.com', password='pass'
+        )
+        self.former = User.objects.create_user(
+            username='former', email='former@example.com', password='pass'
+        )
+        self.project = Project.objects.create(name='Big Project', owner=self.user)
+        self.sprint = Sprint.objects.create(
+            name='Sprint',
+            project=self.project,
+            start_date=date(2025, 1, 1),
+            end_date=date(2025, 1, 15)
+        )
+        for index in range(4):
+            task = Task.objects.create(
+                title=f'Task, "{index}"', project=self.project,
+                sprint=self.sprint if index % 2 else None,
+                created_by=self.user,
+                assigned_to=self.former if index else None
+            )
+            Comment.objects.create(task=task, user=self.former, text='Hi\nthere')
+        self.url = f'/api/projects/{self.project.id}/export'
+        self.client.force_authenticate(self.user)
+
+    def export(self, suffix):
+        response = self.client.get(f'{self.url}{suffix}')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_json(self):
+        data = json.loads(self.export('.json'))
+        self.assertEqual(data['project']['name'], 'Big Project')
+        self.assertEqual(len(data['tasks']), 4)
+        self.assertEqual(len(data['comments']), 4)
+        task = next(task for task in data['tasks'] if task['sprint_id'])
+        self.assertEqual(task['sprint_name'], 'Sprint')
+        self.assertEqual(task['assigned_to_email'], 'former@example.com')
+        self.assertEqual(task['created_by_email'], 'owner@example.com')
+        self.assertEqual(data['comments'][0]['user_email'], 'former@example.com')
+
+    def test_ndjson_and_csv(self):
+        lines = [json.loads(line) for line in self.export('.ndjson').splitlines()]
+        self.assertEqual(
+            [line['type'] for line in lines],
+            ['project'] + ['task'] * 4 + ['comment'] * 4
+        )
+
+        response = self.client.get(f'{self.url}.csv')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn('big-project-tasks.csv', response['Content-Disposition'])
+        rows = list(csv.DictReader(io.StringIO(self.export('.csv'))))
+        self.assertEqual({row['title'] for row in rows},
+                         {f'Task, "{index}"' for index in range(4)})
+        rows = list(csv.DictReader(io.StringIO(self.export('.csv?records=comments'))))
+        self.assertEqual([row['text'] for row in rows], ['Hi\nthere'] * 4)
+
+    def test_csv_escapes_formulas(self):
+        task = Task.objects.create(
+            title='=HYPERLINK("http://example.com")', description='-1+2',
+            project=self.project, created_by=self.user
+        )
+        Comment.objects.create(task=task, user=self.user, text='@SUM(A1)')
+
+        rows = list(csv.DictReader(io.StringIO(self.export('.csv'))))
+        row = next(row for row in rows if row['id'] == str(task.id))
+        self.assertEqual(row['title'], '\'=HYPERLINK("http://example.com")')
+        self.assertEqual(row['description'], "'-1+2")
+        rows = list(csv.DictReader(io.StringIO(self.export('.csv?records=comments'))))
+        self.assertIn("'@SUM(A1)", [row['text'] for row in rows])
+
+        lines = [json.loads(line) for line in self.export('.ndjson').splitlines()]
+        line = next(line for line in lines if line['id'] == str(task.id))
+        self.assertEqual(line['title'], '=HYPERLINK("http://example.com")')
+        self.assertIn('@SUM(A1)', [line['text'] for line in lines
+                                   if line['type'] == 'comment'])
+
+    def test_query_count_is_constant(self):
+        def queries():
+            with CaptureQueriesContext(connection) as context:
+                self.export('.json')
+            return len(context)
+
+        # Project, membership check, users, sprints, tasks, comments, and one
+        # lookup for the former member who is not on the project.
+        self.assertEqual(queries(), 7)
+        for index in range(20):
+            Task.objects.create(
+                title=f'More {index}', project=self.project,
+                created_by=self.user, assigned_to=self.former
+            )
+        self.assertEqual(queries(), 7)
+
+    def test_errors(self):
+        self.assertEqual(self.client.get(f'{self.url}.xml').status_code, 404)
+        response = self.client.get(f'{self.url}.csv?records=nope')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(b'records must be tasks or comments', response.content)
+
+        stranger = User.objects.create_user(
+            username='stranger', email='stranger@example.com', password='pass'
+        )
+        self.client.force_authenticate(stranger)
+        self.assertEqual(self.client.get(f'{self.url}.json').status_code, 404)
+
+    async def test_streams_asynchronously_under_asgi(self):
+        token = await sync_to_async(AccessToken.for_user)(self.user)
+        response = await self.async_client.get(
+            f'{self.url}.ndjson', headers={'Authorization': f'Bearer {token}'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        content = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(len(content.decode().splitlines()), 9)
+
+
+class ImportTests(APITestCase):
+    """Imports validate in batches, insert in bulk and roll back on errors."""
+
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='pass',
+            is_staff=True
+        )
+        self.member = User.objects.create_user(
+            username='member', email='member@example.com', password='pass'
+        )
+        self.url = '/api/projects/import/'
+        self.client.force_authenticate(self.admin)
+
+    def ndjson(self, records):
+        return '\n'.join(json.dumps(record) for record in records) + '\n'
+
+    def records(self, tasks=3):
+        records = [
+            {'type': 'project', 'id': 'p1', 'name': 'Imported',
+             'owner': 'admin@example.com', 'members': ['member@example.com']},
+            {'type': 'sprint', 'id': 's1', 'project': 'p1', 'name': 'Sprint 1',
+             'start_date': '2025-01-01', 'end_date': '2025-01-15',
+             'status': 'active'},
+        ]
+        for index in range(tasks):
+            records.append({
+                'type': 'task', 'id': f't{index}', 'project': 'p1',
+                'sprint': 's1' if index % 2 else None, 'title': f'Task {index}',
+                'status': 'deployed' if index == 1 else 'backlog',
+                'story_points': 3, 'created_by': 'admin@example.com',
+                'assigned_to': 'member@example.com',
+            })
+        records.append({'type': 'comment', 'task': 't1',
+                        'user': 'member@example.com', 'text': 'Hi'})
+        return records
+
+    def post(self, body, query=''):
+        return self.client.post(
+            f'{self.url}{query}', body, content_type='application/x-ndjson'
+        )
+
+    def test_import(self):
+        response = self.post(self.ndjson(self.records()))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            {key: response.data[key] for key in ('projects', 'sprints', 'tasks', 'comments')},
+            {'projects': 1, 'sprints': 1, 'tasks': 3, 'comments': 1}
+        )
+
+        project = Project.objects.get(name='Imported')
+        self.assertEqual(project.owner, self.admin)
+        self.assertEqual(list(project.members.all()), [self.member])
+        self.assertEqual(project.tasks_total, 3)
+        self.assertEqual(project.points_deployed, 3)
+        sprint = project.sprints.get()
+        self.assertEqual((sprint.status, sprint.tasks_total), ('active', 1))
+        task = Task.objects.get(title='Task 1')
+        self.assertEqual((task.sprint, task.assigned_to), (sprint, self.member))
+        self.assertEqual(task.comments.get().user, self.member)
+        self.assertEqual(
+            list(task.status_events.values_list('status', 'sprint_id')),
+            [(task.status, sprint.id)]
+        )
+        self.assertEqual(SearchDocument.objects.filter(project=project).count(), 6)
+        # Tasks are appended to their columns with sparse orders.
+        self.assertEqual(
+            list(project.tasks.order_by('title').values_list('order', flat=True)),
+            [ORDER_GAP, ORDER_GAP, 2 * ORDER_GAP]
+        )
+
+        # The member sees the new project straight away.
+        self.client.force_authenticate(self.member)
+        self.assertEqual(self.client.get('/api/projects/').data['results'][0]['id'],
+                         str(project.id))
+
+    def test_invalid_records_roll_back(self):
+        records = self.records()
+        records[2]['created_by'] = 'nobody@example.com'
+        records[3]['sprint'] = 'missing'
+        records.append({'type': 'sprint', 'id': 's2', 'project': 'p1', 'name': 'Two',
+                        'start_date': '2025-02-01', 'end_date': '2025-01-01'})
+        records.append({'type': 'task', 'id': 't0', 'project': 'p1', 'title': 'Dup',
+                        'created_by': 'admin@example.com', 'priority': 'urgent'})
+        records.append({'type': 'sprint', 'id': 's3', 'project': 'p1', 'name': 'Three',
+                        'start_date': 123, 'end_date': {'a': 1}})
+        body = self.ndjson(records) + '{not json\n'
+        response = self.post(body)
+        self.assertEqual(response.status_code, 400)
+        errors = {error['line']: error['error'] for error in response.data['errors']}
+        self.assertIn('unknown user', errors[3])
+        self.assertIn('unknown sprint', errors[4])
+        self.assertIn('End date must be after start date', errors[7])
+        self.assertIn('priority', errors[8])
+        self.assertEqual(
+            errors[9],
+            "start_date: invalid value 123; end_date: invalid value {'a': 1}"
+        )
+        self.assertEqual(errors[10], 'Invalid JSON')
+        self.assertFalse(Project.objects.exists())
+        self.assertFalse(Task.objects.exists())
+
+    def test_dry_run_and_permissions(self):
+        response = self.post(self.ndjson(self.records()), '?dry_run=true')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['tasks'], 3)
+        self.assertFalse(Project.objects.exists())
+
+        self.client.force_authenticate(self.member)
+        self.assertEqual(self.post(self.ndjson(self.records())).status_code, 403)
+
+    def test_queries_do_not_grow_with_rows(self):
+        def queries(tasks):
+            Project.objects.all().delete()
+            body = self.ndjson(self.records(tasks))
+            with CaptureQueriesContext(connection) as context:
+                self.assertEqual(self.post(body).status_code, 201)
+            return len(context)
+
+        # Within one INSERT batch (SQLite caps parameters per statement).
+        self.assertEqual(queries(3), queries(40))
+
+    def test_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.ndjson', delete=False) as dump:
+            dump.write(self.ndjson(self.records()))
+        self.addCleanup(os.remove, dump.name)
+        out = io.StringIO()
+        call_command('import_projects', dump.name, '--batch-size', '2',
+                     '--bulk-create', stdout=out)
+        self.assertIn('Imported 1 projects, 1 sprints, 3 tasks, 1 comments', out.getvalue())
+        self.assertIn('rows/s', out.getvalue())
+        self.assertEqual(Task.objects.filter(project__name='Imported').count(), 3)
+
+        with open(dump.name, 'a') as dump_file:
+            dump_file.write('{"type": "board"}\n')
+        err = io.StringIO()
+        with self.assertRaises(CommandError):
+            call_command('import_projects', dump.name, '--dry-run',
+                         stdout=io.StringIO(), stderr=err)
+        self.assertIn('line 7: type must be one of', err.getvalue())
+        self.assertEqual(Project.objects.count(), 1)
+
+
+class SearchTests(APITestCase):
+    """Search is ranked, covers every kind and follows writes."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='owner', email='owner@example.com', password='pass'
+        )
+        self.project = Project.objects.create(
+            name='Payments', owner=self.user, description='Checkout and billing'
+        )
+        self.other = Project.objects.create(name='Other', owner=self.user)
+        self.sprint = Sprint.objects.create(
+            name='Invoice sprint',
+            project=self.project,
+            start_date=date(2025, 1, 1),
+            end_date=date(2025, 1, 15),
+            goal='Ship invoices'
+        )
+        self.titled = Task.objects.create(
+            title='Invoice export', project=self.project, created_by=self.user
+        )
+        self.described = Task.objects.create(
+            title='Cleanup', description='Old invoice code', project=self.project,
+            created_by=self.user
+        )
+        self.comment = Comment.objects.create(
+            task=self.described, user=self.user, text='Deploying the invoice fix'
+        )
+        self.client.force_authenticate(self.user)
+
+    def search(self, q, **params):
+        response = self.client.get('/api/search/', {'q': q, **params})
+        self.assertEqual(response.status_code, 200)
+        return [(row['type'], row['id']) for row in response.data['results']]
+
+    def test_ranked_results_over_every_kind(self):
+        results = self.search('invoice')
+        self.assertEqual(set(results), {
+            ('sprint', self.sprint.id), ('task', self.titled.id),
+            ('task', self.described.id), ('comment', self.comment.id),
+        })
+        # Title matches rank above body matches.
+        self.assertLess(results.index(('task', self.titled.id)),
+                        results.index(('task', self.described.id)))
+
+        row = self.client.get('/api/search/', {'q': 'deploying'}).data['results'][0]
+        self.assertEqual((row['type'], row['task']), ('comment', self.described.id))
+        self.assertIn('invoice fix', row['snippet'])
+
+        # Every word must match, after stemming.
+        self.assertEqual(self.search('invoices exported'), [('task', self.titled.id)])
+        self.assertEqual(self.search('deploy'), [('comment', self.comment.id)])
+        self.assertEqual(self.search('billing'), [('project', self.project.id)])
+        self.assertEqual(self.search('invoice', limit=1), [('task', self.titled.id)])
+
+    def test_scoped_to_accessible_projects(self):
+        self.assertEqual(self.search('invoice', project=str(self.other.id)), [])
+        stranger = User.objects.create_user(
+            username='stranger', email='stranger@example.com', password='pass'
+        )
+        self.client.force_authenticate(stranger)
+        self.assertEqual(self.search('invoice'), [])
+        response = self.client.get(
+            '/api/search/', {'q': 'invoice', 'project': str(self.project.id)}
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.client.get('/api/search/', {'q': '  *? '}).status_code, 400)
+        self.assertEqual(
+            self.client.get('/api/search/', {'q': 'x', 'limit': 'no'}).status_code, 400
+        )
+
+    def test_index_follows_writes(self):
+        self.client.patch(
+            f'/api/tasks/{self.titled.id}/', {'title': 'Receipt export'}, format='json'
+        )
+        self.assertEqual(self.search('receipt'), [('task', self.titled.id)])
+        self.assertNotIn(('task', self.titled.id), self.search('invoice'))
+
+        # Moving a task takes its comments along.
+        self.client.patch(
+            f'/api/tasks/{self.described.id}/',
+            {'project': str(self.other.id), 'sprint': None}, format='json'
+        )
+        self.assertEqual(
+            set(self.search('invoice', project=str(self.other.id))),
+            {('task', self.described.id), ('comment', self.comment.id)}
+        )
+
+        self.client.delete(f'/api/tasks/{self.described.id}/')
+        self.assertEqual(self.search('invoice', project=str(self.other.id)), [])
+
+        self.client.post('/api/tasks/', [
+            {'title': 'Bulk invoice', 'project': str(self.project.id)},
+        ], format='json')
+        self.assertEqual(len(self.search('bulk')), 1)
+
+        Project.objects.filter(pk=self.project.pk).delete()
+        self.assertEqual(self.search('invoice'), [])
+
+    def test_moves_skip_the_index(self):
+        def document_writes(save):
+            task = Task.objects.get(pk=self.titled.pk)
+            with CaptureQueriesContext(connection) as context:
+                save(task)
+            return [
+                query['sql'] for query in context.captured_queries
+                if 'projects_searchdocument' in query['sql']
+            ]
+
+        def move(task):
+            task.status = 'testing'
+            task.order += 1
+            task.save()
+
+        def move_order(task):
+            task.order += 1
+            task.save(update_fields=['order'])
+
+        def rename(task):
+            task.title = 'Receipt export'
+            task.save()
+
+        self.assertEqual(document_writes(move), [])
+        self.assertEqual(document_writes(move_order), [])
+        self.assertEqual(len(document_writes(rename)), 1)
+        self.assertEqual(self.search('receipt'), [('task', self.titled.id)])
+
+    def test_reindex(self):
+        before = sorted(self.search('invoice'))
+        SearchDocument.objects.all().delete()
+        self.assertEqual(self.search('invoice'), [])
+        out = io.StringIO()
+        call_command('rebuild_search_index', str(self.project.id), stdout=out)
+        self.assertIn('Indexed 5 documents', out.getvalue())
+        self.assertEqual(sorted(self.search('invoice')), before)
+
+    def test_query_count(self):
+        with CaptureQueriesContext(connection) as context:
+            self.search('invoice')
+        # Membership, then the search itself.
+        self.assertEqual(len(context), 2)
+
+
+class SprintAnalyticsTests(APITestCase):
+    """Status changes are logged and drive burndown, velocity and cycle time."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='owner', email='owner@example.com', password='pass'
+        )
+        self.project = Project.objects.create(name='Project', owner=self.user)
+        self.sprint = Sprint.objects.create(
+            name='Sprint',
+            project=self.project,
+            start_date=date(2025, 1, 1),
+            end_date=date(2025, 1, 5)
+        )
+        self.client.force_authenticate(self.user)
+
+    def history(self, task):
+        return list(task.status_events.order_by('changed_at').values_list(
+            'from_status', 'status', 'sprint_id'
+        ))
+
+    def at(self, day, hour=10):
+        return timezone.make_aware(datetime(2025, 1, day, hour))
+
+    def test_status_and_sprint_changes_are_logged(self):
+        self.client.post('/api/tasks/', [
+            {'title': f'Task {index}', 'project': str(self.project.id)}
+            for index in range(2)
+        ], format='json')
+        first, second = Task.objects.order_by('order')
+
+        self.client.patch(f'/api/tasks/{first.id}/move/', {'status': 'implementing'})
+        self.client.patch(f'/api/tasks/{first.id}/', {'title': 'Renamed'})
+        self.client.post('/api/tasks/bulk_move/', [
+            {'id': str(first.id), 'sprint': str(self.sprint.id)},
+            {'id': str(second.id), 'status': 'testing'},
+        ], format='json')
+        self.client.patch('/api/tasks/', [
+            {'id': str(second.id), 'status': 'deployed'},
+        ], format='json')
+
+        self.assertEqual(self.history(first), [
+            ('', 'backlog', None),
+            ('backlog', 'implementing', None),
+            ('implementing', 'implementing', self.sprint.id),
+        ])
+        self.assertEqual(self.history(second), [
+            ('', 'backlog', None),
+            ('backlog', 'testing', None),
+            ('testing', 'deployed', None),
+        ])
+
+    def test_burndown_and_cycle_time(self):
+        small = Task.objects.create(
+            title='Small', project=self.project, sprint=self.sprint,
+            story_points=3, created_by=self.user
+        )
+        large = Task.objects.create(
+            title='Large', project=self.project, sprint=self.sprint,
+            story_points=5, created_by=self.user
+        )
+        for task, statuses in ((small, ['implementing', 'deployed']),
+                               (large, ['implementing'])):
+            for task_status in statuses:
+                task.status = task_status
+                task.save()
+        # Small: created day 1, started day 2, deployed day 3.
+        # Large: created day 1, started day 4.
+        for task, days in ((small, [1, 2, 3]), (large, [1, 4])):
+            for event, day in zip(task.status_events.order_by('changed_at'), days):
+                TaskStatusEvent.objects.filter(pk=event.pk).update(changed_at=self.at(day))
+
+        data = sprint_analytics(self.sprint, today=date(2025, 1, 4))
+        self.assertEqual(
+            [(day['remaining_points'], day['remaining_tasks']) for day in data['burndown']],
+            [(8, 2), (8, 2), (5, 1), (5, 1), (None, None)]
+        )
+        self.assertEqual(
+            [day['ideal_points'] for day in data['burndown']], [8, 6, 4, 2, 0]
+        )
+
+        cycle_time = data['cycle_time']
+        self.assertEqual(cycle_time['statuses']['backlog'], {
+            'tasks': 2, 'mean_hours': 48.0, 'median_hours': 48.0
+        })
+        self.assertEqual(cycle_time['statuses']['implementing']['tasks'], 1)
+        self.assertEqual(cycle_time['cycle'], {
+            'tasks': 1, 'mean_hours': 24.0, 'median_hours': 24.0
+        })
+
+    def test_completed_sprint_analytics_are_materialized(self):
+        previous = Sprint.objects.create(
+            name='Previous', project=self.project, status='completed',
+            start_date=date(2024, 12, 16), end_date=date(2024, 12, 31)
+        )
+        Task.objects.create(
+            title='Old', project=self.project, sprint=previous, status='deployed',
+            story_points=2, created_by=self.user
+        )
+        Task.objects.create(
+            title='Done', project=self.project, sprint=self.sprint, status='deployed',
+            story_points=4, created_by=self.user
+        )
+        unfinished = Task.objects.create(
+            title='Unfinished', project=self.project, sprint=self.sprint,
+            status='testing', story_points=3, created_by=self.user
+        )
+        unfinished.status_events.update(
+            changed_at=timezone.make_aware(datetime(2025, 1, 2, 12))
+        )
+
+        live = self.client.get(f'/api/sprints/{self.sprint.id}/analytics/')
+        self.assertEqual(live.status_code, 200)
+        self.assertFalse(live.data['materialized'])
+        self.assertEqual(live.data['velocity']['average_points'], 2)
+
+        self.client.patch(f'/api/sprints/{self.sprint.id}/complete/')
+        self.assertTrue(SprintAnalytics.objects.filter(sprint=self.sprint).exists())
+        with CaptureQueriesContext(connection) as context:
+            stored = self.client.get(f'/api/sprints/{self.sprint.id}/analytics/')
+        self.assertEqual(len(context), 1)
+        self.assertTrue(stored.data['materialized'])
+        self.assertEqual(
+            [row['points'] for row in stored.data['velocity']['sprints']], [4, 2]
+        )
+        self.assertEqual(stored.data['velocity']['average_points'], 3)
+        # The unfinished task left the sprint on completion, after the
+        # analytics were stored with it still remaining.
+        self.assertEqual(stored.data['burndown'][-1]['remaining_points'], 3)
+        self.assertIsNone(unfinished.status_events.latest('changed_at').sprint_id)
+        self.assertEqual(sprint_analytics(self.sprint)['burndown'][-1]['remaining_points'], 3)
+
+        outsider = User.objects.create_user(
+            username='outsider', email='outsider@example.com', password='pass'
+        )
+        self.client.force_authenticate(outsider)
+        response = self.client.get(f'/api/sprints/{self.sprint.id}/analytics/')
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(DASHBOARD_CACHE_TIMEOUT=60)
+class DashboardTests(APITestCase):
+    """The dashboard summarizes the user's projects and follows writes."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='owner', email='owner@example.com', password='pass'
+        )
+        self.other = User.objects.create_user(
+            username='other', email='other@example.com', password='pass'
+        )
+        self.projects = [
+            Project.objects.create(name=f'Project {index}', owner=self.user)
+            for index in range(3)
+        ]
+        self.hidden = Project.objects.create(name='Hidden', owner=self.other)
+        self.sprint = Sprint.objects.create(
+            name='Sprint',
+            project=self.projects[0],
+            start_date=timezone.localdate() - timedelta(days=3),
+            end_date=timezone.localdate() + timedelta(days=4),
+            status='active'
+        )
+        for project in self.projects + [self.hidden]:
+            for task_status in ('backlog', 'implementing', 'deployed'):
+                task = Task.objects.create(
+                    title=f'{project.name} {task_status}', project=project,
+                    status=task_status, assigned_to=self.user,
+                    created_by=project.owner
+                )
+            Comment.objects.create(task=task, user=project.owner, text=project.name)
+        self.client.force_authenticate(self.user)
+
+    def test_summary(self):
+        response = self.client.get('/api/dashboard/')
+        self.assertEqual(response.status_code, 200)
+        data = response.data
+
+        self.assertEqual([project['name'] for project in data['projects']],
+                         ['Project 0', 'Project 1', 'Project 2'])
+        self.assertEqual(data['projects'][0]['tasks_by_status'], {
+            'backlog': 1, 'implementing': 1, 'testing': 0, 'deployed': 1
+        })
+        self.assertEqual(data['projects'][0]['assigned_by_status']['deployed'], 1)
+        self.assertEqual(len(data['assigned_tasks']), 6)
+        self.assertNotIn('deployed', {task['status'] for task in data['assigned_tasks']})
+        self.assertEqual(
+            [(sprint['id'], sprint['days_remaining']) for sprint in data['active_sprints']],
+            [(self.sprint.id, 4)]
+        )
+        self.assertEqual([comment['text'] for comment in data['recent_comments']],
+                         ['Project 2', 'Project 1', 'Project 0'])
+
+    def test_query_count_does_not_grow_with_projects(self):
+        def queries():
+            cache.clear()
+            with CaptureQueriesContext(connection) as context:
+                self.client.get('/api/dashboard/')
+            return len(context)
+
+        before = queries()
+        for index in range(10):
+            project = Project.objects.create(name=f'More {index}', owner=self.user)
+            Task.objects.create(
+                title='Task', project=project, assigned_to=self.user,
+                created_by=self.user
+            )
+        self.assertEqual(queries(), before)
+        # Membership, then project counts, assigned counts, assigned tasks,
+        # active sprints and recent comments.
+        self.assertEqual(before, 6)
+
+    def test_cached_until_a_project_changes(self):
+        self.client.get('/api/dashboard/')
+        with CaptureQueriesContext(connection) as context:
+            self.client.get('/api/dashboard/')
+        self.assertEqual(len(context), 1)
+
+        task = Task.objects.get(project=self.projects[1], status='backlog')
+        self.client.patch(f'/api/tasks/{task.id}/move/', {'status': 'testing'})
+        projects = self.client.get('/api/dashboard/').data['projects']
+        self.assertEqual(projects[1]['tasks_by_status']['testing'], 1)
+
+        # Joining a project shows it straight away.
+        self.hidden.members.add(self.user)
+        projects = self.client.get('/api/dashboard/').data['projects']
+        self.assertIn('Hidden', [project['name'] for project in projects])
+
+
+@override_settings(REPLICA_DATABASES=['replica'], REPLICA_LAG_SECONDS=5)
+class ReplicaRoutingTests(APITestCase):
+    """
+    Reads go to a replica (a second SQLite file holding different rows)
+    unless the request writes or the user has just written.
+    """
+    # Resolved in setUpClass, once the replica alias exists.
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        handle, cls.replica_path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(handle)
+        connections.settings['replica'] = {
+            **connections.settings['default'], 'NAME': cls.replica_path
+        }
+        call_command('migrate', database='replica', verbosity=0)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections['replica'].close()
+        del connections['replica']
+        del connections.settings['replica']
+        os.remove(cls.replica_path)
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='owner', email='owner@example.com', password='pass'
+        )
+        self.project = Project.objects.create(name='Primary', owner=self.user)
+        self.user.save(using='replica')
+        Project.objects.using('replica').create(
+            id=self.project.id, name='Replica', owner=self.user
+        )
+        self.client.force_authenticate(self.user)
+
+    def project_names(self):
+        return [project['name'] for project in self.client.get('/api/projects/').data['results']]
+
+    def test_reads_follow_writes(self):
+        self.assertEqual(self.project_names(), ['Replica'])
+        response = self.client.get(f'/api/projects/{self.project.id}/')
+        self.assertEqual(response.data['name'], 'Replica')
+        # Other actions read from the primary.
+        response = self.client.get(f'/api/projects/{self.project.id}/board/')
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.patch(
+            f'/api/projects/{self.project.id}/', {'description': 'Changed'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['name'], 'Primary')
+        self.assertEqual(
+            Project.objects.using('default').get(pk=self.project.pk).description, 'Changed'
+        )
+        self.assertEqual(
+            Project.objects.using('replica').get(pk=self.project.pk).description, ''
+        )
+
+        # The writer reads its own write until the lag has passed.
+        self.assertEqual(self.project_names(), ['Primary'])
+        cache.delete(RECENT_WRITE_KEY.format(user_id=self.user.pk))
+        self.assertEqual(self.project_names(), ['Replica'])
+
+    @override_settings(DASHBOARD_CACHE_TIMEOUT=60)
+    def test_dashboard(self):
+        def dashboard_names():
+            projects = self.client.get('/api/dashboard/').data['projects']
+            return [project['name'] for project in projects]
+
+        self.assertEqual(dashboard_names(), ['Replica'])
+        self.client.patch(
+            f'/api/projects/{self.project.id}/', {'description': 'Changed'}, format='json'
+        )
+        self.assertEqual(dashboard_names(), ['Primary'])
+
+        # Summaries read from a replica are cached no longer than the lag.
+        cache.clear()
+        with override_settings(REPLICA_LAG_SECONDS=0):
+            self.assertEqual(dashboard_names(), ['Replica'])
+            Project.objects.using('replica').filter(pk=self.project.pk).update(name='Caught up')
+            self.assertEqual(dashboard_names(), ['Caught up'])
+
+    def test_replica_reads_carry_no_validators(self):
+        for url in ('/api/projects/', f'/api/projects/{self.project.id}/',
+                    '/api/async/projects/'):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH='*')
+            self.assertEqual(response.status_code, 200, url)
+            self.assertNotIn('ETag', response, url)
+
+        # Primary reads still revalidate.
+        with override_settings(REPLICA_DATABASES=[]):
+            etag = self.client.get('/api/projects/')['ETag']
+            response = self.client.get('/api/projects/', HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+
+    def test_async_reads(self):
+        response = self.client.get('/api/async/projects/')
+        self.assertEqual([project['name'] for project in response.data['results']], ['Replica'])
+        # The replica is not used after the request.
+        self.assertEqual(Project.objects.get(pk=self.project.pk).name, 'Primary')
+
+    @override_settings(REPLICA_DATABASES=[])
+    def test_without_replicas(self):
+        self.assertEqual(self.project_names(), ['Primary'])
+
+
+@override_settings(METRICS_SERVER_TIMING=True, METRICS_DUPLICATE_QUERY_THRESHOLD=3,
+                   METRICS_TOKEN='scrape-token')
+class RequestMetricsTests(APITestCase):
+    """Requests are measured per view and exposed in the Prometheus format."""
+
+    def setUp(self):
+        registry.clear()
+        self.user = User.objects.create_user(
+            username='owner', email='owner@example.com', password='pass'
+        )
+        self.project = Project.objects.create(name='Project', owner=self.user)
+        self.task = Task.objects.create(
+            title='Task', project=self.project, created_by=self.user
+        )
+        self.client.force_authenticate(self.user)
+
+    def metrics(self):
+        response = self.client.get(
+            '/internal/metrics/', HTTP_AUTHORIZATION='Bearer scrape-token'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        return response.content.decode()
+
+    def test_labels_and_counts(self):
+        response = self.client.get('/api/projects/')
+        timing = re.fullmatch(
+            r'db;dur=[\d.]+;desc="(\d+) queries", serialize;dur=[\d.]+, total;dur=[\d.]+',
+            response['Server-Timing']
+        )
+        queries = int(timing.group(1))
+        self.assertGreater(queries, 0)
+
+        self.client.patch(
+            f'/api/tasks/{self.task.id}/move/', {'status': 'testing'}, format='json'
+        )
+        self.client.get('/api/async/projects/')
+
+        metrics = self.metrics()
+        self.assertIn(
+            'api_requests_total{view="ProjectViewSet.list",method="GET",status="200"} 1',
+            metrics
+        )
+        self.assertIn(
+            'api_requests_total{view="TaskViewSet.move",method="PATCH",status="200"} 1',
+            metrics
+        )
+        self.assertIn(
+            f'api_db_queries_total{{view="ProjectViewSet.list"}} {queries}', metrics
+        )
+        self.assertIn('api_request_queries_count{view="ProjectViewSet.list"} 1', metrics)
+        self.assertIn(
+            'api_request_duration_seconds_bucket{view="ProjectViewSet.list",le="+Inf"} 1',
+            metrics
+        )
+        self.assertNotIn('api_serializer_duration_seconds_total{view="ProjectViewSet.list"} 0\n', metrics)
+        self.assertRegex(metrics, r'api_response_bytes_total\{view="ProjectViewSet.list"\} [1-9]')
+        # The async route is labelled by its handler, and its queries counted.
+        self.assertRegex(metrics, r'api_db_queries_total\{view="ProjectViewSet.alist"\} [1-9]')
+
+    def test_duplicate_queries_logged(self):
+        def get_response(request):
+            for task in Task.objects.all():
+                Project.objects.get(pk=task.project_id)
+            return HttpResponse()
+
+        for index in range(2):
+            Task.objects.create(title=f'Task {index}', project=self.project, created_by=self.user)
+        request = RequestFactory().get('/n-plus-one/')
+        with self.assertLogs('projects.metrics', 'WARNING') as logs:
+            MetricsMiddleware(get_response)(request)
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn('Query repeated 3 times in GET /n-plus-one/ (unresolved)', logs.output[0])
+        self.assertIn('api_duplicate_queries_total{view="unresolved"} 2', self.metrics())
+
+    async def test_queries_in_worker_threads_are_counted(self):
+        @sync_to_async(thread_sensitive=False)
+        def query():
+            # A thread of its own, like the sync_to_async threads under ASGI.
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+            finally:
+                connections.close_all()
+
+        async def get_response(request):
+            await query()
+            return HttpResponse()
+
+        response = await MetricsMiddleware(get_response)(RequestFactory().get('/threaded/'))
+        self.assertIn('desc="1 queries"', response['Server-Timing'])
+
+    def test_fingerprint(self):
+        self.assertEqual(
+            fingerprint('SELECT * FROM t WHERE id IN (%s, %s, %s) AND n > 10 LIMIT 21'),
+            'SELECT * FROM t WHERE id IN (...) AND n > ? LIMIT ?'
+        )
+
+    def test_requires_token(self):
+        url = '/internal/metrics/'
+        # The peer address grants nothing (a local proxy would be 127.0.0.1).
+        self.assertEqual(self.client.get(url, REMOTE_ADDR='127.0.0.1').status_code, 404)
+        for header in ('Bearer wrong-token', 'Basic scrape-token', 'Bearer'):
+            response = self.client.get(url, HTTP_AUTHORIZATION=header)
+            self.assertEqual(response.status_code, 404, header)
+        with override_settings(METRICS_TOKEN=''):
+            response = self.client.get(url, HTTP_AUTHORIZATION='Bearer ')
+            self.assertEqual(response.status_code, 404)
@@ -1,13 +1,42 @@
+import copy
+
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ProjectViewSet, SprintViewSet, TaskViewSet, CommentViewSet
+from .async_views import async_action
+from .views import (
+    ProjectViewSet, SprintViewSet, TaskViewSet, CommentViewSet, SearchViewSet,
+    DashboardViewSet
+)
+
+
+class BulkRouter(DefaultRouter):
+    """
+    DefaultRouter that also maps PATCH and DELETE on list routes to
+    `bulk_update` and `bulk_destroy`, for viewsets that implement them.
+    """
+    routes = copy.deepcopy(DefaultRouter.routes)
+    routes[0].mapping.update({
+        'patch': 'bulk_update',
+        'delete': 'bulk_destroy',
+    })
+
 
-router = DefaultRouter()
+router = BulkRouter()
 router.register(r'projects', ProjectViewSet, basename='project')
 router.register(r'sprints', SprintViewSet, basename='sprint')
 router.register(r'tasks', TaskViewSet, basename='task')
 router.register(r'comments', CommentViewSet, basename='comment')
+router.register(r'search', SearchViewSet, basename='search')
+router.register(r'dashboard', DashboardViewSet, basename='dashboard')
 
 urlpatterns = [
+    # Async variants of the hot reads, for ASGI deployments.
+    path('async/projects/', async_action(ProjectViewSet, 'list', 'alist'),
+         name='async-project-list'),
+    path('async/projects/<uuid:pk>/board/',
+         async_action(ProjectViewSet, 'board', 'aboard', detail=True),
+         name='async-project-board'),
+    path('async/tasks/', async_action(TaskViewSet, 'list', 'alist'),
+         name='async-task-list'),
     path('', include(router.urls)),
 ]
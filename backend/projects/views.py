@@ -1,17 +1,38 @@
+import uuid
+
 from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from django.contrib.auth import get_user_model
 from django.shortcuts import get_object_or_404
-from django.db import models as django_models
-
-from .models import Project, Sprint, Task, Comment
+from django.db import transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from .analytics import materialize, sprint_analytics
+from .async_views import AsyncReadMixin
+from .board import aget_board, get_board
+from .caching import CachedResponseMixin, bump_project_versions
+from .changes import cursor_expired, decode_cursor, get_changes, start_cursor
+from .conditional import ConditionalRequestMixin
+from .dashboard import get_dashboard
+from .counters import deferred_counters, record_task_changes, release_unfinished_tasks
+from .export import CSVRenderer, NDJSONRenderer, export_response
+from .importer import ImportFailed, ProjectImporter
+from .membership import get_project_access
+from .models import Project, Sprint, SprintAnalytics, Task, Comment
+from .ordering import ColumnPlanner
+from .realtime import order_delta, publish, publish_task_changes
+from .replicas import ReplicaReadMixin
+from .search import MAX_SEARCH_LIMIT, SEARCH_LIMIT, search, search_terms
 from .serializers import (
     ProjectSerializer, ProjectDetailSerializer,
     SprintSerializer, SprintDetailSerializer,
-    TaskSerializer, TaskDetailSerializer,
+    TaskSerializer, TaskDetailSerializer, TaskMoveSerializer,
     CommentSerializer, UserSerializer
 )
 from .permissions import (
@@ -22,7 +43,15 @@ from .permissions import (
 User = get_user_model()
 
 
-class ProjectViewSet(viewsets.ModelViewSet):
+def parse_uuid(value):
+    try:
+        return uuid.UUID(str(value))
+    except ValueError:
+        return None
+
+
+class ProjectViewSet(ReplicaReadMixin, CachedResponseMixin, ConditionalRequestMixin,
+                     AsyncReadMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing projects.
     """
@@ -31,13 +60,23 @@ class ProjectViewSet(viewsets.ModelViewSet):
     search_fields = ['name', 'description']
     ordering_fields = ['created_at', 'updated_at', 'name']
     ordering = ['-created_at']
+    etag_includes_project_version = True
 
     def get_queryset(self):
         """Return projects where user is owner or member."""
         user = self.request.user
-        return Project.objects.filter(
-            django_models.Q(owner=user) | django_models.Q(members=user)
-        ).distinct()
+        queryset = Project.objects.visible_to(user)
+        if self.action in ['list', 'retrieve', 'update', 'partial_update']:
+            queryset = queryset.with_stats()
+        return queryset
+
+    def get_cache_project_ids(self, access):
+        if self.action == 'list':
+            return access.member_ids
+        project_id = parse_uuid(self.kwargs.get('pk'))
+        if project_id is None or not access.is_member(project_id):
+            return None
+        return [project_id]
 
     def get_serializer_class(self):
         if self.action == 'retrieve':
@@ -50,8 +89,40 @@ class ProjectViewSet(viewsets.ModelViewSet):
             return [IsAuthenticated(), IsProjectOwner()]
         elif self.action == 'destroy':
             return [IsAuthenticated(), IsProjectOwner()]
+        elif self.action == 'import_projects':
+            return [IsAdminUser()]
         return [IsAuthenticated(), IsProjectMember()]
 
+    def perform_destroy(self, instance):
+        # Apply the cascaded task deletions' counter changes once.
+        with deferred_counters():
+            instance.delete()
+
+    def perform_update(self, serializer):
+        """Save and reload the project so annotated stats reflect the update."""
+        serializer.save()
+        serializer.instance = self.get_queryset().get(pk=serializer.instance.pk)
+
+    @action(detail=False, methods=['post'], url_path='import')
+    def import_projects(self, request):
+        """
+        Import projects, sprints, tasks and comments from an NDJSON request
+        body (see projects.importer). Admins only. Pass ?dry_run=true to
+        validate without saving.
+        """
+        dry_run = request.query_params.get('dry_run') in ('1', 'true')
+        try:
+            summary = ProjectImporter().run(request.stream or [], dry_run=dry_run)
+        except ImportFailed as e:
+            return Response(
+                {'error': 'Import failed; nothing was imported.', 'errors': e.errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(
+            summary,
+            status=status.HTTP_200_OK if dry_run else status.HTTP_201_CREATED
+        )
+
     @action(detail=True, methods=['post'])
     def add_member(self, request, pk=None):
         """Add a member to the project."""
@@ -77,6 +148,85 @@ class ProjectViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
 
+    @action(detail=True, methods=['get'])
+    def board(self, request, pk=None):
+        """
+        Return the project's tasks grouped by status, with referenced users
+        listed once. Filter with ?sprint=<id> or ?sprint=backlog.
+        """
+        project = self.get_object()
+        sprint = self.get_board_sprint()
+        return Response({
+            'project': {'id': project.id, 'name': project.name},
+            'sprint': sprint,
+            **get_board(project.id, sprint),
+        })
+
+    async def aboard(self, request, pk=None):
+        """board() for the async route."""
+        project = await self.aget_object()
+        sprint = self.get_board_sprint()
+        return Response({
+            'project': {'id': project.id, 'name': project.name},
+            'sprint': sprint,
+            **(await aget_board(project.id, sprint)),
+        })
+
+    def get_board_sprint(self):
+        sprint = self.request.query_params.get('sprint')
+        if sprint and sprint != 'backlog' and parse_uuid(sprint) is None:
+            raise ValidationError({'error': 'Invalid sprint id'})
+        return sprint
+
+    @action(detail=True, methods=['get'])
+    def changes(self, request, pk=None):
+        """
+        Return the project's tasks, sprints and comments created, updated or
+        deleted since ?since=<cursor>, and the cursor for the next poll.
+        Without a cursor only a starting cursor is returned: load the rows
+        from the list endpoints, then poll with it. A cursor older than
+        CHANGES_RETENTION_DAYS gets 410 and the client must start over.
+        """
+        project = self.get_object()
+        since = request.query_params.get('since')
+        if not since:
+            return Response({'cursor': start_cursor()})
+        try:
+            since = decode_cursor(since)
+        except (ValueError, OverflowError):
+            return Response(
+                {'error': 'Invalid cursor'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if cursor_expired(since):
+            return Response(
+                {'error': 'Cursor expired, resync required'},
+                status=status.HTTP_410_GONE
+            )
+
+        return Response(
+            get_changes(project.id, since, self.get_serializer_context())
+        )
+
+    @action(detail=True, methods=['get'],
+            renderer_classes=[JSONRenderer, NDJSONRenderer, CSVRenderer])
+    def export(self, request, pk=None, format=None):
+        """
+        Stream the project's tasks and comments. Pick the format with a
+        suffix: export.json, export.ndjson or export.csv. CSV exports tasks,
+        or comments with ?records=comments.
+        """
+        project = self.get_object()
+        records = request.query_params.get('records', 'tasks')
+        if records not in ('tasks', 'comments'):
+            return Response(
+                {'error': 'records must be tasks or comments'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return export_response(
+            request, project, request.accepted_renderer.format, records
+        )
+
     @action(detail=True, methods=['delete'], url_path='remove-member/(?P<user_id>[^/.]+)')
     def remove_member(self, request, pk=None, user_id=None):
         """Remove a member from the project."""
@@ -101,7 +251,8 @@ class ProjectViewSet(viewsets.ModelViewSet):
             )
 
 
-class SprintViewSet(viewsets.ModelViewSet):
+class SprintViewSet(ReplicaReadMixin, CachedResponseMixin, ConditionalRequestMixin,
+                    viewsets.ModelViewSet):
     """
     ViewSet for managing sprints.
     """
@@ -110,13 +261,17 @@ class SprintViewSet(viewsets.ModelViewSet):
     filterset_fields = ['status', 'project']
     ordering_fields = ['start_date', 'end_date', 'created_at']
     ordering = ['-start_date']
+    cached_actions = ['list']
+    etag_includes_project_version = True
 
     def get_queryset(self):
         """Return sprints for projects user has access to."""
         user = self.request.user
-        queryset = Sprint.objects.filter(
-            django_models.Q(project__owner=user) | django_models.Q(project__members=user)
-        ).distinct()
+        queryset = Sprint.objects.visible_to(user)
+        if self.action == 'retrieve':
+            queryset = queryset.prefetch_related(
+                Prefetch('tasks', queryset=Task.objects.with_details())
+            )
 
         # Filter by project if provided in query params
         project_id = self.request.query_params.get('project_id')
@@ -136,15 +291,16 @@ class SprintViewSet(viewsets.ModelViewSet):
         sprint = self.get_object()
 
         try:
-            # Deactivate other sprints in the project
-            Sprint.objects.filter(
-                project=sprint.project,
-                status='active'
-            ).update(status='planning')
+            with transaction.atomic():
+                # Deactivate other sprints in the project
+                Sprint.objects.filter(
+                    project=sprint.project,
+                    status='active'
+                ).update(status='planning')
 
-            # Activate this sprint
-            sprint.status = 'active'
-            sprint.save()
+                # Activate this sprint
+                sprint.status = 'active'
+                sprint.save()
 
             serializer = self.get_serializer(sprint)
             return Response(serializer.data)
@@ -160,15 +316,44 @@ class SprintViewSet(viewsets.ModelViewSet):
         sprint = self.get_object()
         sprint.status = 'completed'
         sprint.save()
+        # Stored before the unfinished tasks leave, so the burndown ends
+        # with the work left at completion.
+        materialize(sprint)
 
         # Move uncompleted tasks back to backlog
-        sprint.tasks.exclude(status='deployed').update(sprint=None)
+        release_unfinished_tasks(sprint)
+        sprint.refresh_from_db(fields=Sprint.COUNTER_FIELDS)
 
         serializer = self.get_serializer(sprint)
         return Response(serializer.data)
 
+    @action(detail=True, methods=['get'])
+    def analytics(self, request, pk=None):
+        """
+        Burndown, velocity and cycle time of the sprint.
+
+        Completed sprints return the analytics stored on completion, read
+        with one query that also checks access; other sprints are computed
+        from the status-change log.
+        """
+        sprint_id = parse_uuid(pk)
+        stored = sprint_id and SprintAnalytics.objects.visible_to(request.user).filter(
+            sprint_id=sprint_id, sprint__status='completed'
+        ).values_list('data', 'computed_at').first()
+        if stored:
+            data, computed_at = stored
+            return Response({**data, 'materialized': True, 'computed_at': computed_at})
 
-class TaskViewSet(viewsets.ModelViewSet):
+        sprint = self.get_object()
+        return Response({
+            **sprint_analytics(sprint),
+            'materialized': False,
+            'computed_at': timezone.now(),
+        })
+
+
+class TaskViewSet(ReplicaReadMixin, ConditionalRequestMixin, AsyncReadMixin,
+                  viewsets.ModelViewSet):
     """
     ViewSet for managing tasks.
     """
@@ -182,9 +367,11 @@ class TaskViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         """Return tasks for projects user has access to."""
         user = self.request.user
-        queryset = Task.objects.filter(
-            django_models.Q(project__owner=user) | django_models.Q(project__members=user)
-        ).distinct()
+        queryset = Task.objects.visible_to(user).with_details()
+        if self.action == 'retrieve':
+            queryset = queryset.prefetch_related(
+                Prefetch('comments', queryset=Comment.objects.select_related('user'))
+            )
 
         # Filter by project if provided
         project_id = self.request.query_params.get('project_id')
@@ -207,28 +394,187 @@ class TaskViewSet(viewsets.ModelViewSet):
             return TaskDetailSerializer
         return TaskSerializer
 
+    def get_bulk_tasks(self, items, key='id'):
+        """
+        Lock and return the visible tasks referenced by `items`, in order.
+
+        Raises ValidationError for malformed IDs and NotFound if any task is
+        missing or not visible to the user.
+        """
+        if not isinstance(items, list) or not items:
+            raise ValidationError({'error': 'Expected a non-empty list'})
+
+        task_ids = []
+        for item in items:
+            value = item.get(key) if isinstance(item, dict) else item
+            try:
+                task_ids.append(uuid.UUID(str(value)))
+            except ValueError:
+                raise ValidationError({'error': f'Invalid task id: {value}'})
+        if len(set(task_ids)) != len(task_ids):
+            raise ValidationError({'error': 'Each task may only appear once'})
+
+        tasks = self.get_queryset().select_for_update(of=('self',)).in_bulk(task_ids)
+        missing = [str(task_id) for task_id in task_ids if task_id not in tasks]
+        if missing:
+            raise NotFound({'error': 'Tasks not found', 'ids': missing})
+
+        tasks = [tasks[task_id] for task_id in task_ids]
+        for task in tasks:
+            self.check_object_permissions(self.request, task)
+        return tasks
+
+    def create(self, request, *args, **kwargs):
+        """Create a task, or a batch of tasks when given a list."""
+        if not isinstance(request.data, list):
+            return super().create(request, *args, **kwargs)
+
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            serializer.save()
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    def bulk_update(self, request, *args, **kwargs):
+        """Partially update a batch of tasks: PATCH a list of {id, ...fields}."""
+        with transaction.atomic():
+            tasks = self.get_bulk_tasks(request.data)
+            serializer = self.get_serializer(
+                tasks, data=request.data, many=True, partial=True
+            )
+            serializer.is_valid(raise_exception=True)
+            serializer.save()
+        return Response(serializer.data)
+
+    def bulk_destroy(self, request, *args, **kwargs):
+        """Delete a batch of tasks: DELETE a list of task ids."""
+        with deferred_counters():
+            tasks = self.get_bulk_tasks(request.data)
+            Task.objects.filter(id__in=[task.id for task in tasks]).delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
     @action(detail=True, methods=['patch'])
     def move(self, request, pk=None):
         """Move task to new status/position."""
         task = self.get_object()
 
-        new_status = request.data.get('status')
-        new_order = request.data.get('order')
-        new_sprint = request.data.get('sprint')
-
-        if new_status:
-            task.status = new_status
-        if new_order is not None:
-            task.order = new_order
-        if new_sprint is not None:
-            task.sprint_id = new_sprint if new_sprint else None
+        data = {'id': task.id}
+        if request.data.get('status'):
+            data['status'] = request.data['status']
+        if request.data.get('order') is not None:
+            data['order'] = request.data['order']
+        if request.data.get('sprint') is not None:
+            # An empty sprint moves the task to the backlog.
+            data['sprint'] = request.data['sprint'] or None
+        serializer = TaskMoveSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+        move = serializer.validated_data
+
+        if move.get('sprint') and not Sprint.objects.filter(
+            pk=move['sprint'], project_id=task.project_id
+        ).exists():
+            raise ValidationError({'sprint': 'Sprint not found in this project.'})
+
+        if 'status' in move:
+            task.status = move['status']
+        if 'order' in move:
+            task.order = move['order']
+        if 'sprint' in move:
+            task.sprint_id = move['sprint']
 
         task.save()
         serializer = self.get_serializer(task)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['post'])
+    def bulk_move(self, request):
+        """
+        Move several tasks at once.
+
+        Expects a list of {id, status, sprint, order | after} entries and
+        applies them in one transaction. Returns the moved rows plus any
+        neighbours that had to be renumbered.
+        """
+        serializer = TaskMoveSerializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        moves = serializer.validated_data
+
+        with transaction.atomic():
+            tasks = {task.id: task for task in self.get_bulk_tasks(moves)}
+            task_ids = list(tasks)
+
+            sprint_ids = {move['sprint'] for move in moves if move.get('sprint')}
+            sprints = Sprint.objects.in_bulk(sprint_ids)
+
+            planner = ColumnPlanner(task_ids)
+            errors = {}
+            for index, move in enumerate(moves):
+                task = tasks[move['id']]
+                if 'status' in move:
+                    task.status = move['status']
+                if 'sprint' in move:
+                    sprint = sprints.get(move['sprint'])
+                    if move['sprint'] and (
+                        sprint is None or sprint.project_id != task.project_id
+                    ):
+                        errors[index] = {'sprint': 'Sprint not found in this project.'}
+                        continue
+                    task.sprint_id = move['sprint']
+
+                if 'after' in move:
+                    if not planner.place(task, move['after']):
+                        errors[index] = {'after': 'Task is not in the target column.'}
+                else:
+                    if 'order' in move:
+                        task.order = move['order']
+                    planner.track(task)
+
+            if errors:
+                return Response(
+                    {'errors': errors},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
 
-class CommentViewSet(viewsets.ModelViewSet):
+            now = timezone.now()
+            for task in tasks.values():
+                task.updated_at = now
+            Task.objects.bulk_update(
+                tasks.values(), ['status', 'sprint', 'order', 'updated_at']
+            )
+            record_task_changes(tasks.values())
+            bump_project_versions({task.project_id for task in tasks.values()})
+            Task.objects.bulk_update(
+                [
+                    Task(id=task_id, order=order, updated_at=now)
+                    for task_id, order in planner.renumbered.items()
+                ],
+                ['order', 'updated_at']
+            )
+            publish_task_changes(tasks.values(), 'updated')
+            for (project_id, _, _), column in planner.columns.items():
+                publish(project_id, [
+                    order_delta(entry['id'], entry['order'], now)
+                    for entry in column if entry['id'] in planner.renumbered
+                ])
+
+        return Response({
+            'moved': [
+                {
+                    'id': str(task.id),
+                    'status': task.status,
+                    'sprint': str(task.sprint_id) if task.sprint_id else None,
+                    'order': task.order,
+                }
+                for task in tasks.values()
+            ],
+            'reordered': [
+                {'id': str(task_id), 'order': order}
+                for task_id, order in planner.renumbered.items()
+            ],
+        })
+
+
+class CommentViewSet(ReplicaReadMixin, ConditionalRequestMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing comments.
     """
@@ -240,12 +586,12 @@ class CommentViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         """Return comments for tasks in projects user has access to."""
         user = self.request.user
-        queryset = Comment.objects.filter(
-            django_models.Q(task__project__owner=user) |
-            django_models.Q(task__project__members=user)
-        ).distinct()
+        queryset = Comment.objects.visible_to(user).select_related('task', 'user')
 
-        # Filter by task if provided
+        # Filter by project or task if provided
+        project_id = self.request.query_params.get('project_id')
+        if project_id:
+            queryset = queryset.filter(project_id=project_id)
         task_id = self.request.query_params.get('task_id')
         if task_id:
             queryset = queryset.filter(task_id=task_id)
@@ -255,3 +601,56 @@ class CommentViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         """Set the user when creating a comment."""
         serializer.save(user=self.request.user)
+
+
+class SearchViewSet(viewsets.ViewSet):
+    """
+    Ranked full-text search over the user's projects, sprints, tasks and
+    comments (see projects.search).
+    """
+    permission_classes = [IsAuthenticated]
+
+    def list(self, request):
+        """Search with ?q=, optionally within ?project=<id>, up to ?limit= results."""
+        q = request.query_params.get('q', '').strip()
+        if not search_terms(q):
+            return Response(
+                {'error': 'q must contain at least one word'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            limit = min(
+                int(request.query_params.get('limit', SEARCH_LIMIT)), MAX_SEARCH_LIMIT
+            )
+        except ValueError:
+            limit = 0
+        if limit < 1:
+            return Response(
+                {'error': 'limit must be a positive integer'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        access = get_project_access(request)
+        project_ids = access.member_ids
+        project = request.query_params.get('project')
+        if project:
+            project_id = parse_uuid(project)
+            if project_id is None or not access.is_member(project_id):
+                return Response(
+                    {'error': 'Project not found'},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            project_ids = [project_id]
+
+        return Response({'results': search(q, project_ids, limit)})
+
+
+class DashboardViewSet(ReplicaReadMixin, viewsets.ViewSet):
+    """
+    Summary of the user's projects for the dashboard (see projects.dashboard).
+    """
+    permission_classes = [IsAuthenticated]
+
+    def list(self, request):
+        """Task counts, open assigned tasks, active sprints and recent comments."""
+        return Response(get_dashboard(request.user, get_project_access(request)))
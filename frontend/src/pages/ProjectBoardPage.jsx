@@ -1,8 +1,9 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
 import { DndContext, DragOverlay, closestCorners } from '@dnd-kit/core';
 import { SortableContext, verticalListSortingStrategy } from '@dnd-kit/sortable';
 import { projectsAPI, tasksAPI, sprintsAPI } from '../services/projectsAPI';
+import { subscribeToProject } from '../services/realtime';
 import TaskCard from '../components/TaskCard';
 import TaskColumn from '../components/TaskColumn';
 import TaskDetailModal from '../components/TaskDetailModal';
@@ -28,6 +29,8 @@ const ProjectBoardPage = () => {
   const [selectedTask, setSelectedTask] = useState(null);
   const [showCreateTask, setShowCreateTask] = useState(false);
   const [createTaskStatus, setCreateTaskStatus] = useState('backlog');
+  const tasksRef = useRef(tasks);
+  tasksRef.current = tasks;
 
   useEffect(() => {
     fetchProjectData();
@@ -39,6 +42,14 @@ const ProjectBoardPage = () => {
     }
   }, [selectedSprint, project]);
 
+  useEffect(() => {
+    if (!project) return undefined;
+    return subscribeToProject(projectId, {
+      onMessage: applyDeltas,
+      onResync: fetchTasks,
+    });
+  }, [selectedSprint, project]);
+
   const fetchProjectData = async () => {
     try {
       setLoading(true);
@@ -62,17 +73,49 @@ const ProjectBoardPage = () => {
 
   const fetchTasks = async () => {
     try {
-      const filters = { project_id: projectId };
-      if (selectedSprint) {
-        filters.sprint_id = selectedSprint;
-      }
-      const data = await tasksAPI.list(filters);
-      setTasks(data);
+      const board = await projectsAPI.board(projectId, selectedSprint);
+      // Rows reference users by id; expand them into the shape TaskCard expects.
+      const boardTasks = Object.values(board.columns).flat().map(task => ({
+        ...task,
+        description: task.description_preview,
+        assigned_to_details: task.assigned_to ? board.users[task.assigned_to] : null,
+        created_by_details: board.users[task.created_by],
+      }));
+      setTasks(boardTasks);
     } catch (error) {
       console.error('Failed to fetch tasks:', error);
     }
   };
 
+  // Apply task deltas pushed by other collaborators. Tasks new to this view
+  // need user details the delta does not carry, so they trigger a refetch.
+  const applyDeltas = ({ deltas }) => {
+    const taskDeltas = deltas.filter(delta => delta.type === 'task');
+    if (taskDeltas.length === 0) return;
+
+    const known = new Set(tasksRef.current.map(t => t.id));
+    const appears = taskDeltas.some(delta =>
+      delta.action === 'created' ||
+      (delta.action === 'updated' && !known.has(delta.id) &&
+        (!selectedSprint || delta.data.sprint === selectedSprint))
+    );
+    if (appears) {
+      fetchTasks();
+      return;
+    }
+
+    setTasks(current => taskDeltas.reduce((result, delta) => {
+      if (delta.action === 'deleted') {
+        return result.filter(t => t.id !== delta.id);
+      }
+      if (delta.data.sprint !== undefined && selectedSprint &&
+          delta.data.sprint !== selectedSprint) {
+        return result.filter(t => t.id !== delta.id);
+      }
+      return result.map(t => (t.id === delta.id ? { ...t, ...delta.data } : t));
+    }, current));
+  };
+
   const handleDragStart = (event) => {
     const task = tasks.find(t => t.id === event.active.id);
     setActiveTask(task);
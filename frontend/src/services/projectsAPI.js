@@ -1,10 +1,13 @@
 import api from './api';
 
+// List endpoints are cursor-paginated; the board pages still expect plain arrays.
+const UNPAGINATED = { paginate: 'false' };
+
 // Projects API
 export const projectsAPI = {
   // Get all projects
   list: async () => {
-    const response = await api.get('/api/projects/');
+    const response = await api.get('/api/projects/', { params: UNPAGINATED });
     return response.data;
   },
 
@@ -14,6 +17,22 @@ export const projectsAPI = {
     return response.data;
   },
 
+  // Get board tasks grouped by status (sprint id, 'backlog' or null for all)
+  board: async (id, sprint = null) => {
+    const params = sprint ? { sprint } : {};
+    const response = await api.get(`/api/projects/${id}/board/`, { params });
+    return response.data;
+  },
+
+  // Get tasks, sprints and comments changed since a cursor from a previous call.
+  // Without one only a starting cursor is returned: take it before loading the
+  // lists, then poll with it. A 410 means the cursor expired; start over.
+  changes: async (id, since = null) => {
+    const params = since ? { since } : {};
+    const response = await api.get(`/api/projects/${id}/changes/`, { params });
+    return response.data;
+  },
+
   // Create project
   create: async (data) => {
     const response = await api.post('/api/projects/', data);
@@ -47,7 +66,7 @@ export const projectsAPI = {
 export const sprintsAPI = {
   // List sprints
   list: async (projectId) => {
-    const params = projectId ? { project_id: projectId } : {};
+    const params = projectId ? { ...UNPAGINATED, project_id: projectId } : UNPAGINATED;
     const response = await api.get('/api/sprints/', { params });
     return response.data;
   },
@@ -86,13 +105,19 @@ export const sprintsAPI = {
     const response = await api.patch(`/api/sprints/${id}/complete/`);
     return response.data;
   },
+
+  // Burndown, velocity and cycle time
+  analytics: async (id) => {
+    const response = await api.get(`/api/sprints/${id}/analytics/`);
+    return response.data;
+  },
 };
 
 // Tasks API
 export const tasksAPI = {
   // List tasks
   list: async (filters = {}) => {
-    const response = await api.get('/api/tasks/', { params: filters });
+    const response = await api.get('/api/tasks/', { params: { ...UNPAGINATED, ...filters } });
     return response.data;
   },
 
@@ -130,13 +155,19 @@ export const tasksAPI = {
     const response = await api.patch(`/api/tasks/${id}/move/`, data);
     return response.data;
   },
+
+  // Move several tasks at once: [{ id, status, sprint, order | after }]
+  bulkMove: async (moves) => {
+    const response = await api.post('/api/tasks/bulk_move/', moves);
+    return response.data;
+  },
 };
 
 // Comments API
 export const commentsAPI = {
   // List comments for a task
   list: async (taskId) => {
-    const response = await api.get('/api/comments/', { params: { task_id: taskId } });
+    const response = await api.get('/api/comments/', { params: { ...UNPAGINATED, task_id: taskId } });
     return response.data;
   },
 
@@ -157,3 +188,21 @@ export const commentsAPI = {
     await api.delete(`/api/comments/${id}/`);
   },
 };
+
+// Search API
+export const searchAPI = {
+  // Ranked full-text search over projects, sprints, tasks and comments
+  search: async (q, projectId = null) => {
+    const params = projectId ? { q, project: projectId } : { q };
+    const response = await api.get('/api/search/', { params });
+    return response.data.results;
+  },
+};
+
+export const dashboardAPI = {
+  // Task counts, open assigned tasks, active sprints and recent comments
+  get: async () => {
+    const response = await api.get('/api/dashboard/');
+    return response.data;
+  },
+};
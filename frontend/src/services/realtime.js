@@ -0,0 +1,39 @@
+const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || 'http://localhost:8000';
+const WS_BASE_URL = API_BASE_URL.replace(/^http/, 'ws');
+
+// Subscribe to a project's board deltas. Calls onMessage with each
+// { project, deltas } message and onResync when the server asks the client
+// to refetch (it fell behind, or the connection dropped). Returns an
+// unsubscribe function.
+export const subscribeToProject = (projectId, { onMessage, onResync }) => {
+  let socket = null;
+  let closed = false;
+  let retryDelay = 1000;
+
+  const connect = () => {
+    const token = localStorage.getItem('access_token');
+    socket = new WebSocket(
+      `${WS_BASE_URL}/ws/projects/${projectId}/?token=${encodeURIComponent(token || '')}`
+    );
+    socket.onopen = () => {
+      retryDelay = 1000;
+    };
+    socket.onmessage = (event) => onMessage(JSON.parse(event.data));
+    socket.onclose = (event) => {
+      if (closed || event.code === 4403 || event.code === 4404) return;
+      // Anything may have changed while disconnected.
+      setTimeout(() => {
+        if (closed) return;
+        onResync();
+        connect();
+      }, retryDelay);
+      retryDelay = Math.min(retryDelay * 2, 30000);
+    };
+  };
+
+  connect();
+  return () => {
+    closed = true;
+    socket?.close();
+  };
+};